@@ -2,6 +2,14 @@
 API Client module for interacting with Groq LLM models.
 """
 
-from .groq_client import GroqClient
+from .groq_client import GroqClient, AsyncGroqClient, ChatResult, StreamResult
+from .rate_limiter import RateLimiter
+from .latency_histogram import LatencyHistogram, LatencyRecorder
+from .hooks import RequestHooks, RequestEvent, SpanExporter
+from .retry import RetryPolicy, CircuitBreaker
+from .transport import TransportConfig
+from .simulated_client import SimulatedClient, SimulatedModel
+from .parsers import DigitsParser, YearParser, LetterParser
+from .response_store import ResponseStore, ResponseNotRecordedError
 
-__all__ = ['GroqClient']
+__all__ = ['GroqClient', 'AsyncGroqClient', 'ChatResult', 'StreamResult', 'RateLimiter', 'LatencyHistogram', 'LatencyRecorder', 'RequestHooks', 'RequestEvent', 'SpanExporter', 'RetryPolicy', 'CircuitBreaker', 'TransportConfig', 'SimulatedClient', 'SimulatedModel', 'DigitsParser', 'YearParser', 'LetterParser', 'ResponseStore', 'ResponseNotRecordedError']
@@ -0,0 +1,126 @@
+"""
+Benchmark del costo de abrir conexiones frente a reutilizarlas.
+
+Envía la misma cantidad de requests cortas con distintas configuraciones de
+transporte y compara latencias y throughput:
+
+- sin keep-alive: cada request abre una conexión nueva;
+- keep-alive: pool dimensionado para la concurrencia (el valor por defecto
+  de AsyncGroqClient);
+- pool chico: menos conexiones que requests en vuelo, que esperan un lugar
+  en el pool.
+
+Por defecto levanta `stand_in_server` en un hilo, con una demora en la
+primera respuesta de cada conexión que simula el handshake TCP + TLS (el
+servidor local no usa TLS). Con `--base-url` se mide contra otro servidor.
+
+Uso:
+    python -m api_client.benchmark_transport
+    python -m api_client.benchmark_transport --requests 500 --concurrency 1 8 32 --handshake-latency 0.03
+"""
+
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+from .groq_client import AsyncGroqClient
+from .rate_limiter import RateLimiter
+from .retry import CircuitBreaker
+from .transport import TransportConfig
+from .stand_in_server import StandInServer, LatencyModel
+
+MESSAGES = [{"role": "user", "content": "Elegí un número entero del 1 al 30."}]
+SMALL_POOL = 4
+
+
+def scenarios(concurrency: int, http2: bool) -> Dict[str, TransportConfig]:
+    result = {
+        "sin keep-alive": TransportConfig(max_keepalive_connections=0, http2=http2),
+        "keep-alive": TransportConfig.for_concurrency(concurrency, http2=http2),
+    }
+    if concurrency > SMALL_POOL:
+        result[f"pool de {SMALL_POOL}"] = TransportConfig(
+            max_connections=SMALL_POOL, max_keepalive_connections=SMALL_POOL, http2=http2
+        )
+    return result
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def run_scenario(base_url: str, api_key: str, transport: TransportConfig,
+                       n_requests: int, concurrency: int) -> Dict[str, float]:
+    # Limitador y breaker propios, para que un escenario no afecte al siguiente,
+    # y sin almacén: cada request tiene que llegar al servidor para medirla
+    client = AsyncGroqClient(
+        api_key=api_key,
+        base_url=base_url,
+        use_env_store=False,
+        max_in_flight=concurrency,
+        transport=transport,
+        rate_limiter=RateLimiter(),
+        circuit_breaker=CircuitBreaker(),
+    )
+    latencies: List[float] = []
+
+    async def one():
+        result = await client.chat_detailed(MESSAGES, max_tokens=1)
+        latencies.append(result.latency)
+
+    async with client:
+        t_start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n_requests)))
+        wall = time.perf_counter() - t_start
+
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p50": _percentile(latencies, 50),
+        "p99": _percentile(latencies, 99),
+        "throughput": n_requests / wall,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara conexiones nuevas vs reutilizadas.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests por escenario.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16], help="Requests en vuelo.")
+    parser.add_argument("--handshake-latency", type=float, default=0.01,
+                        help="Costo simulado (s) de abrir una conexión en el servidor local.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia constante (s) del servidor local.")
+    parser.add_argument("--base-url", help="Servidor a medir en lugar del local (usa GROQ_API_KEY).")
+    parser.add_argument("--http2", action="store_true", help="Usar HTTP/2 (requiere h2; el servidor local es HTTP/1.1).")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.base_url:
+        base_url, api_key = args.base_url, None
+    else:
+        server = StandInServer(port=0, latency=LatencyModel("constant", mean=args.latency),
+                               handshake_latency=args.handshake_latency)
+        base_url, api_key = server.start_in_thread(), "benchmark"
+        print(f"Servidor local en {base_url} (latencia {args.latency}s, handshake {args.handshake_latency}s)")
+
+    print(f"\n{'Escenario':<16} {'En vuelo':>8} {'Conexiones':>10} {'Media':>9} {'p50':>9} {'p99':>9} {'req/s':>8}")
+    try:
+        for concurrency in args.concurrency:
+            means = {}
+            for name, transport in scenarios(concurrency, args.http2).items():
+                connections_before = server.stats["connections"] if server else 0
+                stats = asyncio.run(run_scenario(base_url, api_key, transport, args.requests, concurrency))
+                connections = str(server.stats["connections"] - connections_before) if server else "-"
+                means[name] = stats["mean"]
+                print(f"{name:<16} {concurrency:>8} {connections:>10} {stats['mean'] * 1000:>7.1f}ms "
+                      f"{stats['p50'] * 1000:>7.1f}ms {stats['p99'] * 1000:>7.1f}ms {stats['throughput']:>8.1f}")
+            overhead = means["sin keep-alive"] - means["keep-alive"]
+            print(f"{'':<16} Costo de conexión por request: {overhead * 1000:.1f}ms "
+                  f"({overhead / means['sin keep-alive']:.0%} de la latencia sin keep-alive)\n")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
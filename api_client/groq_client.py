@@ -3,81 +3,886 @@ Cliente de API para Groq con el modelo llama-3.1-8b.
 """
 
 import os
-from typing import Optional, List, Dict
-from groq import Groq
+import json
+import time
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Iterable, AsyncIterator, Tuple, Union
+from groq import Groq, AsyncGroq, RateLimitError
+import httpx
 from dotenv import load_dotenv, find_dotenv
 
+from .rate_limiter import RateLimiter, estimate_tokens
+from .parsers import AnswerParser, PENDING, COMPLETE
+from .latency_histogram import LatencyRecorder
+from .hooks import RequestHooks, RequestEvent, SpanExporter, next_request_id
+from .retry import RetryPolicy, CircuitBreaker, TRANSIENT_ERRORS, retry_after
+from .transport import TransportConfig
+from .response_store import (
+    ResponseStore,
+    ResponseNotRecordedError,
+    MODES as STORE_MODES,
+    REPLAY,
+    RECORD,
+    RECORD_MISSING,
+)
+
 load_dotenv(find_dotenv())
 
+# Tiempos del servidor informados en el bloque `usage` (en segundos)
+SERVER_TIMING_FIELDS = ("queue_time", "prompt_time", "completion_time", "total_time")
+
+
+def _resolve_api_key(api_key: Optional[str]) -> str:
+    """Devuelve la API key provista o la de GROQ_API_KEY, fallando si no hay ninguna."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("Se debe proveer una API key o configurar GROQ_API_KEY como variable de entorno")
+    return api_key
+
+
+@dataclass
+class ChatResult:
+    """Respuesta de chat junto con los datos de la llamada que la produjo."""
+
+    content: str
+    latency: Optional[float]  # Segundos de la llamada exitosa (sin esperas del limitador)
+    cached: bool = False      # Servida desde el almacén de respuestas
+
+
+@dataclass
+class StreamResult(ChatResult):
+    """
+    Respuesta recibida en streaming, con la descomposición de su latencia.
+
+    Los tiempos del cliente se miden desde el envío de la request; los del
+    servidor son los del bloque `usage` del último chunk (`x_groq.usage`).
+    Las respuestas servidas desde el almacén no tienen descomposición. Si el
+    stream se cortó antes de terminar, no hay tiempos del servidor.
+    """
+
+    ttft: Optional[float] = None                                   # Tiempo hasta el primer chunk con texto
+    token_gaps: List[float] = field(default_factory=list)          # Tiempos entre chunks de texto consecutivos
+    server_timing: Dict[str, float] = field(default_factory=dict)  # Campos de SERVER_TIMING_FIELDS informados
+    answer_state: Optional[str] = None                             # Estado final del parser, si se usó uno
+    answer: Optional[str] = None                                   # Respuesta normalizada si el estado es COMPLETE
+    stopped_early: bool = False                                    # El parser cerró el stream antes del final
+
+
+class _StreamCollector:
+    """Acumula los chunks de una respuesta en streaming junto con sus tiempos de llegada."""
+
+    def __init__(self, parser: Optional[AnswerParser] = None):
+        self.t_start = time.perf_counter()
+        self.parser = parser
+        self.parts: List[str] = []
+        self.arrivals: List[float] = []
+        self.usage = None
+        self.answer_state = PENDING
+
+    def add(self, chunk) -> bool:
+        """Registra un chunk; devuelve True si el parser ya decidió la respuesta."""
+        now = time.perf_counter()
+        if chunk.choices:
+            piece = chunk.choices[0].delta.content
+            if piece:
+                self.parts.append(piece)
+                self.arrivals.append(now - self.t_start)
+                if self.parser is not None:
+                    self.answer_state = self.parser.feed("".join(self.parts))
+        # Groq manda el uso en x_groq.usage; la variante OpenAI, en chunk.usage
+        usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage is not None:
+            self.usage = usage
+        return self.answer_state != PENDING
+
+    def total_tokens(self, estimated: int, max_tokens: Optional[int]) -> Optional[int]:
+        """Tokens consumidos: los de `usage` o, si el stream se cortó, el prompt estimado más lo recibido."""
+        if self.usage is not None:
+            return getattr(self.usage, "total_tokens", None)
+        if self.answer_state != PENDING:
+            return estimated - (max_tokens or 0) + len(self.arrivals)
+        return None
+
+    def result(self) -> StreamResult:
+        latency = time.perf_counter() - self.t_start
+        server_timing = {}
+        for name in SERVER_TIMING_FIELDS:
+            value = getattr(self.usage, name, None)
+            if value is not None:
+                server_timing[name] = value
+        content = "".join(self.parts)
+        stopped_early = self.answer_state != PENDING
+        answer_state = None
+        if self.parser is not None:
+            answer_state = self.answer_state if stopped_early else self.parser.finish(content)
+        return StreamResult(
+            content,
+            latency,
+            ttft=self.arrivals[0] if self.arrivals else None,
+            token_gaps=[later - earlier for earlier, later in zip(self.arrivals, self.arrivals[1:])],
+            server_timing=server_timing,
+            answer_state=answer_state,
+            answer=self.parser.extract(content) if answer_state == COMPLETE else None,
+            stopped_early=stopped_early,
+        )
+
+
+def _extract_content(completion) -> str:
+    """Extrae el texto de la primera opción de una respuesta de chat."""
+    if not completion.choices:
+        raise ValueError("No se recibió respuesta de la API")
+
+    content = completion.choices[0].message.content
+    return content if content is not None else ""
+
+
+def _extract_top_logprobs(completion) -> List[Tuple[str, float]]:
+    """Extrae los tokens alternativos más probables del primer token generado."""
+    if not completion.choices:
+        raise ValueError("No se recibió respuesta de la API")
+
+    logprobs = completion.choices[0].logprobs
+    if logprobs is None or not logprobs.content:
+        raise ValueError("La API no devolvió logprobs para esta request")
+    return [(item.token, item.logprob) for item in logprobs.content[0].top_logprobs]
+
+
+def _usage_tokens(completion) -> Optional[int]:
+    """Tokens totales informados en el bloque `usage`, si existe."""
+    usage = getattr(completion, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _store_request(request: Dict[str, Any], parser: Optional[AnswerParser]) -> Dict[str, Any]:
+    """Request usada como clave del almacén: las respuestas cortadas por un parser van aparte."""
+    if parser is None:
+        return request
+    return {**request, "stop_parser": parser.key}
+
+
+class _TimedParser:
+    """Envuelve un AnswerParser y acumula el tiempo de sus llamadas."""
+
+    def __init__(self, parser: AnswerParser):
+        self.parser = parser
+        self.key = parser.key
+        self.seconds = 0.0
+
+    def _timed(self, method, text: str) -> str:
+        t_start = time.perf_counter()
+        try:
+            return method(text)
+        finally:
+            self.seconds += time.perf_counter() - t_start
+
+    def feed(self, text: str) -> str:
+        return self._timed(self.parser.feed, text)
+
+    def finish(self, text: str) -> str:
+        return self._timed(self.parser.finish, text)
+
+    def extract(self, text: str) -> str:
+        return self._timed(self.parser.extract, text)
+
+
+def _cached_stream_result(content: str, latency: Optional[float], parser: Optional[AnswerParser]) -> StreamResult:
+    if parser is None:
+        return StreamResult(content, latency, cached=True)
+    # El contenido guardado es el texto recibido hasta el corte, así que feed ya decide
+    answer_state = parser.feed(content)
+    if answer_state == PENDING:
+        answer_state = parser.finish(content)
+    answer = parser.extract(content) if answer_state == COMPLETE else None
+    return StreamResult(content, latency, cached=True, answer_state=answer_state, answer=answer)
+
+
+def _latency_key(request: Dict[str, Any], stream: bool = False, parser: Optional[AnswerParser] = None) -> str:
+    """Configuración de la request con la que se agrupan sus latencias."""
+    key = (f"{request['model']} temperature={request['temperature']} "
+           f"top_p={request['top_p']} max_tokens={request['max_tokens']}")
+    if request.get("logprobs"):
+        key += " logprobs"
+    if stream:
+        key += " stream"
+    if parser is not None:
+        key += " early_stop"
+    return key
+
+
+def _build_messages(prompt: str, system_message: Optional[str] = None) -> List[Dict[str, str]]:
+    """Arma la lista de mensajes para un prompt simple."""
+    messages = []
+
+    if system_message:
+        messages.append({"role": "system", "content": system_message})
+
+    messages.append({"role": "user", "content": prompt})
+
+    return messages
+
 
 class GroqClient:
     """Cliente para interactuar con el modelo llama-3.1-8b de Groq."""
-    
+
     DEFAULT_MODEL = "llama-3.1-8b-instant"
-    
-    def __init__(self, api_key: Optional[str] = None):
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        store: Optional[ResponseStore] = None,
+        store_mode: Optional[str] = None,
+        use_env_store: bool = True,
+        base_url: Optional[str] = None,
+        latency_recorder: Optional[LatencyRecorder] = None,
+        hooks: Optional[List[RequestHooks]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[TransportConfig] = None,
+        http_client: Union[httpx.Client, httpx.AsyncClient, None] = None,
+    ):
         """
         Inicializa el cliente de Groq.
-        
+
         Args:
             api_key: API key de Groq. Si no se provee, busca GROQ_API_KEY en el entorno.
+            rate_limiter: Limitador de tasa a usar. Por defecto se comparte uno por API key
+                entre todos los clientes del proceso.
+            store: Almacén de respuestas. Si no se provee y GROQ_STORE_PATH está definida,
+                se abre el almacén de esa ruta.
+            store_mode: "record", "replay" o "record-missing" (por defecto GROQ_STORE_MODE
+                o "record-missing"). En modo replay no hace falta API key.
+            use_env_store: Si es False, se ignoran GROQ_STORE_PATH y GROQ_STORE_MODE
+                (para mediciones que siempre tienen que llegar al servidor).
+            base_url: URL base de la API (por ejemplo, la de `stand_in_server`). Por defecto
+                la del SDK, que respeta GROQ_BASE_URL.
+            latency_recorder: Histogramas donde se registra la latencia de cada llamada a
+                la API, por configuración. Por defecto uno propio del cliente.
+            hooks: Hooks a llamar en cada intento de envío (ver hooks.py). Si
+                GROQ_TRACE_PATH está definida, se agrega un SpanExporter a esa ruta.
+            retry_policy: Reintentos por clase de error y backoff (ver retry.py).
+            circuit_breaker: Circuit breaker a usar. Por defecto se comparte uno por
+                API key entre todos los clientes del proceso, como el limitador.
+            transport: Pool, keep-alive, HTTP/2 y timeouts de la conexión (ver transport.py).
+            http_client: Cliente httpx ya creado, para compartir su pool entre varios
+                clientes; tiene precedencia sobre `transport` y no se cierra con `close`.
         """
-        self.api_key = api_key or os.getenv("GROQ_API_KEY")
-        if not self.api_key:
-            raise ValueError("Se debe proveer una API key o configurar GROQ_API_KEY como variable de entorno")
-        
-        self.client = Groq(api_key=self.api_key)
+        if use_env_store:
+            if store is None and os.getenv("GROQ_STORE_PATH"):
+                store = ResponseStore(os.environ["GROQ_STORE_PATH"])
+            store_mode = store_mode or os.getenv("GROQ_STORE_MODE")
+        self.store = store
+        self.store_mode = store_mode or RECORD_MISSING
+        if self.store_mode not in STORE_MODES:
+            raise ValueError(f"Modo de almacén inválido: {self.store_mode} (opciones: {', '.join(STORE_MODES)})")
+        if self.store_mode == REPLAY and self.store is None:
+            raise ValueError("El modo replay requiere un almacén de respuestas")
+
+        replay_only = self.store is not None and self.store_mode == REPLAY
+        self.api_key = api_key or os.getenv("GROQ_API_KEY") or ("replay" if replay_only else None)
+        self.api_key = _resolve_api_key(self.api_key)
+
+        # Los reintentos los maneja el cliente para que los 429 pasen por el limitador
+        self.base_url = base_url
+        self.transport = transport or TransportConfig()
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or self._create_http_client()
+        self.client = self._create_sdk_client()
         self.model = self.DEFAULT_MODEL
-    
+        self.rate_limiter = rate_limiter or RateLimiter.shared(self.api_key)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.shared(self.api_key)
+        self.last_latency: Optional[float] = None  # Duración de la última llamada sin contar esperas
+        self.latency_recorder = latency_recorder or LatencyRecorder()
+        self.hooks: List[RequestHooks] = list(hooks or [])
+        if os.getenv("GROQ_TRACE_PATH"):
+            self.hooks.append(SpanExporter(os.environ["GROQ_TRACE_PATH"]))
+        self._sample_counters: Dict[str, int] = {}
+
+    def _create_http_client(self) -> httpx.Client:
+        return self.transport.sync_client()
+
+    def _create_sdk_client(self):
+        return Groq(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=self.http_client)
+
+    def close(self) -> None:
+        """Cierra las conexiones HTTP del cliente (salvo que el cliente httpx sea compartido)."""
+        if self._owns_http_client:
+            self.client.close()
+
+    def _request_kwargs(self, messages, temperature, max_tokens, top_p) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+        }
+
+    def _store_lookup(self, request: Dict[str, Any], sample_index: Optional[int]):
+        """
+        Resuelve la clave de la request en el almacén y busca si ya está guardada.
+
+        Si no se indica `sample_index`, se usa la cantidad de veces que este cliente
+        ya envió la misma request, de modo que repetir una secuencia de llamadas
+        recorre las mismas muestras.
+
+        Returns:
+            Tupla (clave, índice de muestra, respuesta guardada o None); la clave es
+            None si el cliente no tiene almacén
+        """
+        if self.store is None:
+            return None, None, None
+
+        request_hash = ResponseStore.request_hash(request)
+        if sample_index is None:
+            sample_index = self._sample_counters.get(request_hash, 0)
+            self._sample_counters[request_hash] = sample_index + 1
+        key = ResponseStore.make_key(request_hash, sample_index)
+
+        cached = None if self.store_mode == RECORD else self.store.get(key)
+        if cached is None and self.store_mode == REPLAY:
+            raise ResponseNotRecordedError(f"No hay respuesta guardada para la muestra {sample_index} de la request")
+        return key, sample_index, cached
+
+    def _handle_completion(self, headers, completion, estimated_tokens: int, extract=_extract_content):
+        """Actualiza el limitador con los headers y el consumo real, y extrae el resultado."""
+        self.rate_limiter.update_from_headers(headers)
+        self.rate_limiter.settle(estimated_tokens, _usage_tokens(completion))
+        return extract(completion)
+
+    def _logprobs_request(self, messages: List[Dict[str, str]], top_logprobs: int) -> Dict[str, Any]:
+        # Temperatura 1 y top-p 1: los logprobs son los de la distribución base del modelo
+        request = self._request_kwargs(messages, 1.0, 1, 1.0)
+        request["logprobs"] = True
+        request["top_logprobs"] = top_logprobs
+        return request
+
     def chat(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 1.0,
         max_tokens: Optional[int] = None,
         top_p: float = 1.0,
+        sample_index: Optional[int] = None,
     ) -> str:
         """
         Envía una solicitud de chat al modelo.
-        
+
+        Antes de cada envío espera lo que indique el limitador de tasa. Ante un
+        429 pausa el limitador según `retry-after` y reintenta. Si el cliente
+        tiene almacén, la respuesta se sirve o se guarda según `store_mode`.
+
         Args:
             messages: Lista de mensajes con claves 'role' y 'content'
             temperature: Parámetro de temperatura para el muestreo (0-2)
             max_tokens: Cantidad máxima de tokens a generar
             top_p: Parámetro top-p para el muestreo
-            
+            sample_index: Índice de muestra para el almacén (por defecto, contador por request)
+
         Returns:
             Contenido de la respuesta del modelo como string
         """
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-        )
-        
-        if not completion.choices:
-            raise ValueError("No se recibió respuesta de la API")
-        
-        content = completion.choices[0].message.content
-        return content if content is not None else ""
-    
+        return self.chat_detailed(messages, temperature, max_tokens, top_p, sample_index).content
+
+    def chat_detailed(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 1.0,
+        max_tokens: Optional[int] = None,
+        top_p: float = 1.0,
+        sample_index: Optional[int] = None,
+    ) -> ChatResult:
+        """Igual que `chat`, pero devuelve un ChatResult con la latencia de la llamada."""
+        request = self._request_kwargs(messages, temperature, max_tokens, top_p)
+        key, sample_index, cached = self._store_lookup(request, sample_index)
+        if cached is not None:
+            content, self.last_latency = cached
+            return ChatResult(content, self.last_latency, cached=True)
+
+        content = self._call_api(request)
+        if key is not None:
+            self.store.put(key, request, sample_index, content, self.last_latency)
+        return ChatResult(content, self.last_latency)
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 1.0,
+        max_tokens: Optional[int] = None,
+        top_p: float = 1.0,
+        sample_index: Optional[int] = None,
+        parser: Optional[AnswerParser] = None,
+    ) -> StreamResult:
+        """
+        Igual que `chat_detailed`, pero recibe la respuesta en streaming para
+        descomponer la latencia: tiempo hasta el primer token (TTFT), tiempos
+        entre tokens y los tiempos que informa el servidor (cola, prompt y
+        generación). Comparte el almacén con `chat`; las respuestas guardadas
+        se devuelven sin descomposición.
+
+        Con un `parser` (ver api_client.parsers) el stream se cierra apenas la
+        respuesta queda decidida, sin esperar al resto de los tokens: el
+        contenido es el texto recibido hasta ese momento y `answer` la
+        respuesta normalizada, si es válida. Sus respuestas se guardan en el
+        almacén aparte de las completas.
+        """
+        request = self._request_kwargs(messages, temperature, max_tokens, top_p)
+        key, sample_index, cached = self._store_lookup(_store_request(request, parser), sample_index)
+        with self._timed_parser(parser) as parser:
+            if cached is not None:
+                content, self.last_latency = cached
+                return _cached_stream_result(content, self.last_latency, parser)
+
+            result = self._call_api_stream(request, parser)
+        if key is not None:
+            self.store.put(key, request, sample_index, result.content, result.latency)
+        return result
+
+    def _emit(self, hook_name: str, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            getattr(hook, hook_name)(event)
+
+    def _emit_phase(self, name: str, seconds: float) -> None:
+        for hook in self.hooks:
+            hook.on_phase(name, seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mide un bloque sincrónico (por ejemplo, el armado de filas) y lo informa a los hooks como `on_phase`."""
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._emit_phase(name, time.perf_counter() - t_start)
+
+    @contextmanager
+    def _timed_parser(self, parser: Optional[AnswerParser]):
+        """Parser que mide sus llamadas; al salir, el total se informa como la fase "parse"."""
+        if parser is None:
+            yield None
+            return
+        timed = _TimedParser(parser)
+        try:
+            yield timed
+        finally:
+            self._emit_phase("parse", timed.seconds)
+
+    def _retry_delay(self, error: Exception, estimated: int, retries: Dict[type, int]) -> Optional[float]:
+        """
+        Aplica la política de reintentos a un intento fallido.
+
+        Devuelve la espera antes de reintentar, o None si el error no se
+        reintenta. Un 429 pausa el limitador (la espera ocurre al reservar de
+        nuevo) y devuelve 0. `retries` lleva los reintentos por clase de error.
+        """
+        if isinstance(error, TRANSIENT_ERRORS):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+        rule = self.retry_policy.rule_for(error)
+        if rule is None:
+            return None
+        error_class, max_retries = rule
+
+        self.rate_limiter.refund(estimated)
+        retries[error_class] = retries.get(error_class, 0) + 1
+        if retries[error_class] > max_retries:
+            return None
+        if isinstance(error, RateLimitError) and self.retry_policy.respect_retry_after:
+            self.rate_limiter.pause(error.response.headers)
+            return 0.0
+        return self.retry_policy.backoff(retries[error_class], retry_after(error))
+
+    def _wait_before_send(self, estimated: int) -> Tuple[float, bool]:
+        """
+        Consulta al circuit breaker y, si deja pasar, reserva en el limitador.
+
+        Devuelve (segundos a dormir, si después se envía). Mientras el breaker
+        no deja pasar no se reserva nada y hay que volver a consultar.
+        """
+        breaker_wait = self.circuit_breaker.wait_time()
+        if breaker_wait > 0:
+            return breaker_wait, False
+        return max(self.rate_limiter.reserve(estimated), 0.0), True
+
+    def _send_with_retries(self, estimated: int, send, key: str):
+        """
+        Ejecuta `send()` después de esperar al circuit breaker y al limitador,
+        reintentando según la política (ante 429, según `retry-after`).
+        Cada intento se informa a los hooks como un evento.
+        """
+        request_id = next_request_id()
+        retries: Dict[type, int] = {}
+        wait = 0.0
+
+        while True:
+            pause, ready = self._wait_before_send(estimated)
+            if pause > 0:
+                time.sleep(pause)
+            wait += pause
+            if not ready:
+                continue
+
+            event = RequestEvent.start(request_id, key, sum(retries.values()) + 1, wait)
+            wait = 0.0
+            self._emit("before_request", event)
+            try:
+                response = send()
+            except Exception as e:
+                event.finish(e)
+                delay = self._retry_delay(e, estimated, retries)
+                if delay is None:
+                    self._emit("on_error", event)
+                    raise
+                event.retry_delay = delay
+                self._emit("on_retry", event)
+                if delay > 0:
+                    time.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            self._emit("after_response", event.finish())
+            return response
+
+    def _call_api(self, request: Dict[str, Any], extract=_extract_content):
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        def send():
+            t_start = time.perf_counter()
+            raw_response = self.client.chat.completions.with_raw_response.create(**request)
+            completion = raw_response.parse()
+            return raw_response.headers, completion, time.perf_counter() - t_start
+
+        key = _latency_key(request)
+        headers, completion, self.last_latency = self._send_with_retries(estimated, send, key)
+        self.latency_recorder.record(key, self.last_latency)
+        return self._handle_completion(headers, completion, estimated, extract)
+
+    def _call_api_stream(self, request: Dict[str, Any], parser: Optional[AnswerParser] = None) -> StreamResult:
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        def send():
+            collector = _StreamCollector(parser)
+            raw_response = self.client.chat.completions.with_raw_response.create(**request, stream=True)
+            # Al salir del bloque se cierra la conexión aunque queden tokens por llegar
+            with raw_response.parse() as stream:
+                for chunk in stream:
+                    if collector.add(chunk):
+                        break
+            return raw_response.headers, collector, collector.result()
+
+        key = _latency_key(request, stream=True, parser=parser)
+        headers, collector, result = self._send_with_retries(estimated, send, key)
+        self.last_latency = result.latency
+        self.latency_recorder.record(key, result.latency)
+        self.rate_limiter.update_from_headers(headers)
+        self.rate_limiter.settle(estimated, collector.total_tokens(estimated, request["max_tokens"]))
+        return result
+
+    def first_token_logprobs(
+        self, messages: List[Dict[str, str]], top_logprobs: int = 20
+    ) -> List[Tuple[str, float]]:
+        """
+        Pide los logprobs de los tokens más probables para el primer token de la respuesta.
+
+        La request se envía con temperatura 1, top-p 1 y un único token, así que
+        los logprobs corresponden a la distribución base del modelo; la inducida
+        por otra temperatura o top-p se reconstruye analíticamente. Con almacén,
+        se guarda como una única muestra (es determinística).
+
+        Args:
+            messages: Lista de mensajes con claves 'role' y 'content'
+            top_logprobs: Cantidad de tokens alternativos a pedir (máximo 20)
+
+        Returns:
+            Lista de tuplas (token, logprob) ordenada de mayor a menor probabilidad
+        """
+        request = self._logprobs_request(messages, top_logprobs)
+        key, sample_index, cached = self._store_lookup(request, 0)
+        if cached is not None:
+            return [tuple(item) for item in json.loads(cached[0])]
+
+        result = self._call_api(request, extract=_extract_top_logprobs)
+        if key is not None:
+            self.store.put(key, request, sample_index, json.dumps(result), self.last_latency)
+        return result
+
     def simple_prompt(self, prompt: str, system_message: Optional[str] = None) -> str:
         """
         Envía un prompt simple al modelo.
-        
+
         Args:
             prompt: Mensaje del usuario
             system_message: Mensaje de sistema opcional para contexto
-            
+
         Returns:
             Contenido de la respuesta del modelo como string
         """
-        messages = []
-        
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        
-        messages.append({"role": "user", "content": prompt})
-        
-        return self.chat(messages)
+        return self.chat(_build_messages(prompt, system_message))
+
+
+class AsyncGroqClient(GroqClient):
+    """
+    Versión asíncrona de GroqClient.
+
+    Permite tener varias requests en vuelo a la vez mediante `chat_many`,
+    en lugar de esperar cada respuesta antes de enviar la siguiente. Acepta
+    los mismos argumentos que GroqClient y comparte con los clientes
+    sincrónicos el limitador de tasa de la misma API key.
+    """
+
+    DEFAULT_MAX_IN_FLIGHT = 16
+
+    def __init__(self, *args, max_in_flight: Optional[int] = None, **kwargs):
+        """
+        Args:
+            max_in_flight: Tope global de llamadas simultáneas a la API para todo
+                el cliente (None = sin tope; `chat_many` aplica además el suyo).
+                Si no se indica `transport`, el pool se dimensiona para este tope.
+            *args, **kwargs: Los mismos argumentos que GroqClient
+        """
+        if max_in_flight and kwargs.get("transport") is None:
+            kwargs["transport"] = TransportConfig.for_concurrency(max_in_flight)
+        super().__init__(*args, **kwargs)
+        self._request_slots = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return self.transport.async_client()
+
+    def _create_sdk_client(self):
+        return AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=self.http_client)
+
+    async def __aenter__(self) -> "AsyncGroqClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Cierra las conexiones HTTP del cliente (salvo que el cliente httpx sea compartido)."""
+        if self._owns_http_client:
+            await self.client.close()
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 1.0,
+        max_tokens: Optional[int] = None,
+        top_p: float = 1.0,
+        sample_index: Optional[int] = None,
+    ) -> str:
+        """
+        Envía una solicitud de chat al modelo (ver GroqClient.chat).
+
+        Returns:
+            Contenido de la respuesta del modelo como string
+        """
+        return (await self.chat_detailed(messages, temperature, max_tokens, top_p, sample_index)).content
+
+    async def chat_detailed(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 1.0,
+        max_tokens: Optional[int] = None,
+        top_p: float = 1.0,
+        sample_index: Optional[int] = None,
+    ) -> ChatResult:
+        """
+        Igual que `chat`, pero devuelve un ChatResult con la latencia de esta
+        llamada (con varias requests en vuelo, `last_latency` es la de otra).
+        """
+        # La búsqueda en el almacén ocurre antes del primer await, así que el
+        # índice de muestra sigue el orden en que se crearon las tareas
+        request = self._request_kwargs(messages, temperature, max_tokens, top_p)
+        key, sample_index, cached = self._store_lookup(request, sample_index)
+        if cached is not None:
+            content, self.last_latency = cached
+            return ChatResult(content, self.last_latency, cached=True)
+
+        if self._request_slots is None:
+            content, latency = await self._call_api(request)
+        else:
+            async with self._request_slots:
+                content, latency = await self._call_api(request)
+        if key is not None:
+            self.store.put(key, request, sample_index, content, latency)
+        return ChatResult(content, latency)
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 1.0,
+        max_tokens: Optional[int] = None,
+        top_p: float = 1.0,
+        sample_index: Optional[int] = None,
+        parser: Optional[AnswerParser] = None,
+    ) -> StreamResult:
+        """Recibe la respuesta en streaming y descompone la latencia (ver GroqClient.chat_stream)."""
+        request = self._request_kwargs(messages, temperature, max_tokens, top_p)
+        key, sample_index, cached = self._store_lookup(_store_request(request, parser), sample_index)
+        with self._timed_parser(parser) as parser:
+            if cached is not None:
+                content, self.last_latency = cached
+                return _cached_stream_result(content, self.last_latency, parser)
+
+            if self._request_slots is None:
+                result = await self._call_api_stream(request, parser)
+            else:
+                async with self._request_slots:
+                    result = await self._call_api_stream(request, parser)
+        if key is not None:
+            self.store.put(key, request, sample_index, result.content, result.latency)
+        return result
+
+    async def _send_with_retries(self, estimated: int, send, key: str):
+        """Versión asíncrona de GroqClient._send_with_retries; `send` es una corrutina."""
+        request_id = next_request_id()
+        retries: Dict[type, int] = {}
+        wait = 0.0
+
+        while True:
+            pause, ready = self._wait_before_send(estimated)
+            if pause > 0:
+                await asyncio.sleep(pause)
+            wait += pause
+            if not ready:
+                continue
+
+            event = RequestEvent.start(request_id, key, sum(retries.values()) + 1, wait)
+            wait = 0.0
+            self._emit("before_request", event)
+            try:
+                response = await send()
+            except Exception as e:
+                event.finish(e)
+                delay = self._retry_delay(e, estimated, retries)
+                if delay is None:
+                    self._emit("on_error", event)
+                    raise
+                event.retry_delay = delay
+                self._emit("on_retry", event)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            self._emit("after_response", event.finish())
+            return response
+
+    async def _call_api(self, request: Dict[str, Any], extract=_extract_content) -> Tuple[Any, float]:
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        async def send():
+            t_start = time.perf_counter()
+            raw_response = await self.client.chat.completions.with_raw_response.create(**request)
+            completion = await raw_response.parse()
+            return raw_response.headers, completion, time.perf_counter() - t_start
+
+        key = _latency_key(request)
+        headers, completion, latency = await self._send_with_retries(estimated, send, key)
+        # Con varias requests en vuelo, last_latency es la de la última en terminar
+        self.last_latency = latency
+        self.latency_recorder.record(key, latency)
+        return self._handle_completion(headers, completion, estimated, extract), latency
+
+    async def _call_api_stream(self, request: Dict[str, Any], parser: Optional[AnswerParser] = None) -> StreamResult:
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        async def send():
+            collector = _StreamCollector(parser)
+            raw_response = await self.client.chat.completions.with_raw_response.create(**request, stream=True)
+            async with await raw_response.parse() as stream:
+                async for chunk in stream:
+                    if collector.add(chunk):
+                        break
+            return raw_response.headers, collector, collector.result()
+
+        key = _latency_key(request, stream=True, parser=parser)
+        headers, collector, result = await self._send_with_retries(estimated, send, key)
+        self.last_latency = result.latency
+        self.latency_recorder.record(key, result.latency)
+        self.rate_limiter.update_from_headers(headers)
+        self.rate_limiter.settle(estimated, collector.total_tokens(estimated, request["max_tokens"]))
+        return result
+
+    async def first_token_logprobs(
+        self, messages: List[Dict[str, str]], top_logprobs: int = 20
+    ) -> List[Tuple[str, float]]:
+        """Pide los logprobs del primer token (ver GroqClient.first_token_logprobs)."""
+        request = self._logprobs_request(messages, top_logprobs)
+        key, sample_index, cached = self._store_lookup(request, 0)
+        if cached is not None:
+            return [tuple(item) for item in json.loads(cached[0])]
+
+        if self._request_slots is None:
+            result, latency = await self._call_api(request, extract=_extract_top_logprobs)
+        else:
+            async with self._request_slots:
+                result, latency = await self._call_api(request, extract=_extract_top_logprobs)
+        if key is not None:
+            self.store.put(key, request, sample_index, json.dumps(result), latency)
+        return result
+
+    async def simple_prompt(self, prompt: str, system_message: Optional[str] = None) -> str:
+        """Envía un prompt simple al modelo (ver GroqClient.simple_prompt)."""
+        return await self.chat(_build_messages(prompt, system_message))
+
+    async def chat_many(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> AsyncIterator[Tuple[int, Union[str, Exception]]]:
+        """
+        Envía muchas solicitudes de chat con concurrencia acotada.
+
+        Las solicitudes se consumen de forma perezosa: nunca hay más de
+        `max_in_flight` en vuelo, por lo que `requests` puede ser un generador
+        arbitrariamente largo.
+
+        Args:
+            requests: Iterable de diccionarios con los argumentos de `chat`
+                (messages, temperature, max_tokens, top_p)
+            max_in_flight: Cantidad máxima de solicitudes simultáneas
+
+        Yields:
+            Tuplas (índice, resultado) en orden de finalización, donde índice es la
+            posición de la solicitud en `requests` y resultado es el contenido de la
+            respuesta o la excepción que produjo la llamada.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight debe ser al menos 1")
+
+        pending = set()
+        iterator = enumerate(requests)
+        exhausted = False
+
+        try:
+            while True:
+                # Completamos los lugares libres con nuevas solicitudes
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        index, request = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self._indexed_chat(index, request)))
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Si el consumidor corta la iteración, cancelamos lo que quedó en vuelo
+            for task in pending:
+                task.cancel()
+
+    async def _indexed_chat(self, index: int, request: Dict[str, Any]) -> Tuple[int, Union[str, Exception]]:
+        try:
+            return index, await self.chat(**request)
+        except Exception as e:
+            return index, e
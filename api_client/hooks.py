@@ -0,0 +1,110 @@
+"""
+Hooks sobre el camino de cada request a la API.
+
+Un hook es un objeto con los métodos de `RequestHooks` (todos opcionales de
+redefinir). El cliente los llama desde el ciclo de reintentos, así que cada
+intento de envío es un evento:
+
+- `before_request`: el intento está por enviarse (ya pasó la espera del limitador).
+- `after_response`: el intento terminó bien (para un stream, al cerrarlo).
+- `on_retry`: el intento falló y se va a reintentar.
+- `on_error`: el intento falló y el error se propaga al llamador.
+
+Aparte de los intentos, `on_phase` informa trabajo del proceso alrededor de
+las requests, medido con `GroqClient.phase` (por ejemplo, "parse": el parser
+de respuestas y el armado de filas de los experimentos).
+
+Las respuestas servidas desde el almacén no pasan por la API y no generan
+eventos de intento, pero su parseo sí se informa.
+"""
+
+import json
+import time
+import itertools
+import threading
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+_request_ids = itertools.count(1)
+
+
+@dataclass
+class RequestEvent:
+    """Un intento de envío de una request."""
+
+    request_id: int          # Igual para todos los intentos de una misma request
+    key: str                 # Configuración de la request (modelo y parámetros)
+    attempt: int             # 1 para el primer intento
+    wait: float              # Segundos esperando al limitador antes de este intento
+    started_at: float        # Epoch (s) del envío
+    duration: Optional[float] = None  # Segundos del intento, al terminar
+    error: Optional[str] = None       # Tipo de excepción si falló
+    # Backoff antes del próximo intento; la pausa por un 429 aparece en `wait` del siguiente
+    retry_delay: Optional[float] = None
+
+    @classmethod
+    def start(cls, request_id: int, key: str, attempt: int, wait: float) -> "RequestEvent":
+        event = cls(request_id, key, attempt, wait, time.time())
+        event._t_start = time.perf_counter()
+        return event
+
+    def finish(self, error: Optional[BaseException] = None) -> "RequestEvent":
+        self.duration = time.perf_counter() - self._t_start
+        self.error = type(error).__name__ if error is not None else None
+        return self
+
+
+def next_request_id() -> int:
+    return next(_request_ids)
+
+
+class RequestHooks:
+    """Base de los hooks: todos los métodos no hacen nada."""
+
+    def before_request(self, event: RequestEvent) -> None:
+        pass
+
+    def after_response(self, event: RequestEvent) -> None:
+        pass
+
+    def on_retry(self, event: RequestEvent) -> None:
+        pass
+
+    def on_error(self, event: RequestEvent) -> None:
+        pass
+
+    def on_phase(self, name: str, seconds: float) -> None:
+        pass
+
+
+class SpanExporter(RequestHooks):
+    """
+    Escribe un span por intento en un archivo JSONL.
+
+    Cada línea tiene los campos de `RequestEvent` más `status` ("ok", "retry"
+    o "error"). El archivo se abre en modo append, así que varios procesos o
+    ejecuciones pueden escribir en el mismo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def _write(self, event: RequestEvent, status: str) -> None:
+        line = json.dumps({**asdict(event), "status": status})
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def after_response(self, event: RequestEvent) -> None:
+        self._write(event, "ok")
+
+    def on_retry(self, event: RequestEvent) -> None:
+        self._write(event, "retry")
+
+    def on_error(self, event: RequestEvent) -> None:
+        self._write(event, "error")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
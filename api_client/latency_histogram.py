@@ -0,0 +1,223 @@
+"""
+Histogramas de latencia de memoria fija.
+
+Cada `LatencyHistogram` cuenta latencias en buckets de ancho logarítmico
+(al estilo de un histograma HDR): el bucket i cubre
+[min_value·g^i, min_value·g^(i+1)) con g = 1 + 2·precision, de modo que el
+punto medio de cada bucket está a menos de `precision` (relativo) de cualquier
+valor que cae en él. Con los valores por defecto (0.1 ms a 1 h, 1%) son unos
+900 contadores, sin importar cuántas requests se registren.
+
+Dos histogramas con los mismos parámetros se combinan sumando contadores, así
+que los snapshots de varios procesos (o de varias ejecuciones de un mismo
+experimento) se pueden unir sin perder precisión.
+"""
+
+import json
+import math
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+DEFAULT_MIN_VALUE = 1e-4    # Segundos; valores menores van al primer bucket
+DEFAULT_MAX_VALUE = 3600.0  # Segundos; valores mayores van al último bucket
+DEFAULT_PRECISION = 0.01    # Error relativo máximo de los percentiles
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets logarítmicos y memoria fija."""
+
+    def __init__(
+        self,
+        min_value: float = DEFAULT_MIN_VALUE,
+        max_value: float = DEFAULT_MAX_VALUE,
+        precision: float = DEFAULT_PRECISION,
+    ):
+        if not 0 < min_value < max_value:
+            raise ValueError("Se requiere 0 < min_value < max_value")
+        if not 0 < precision < 0.5:
+            raise ValueError("La precisión debe estar entre 0 y 0.5")
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self._log_growth = math.log1p(2 * precision)
+        n_buckets = math.ceil(math.log(max_value / min_value) / self._log_growth) + 1
+        self.counts = [0] * n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value) / self._log_growth)
+        return min(index, len(self.counts) - 1)
+
+    def record(self, value: float, count: int = 1) -> None:
+        """Registra `count` ocurrencias de una latencia (en segundos)."""
+        self.counts[self._bucket(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def record_many(self, values) -> None:
+        """Registra un array de latencias de una vez (para cargar resultados por bloques)."""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        ratios = np.maximum(values / self.min_value, 1.0)
+        indices = np.minimum((np.log(ratios) / self._log_growth).astype(np.int64), len(self.counts) - 1)
+        for index, bucket_count in zip(*np.unique(indices, return_counts=True)):
+            self.counts[index] += int(bucket_count)
+        self.count += len(values)
+        self.total += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Percentil p (0–100) con error relativo menor a `precision`.
+
+        Se devuelve el punto medio geométrico del bucket, acotado al mínimo y
+        máximo observados (que se guardan exactos).
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                midpoint = self.min_value * math.exp((index + 0.5) * self._log_growth)
+                return min(max(midpoint, self.min), self.max)
+        return self.max
+
+    def percentiles(self, ps: Iterable[float] = REPORTED_PERCENTILES) -> Dict[str, Optional[float]]:
+        """Percentiles por nombre ("p50", "p99.9", ...)."""
+        return {f"p{p:g}": self.percentile(p) for p in ps}
+
+    def _check_compatible(self, other: "LatencyHistogram") -> None:
+        params = (self.min_value, self.max_value, self.precision)
+        if params != (other.min_value, other.max_value, other.precision):
+            raise ValueError("Sólo se pueden combinar histogramas con los mismos parámetros")
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Suma los contadores de `other` a este histograma y lo devuelve."""
+        self._check_compatible(other)
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def to_dict(self) -> Dict:
+        """Snapshot serializable a JSON (sólo los buckets no vacíos)."""
+        return {
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "precision": self.precision,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(index): c for index, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        histogram = cls(data["min_value"], data["max_value"], data["precision"])
+        for index, bucket_count in data["buckets"].items():
+            histogram.counts[int(index)] = bucket_count
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class LatencyRecorder:
+    """
+    Un `LatencyHistogram` por configuración de request (modelo y parámetros).
+
+    Es seguro usarlo desde varios hilos; el cliente asíncrono lo usa desde un
+    único event loop.
+    """
+
+    def __init__(self, **histogram_params):
+        self.histogram_params = histogram_params
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, latency: float) -> None:
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram(**self.histogram_params)
+            self.histograms[key].record(latency)
+
+    def merge(self, other: "LatencyRecorder") -> "LatencyRecorder":
+        with self._lock:
+            for key, histogram in other.histograms.items():
+                if key in self.histograms:
+                    self.histograms[key].merge(histogram)
+                else:
+                    self.histograms[key] = LatencyHistogram.from_dict(histogram.to_dict())
+        return self
+
+    def summary(self, ps: Iterable[float] = REPORTED_PERCENTILES) -> Dict[str, Dict]:
+        """Cantidad, media, máximo y percentiles de cada configuración."""
+        ps = tuple(ps)
+        with self._lock:
+            return {
+                key: {"count": h.count, "mean": h.mean, **h.percentiles(ps), "max": h.max}
+                for key, h in self.histograms.items()
+            }
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Parámetros de los histogramas nuevos y snapshot de cada histograma, serializable a JSON."""
+        with self._lock:
+            return {
+                "histogram_params": dict(self.histogram_params),
+                "histograms": {key: histogram.to_dict() for key, histogram in self.histograms.items()},
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Dict]) -> "LatencyRecorder":
+        """
+        Reconstruye un recorder, con los mismos parámetros para las claves nuevas.
+
+        Acepta también el formato anterior (sólo los histogramas por clave): los
+        parámetros se toman entonces del primer histograma guardado.
+        """
+        if "histograms" in snapshot and "histogram_params" in snapshot:
+            histogram_params, histograms = snapshot["histogram_params"], snapshot["histograms"]
+        else:
+            histograms = snapshot
+            first = next(iter(histograms.values()), None)
+            histogram_params = {} if first is None else {
+                name: first[name] for name in ("min_value", "max_value", "precision")
+            }
+        recorder = cls(**histogram_params)
+        recorder.histograms = {key: LatencyHistogram.from_dict(data) for key, data in histograms.items()}
+        return recorder
+
+    def save(self, path: str) -> None:
+        """Escribe el snapshot en JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyRecorder":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_snapshot(json.load(f))
@@ -0,0 +1,139 @@
+"""
+Parsers incrementales de respuestas cortas.
+
+Los experimentos piden un número, un año o una letra, pero sin streaming hay
+que esperar la respuesta completa (hasta `max_tokens`). Con un parser,
+`chat_stream` revisa el texto acumulado después de cada chunk y cierra el
+stream apenas la respuesta queda decidida:
+
+- PENDING: todavía no se puede decidir; se sigue leyendo.
+- COMPLETE: la respuesta empieza con una respuesta válida y ya completa.
+- INVALID: la respuesta ya no puede ser válida.
+
+Con COMPLETE, `extract` devuelve la respuesta normalizada ("42", "1713", "B"),
+aunque el texto recibido siga con otras palabras ("1713 fue el año...").
+
+Los parsers no guardan estado entre llamadas, así que una misma instancia se
+puede compartir entre requests concurrentes.
+"""
+
+import re
+import string
+from typing import Optional
+
+PENDING = "pending"
+COMPLETE = "complete"
+INVALID = "invalid"
+
+
+class AnswerParser:
+    """Base de los parsers incrementales."""
+
+    def feed(self, text: str) -> str:
+        """
+        Evalúa el texto recibido hasta el momento.
+
+        Args:
+            text: Texto acumulado de la respuesta
+
+        Returns:
+            PENDING, COMPLETE o INVALID
+        """
+        raise NotImplementedError
+
+    def finish(self, text: str) -> str:
+        """Estado final cuando el stream terminó sin que `feed` decidiera."""
+        state = self.feed(text + "\n")
+        return INVALID if state == PENDING else state
+
+    def extract(self, text: str) -> str:
+        """Respuesta normalizada de un texto cuyo estado es COMPLETE."""
+        raise NotImplementedError
+
+    @property
+    def key(self) -> str:
+        """Identificador del parser y sus parámetros (separa sus muestras en el almacén)."""
+        params = ",".join(f"{name}={value!r}" for name, value in sorted(vars(self).items()))
+        return f"{type(self).__name__}({params})"
+
+
+class DigitsParser(AnswerParser):
+    """
+    Un número entero, como en el Capítulo 1.
+
+    La respuesta está completa cuando a los dígitos les sigue un espacio o uno
+    de los `terminators`, y es inválida si empieza con otra cosa o si a los
+    dígitos les sigue cualquier otro carácter.
+    """
+
+    def __init__(self, min_digits: int = 1, max_digits: Optional[int] = None, terminators: str = ""):
+        self.min_digits = min_digits
+        self.max_digits = max_digits
+        self.terminators = terminators
+
+    def feed(self, text: str) -> str:
+        stripped = text.lstrip()
+        if not stripped:
+            return PENDING
+
+        digits = re.match(r"\d*", stripped).group()
+        if not digits or (self.max_digits is not None and len(digits) > self.max_digits):
+            return INVALID
+
+        rest = stripped[len(digits):]
+        if not rest:
+            return PENDING
+        if len(digits) < self.min_digits:
+            return INVALID
+        return COMPLETE if rest[0] in string.whitespace or rest[0] in self.terminators else INVALID
+
+    def extract(self, text: str) -> str:
+        return re.match(r"\s*(\d+)", text).group(1)
+
+
+class YearParser(DigitsParser):
+    """Un año de cuatro dígitos, opcionalmente seguido de punto, como en el Capítulo 2."""
+
+    def __init__(self):
+        super().__init__(min_digits=4, max_digits=4, terminators=".")
+
+
+class LetterParser(AnswerParser):
+    """
+    Una opción de una sola letra (A–D), con el mismo criterio que `clean_response`
+    del Capítulo 4: se acepta una única letra aislada, sin distinguir mayúsculas.
+
+    La respuesta está completa en cuanto empieza con una opción en mayúscula
+    seguida de un carácter que no es letra ni número ("A", "B.", "C)"); en
+    minúscula podría ser la preposición "a". Si empieza de otra forma se sigue
+    leyendo, porque "La respuesta es B" también es válida; se corta como
+    inválida al aparecer una segunda letra aislada.
+    """
+
+    def __init__(self, choices: str = "ABCD"):
+        self.choices = choices
+
+    def _isolated_letters(self, text: str):
+        return re.findall(rf"\b([{self.choices}])\b", text)
+
+    def _leading_choice(self, text: str) -> bool:
+        stripped = text.lstrip()
+        return len(stripped) >= 2 and stripped[0] in self.choices and not stripped[1].isalnum()
+
+    def feed(self, text: str) -> str:
+        if self._leading_choice(text):
+            return COMPLETE
+
+        # La última palabra puede estar incompleta ("A" puede seguir como "Algo")
+        decided = re.sub(r"\w+$", "", text.upper())
+        return INVALID if len(self._isolated_letters(decided)) >= 2 else PENDING
+
+    def finish(self, text: str) -> str:
+        if self._leading_choice(text + "\n"):
+            return COMPLETE
+        return COMPLETE if len(self._isolated_letters(text.upper())) == 1 else INVALID
+
+    def extract(self, text: str) -> str:
+        if self._leading_choice(text + "\n"):
+            return text.lstrip()[0]
+        return self._isolated_letters(text.upper())[0]
@@ -0,0 +1,249 @@
+"""
+Limitador de tasa adaptativo para la API de Groq.
+
+Mantiene buckets de requests y de tokens que se sincronizan con los headers
+`x-ratelimit-*` de cada respuesta y con `retry-after` de las respuestas 429,
+de modo que las llamadas se espacien justo al ritmo permitido por la cuenta.
+"""
+
+import re
+import time
+import threading
+from typing import Optional, Dict, List, Mapping
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte una duración de Groq ("2m59.56s", "7.66s", "120ms" o "3") a segundos.
+
+    Returns:
+        Duración en segundos, o None si el valor no se puede interpretar
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Bucket de capacidad fija que se recarga a tasa constante.
+
+    Las reservas descuentan del nivel aunque quede negativo: el déficit indica
+    cuánto hay que esperar (déficit / tasa) antes de poder usar lo reservado.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Reserva `amount` unidades y devuelve los segundos a esperar antes de usarlas."""
+        self._refill(now)
+        self.level -= amount
+        if self.level >= 0 or self.refill_per_second <= 0:
+            return 0.0
+        return -self.level / self.refill_per_second
+
+    def refund(self, amount: float, now: float) -> None:
+        """Devuelve unidades reservadas que finalmente no se usaron."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(
+        self,
+        now: float,
+        limit: Optional[int] = None,
+        remaining: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Ajusta el bucket con lo informado por el servidor.
+
+        La tasa de recarga se estima como (limit - remaining) / reset, que es lo
+        que el servidor tarda en reponer lo consumido. El nivel sólo se baja:
+        subirlo descartaría reservas de requests que todavía están en vuelo.
+        """
+        self._refill(now)
+        if limit is not None and limit > 0:
+            self.capacity = float(limit)
+            if remaining is not None and reset_seconds and remaining < limit:
+                self.refill_per_second = (limit - remaining) / reset_seconds
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    """
+    Limitador compartido por todos los clientes que usan la misma API key.
+
+    Combina un bucket de requests y uno de tokens aprendidos de los headers de
+    Groq, un bucket opcional de requests por minuto configurado a mano (Groq no
+    informa el RPM en los headers) y una pausa global cuando llega un 429.
+    Es thread-safe y no bloquea: `reserve` devuelve cuánto esperar y cada
+    cliente duerme con `time.sleep` o `asyncio.sleep` según corresponda.
+    """
+
+    # Groq informa el límite de requests por día y el de tokens por minuto
+    REQUEST_WINDOW_SECONDS = 86400.0
+    TOKEN_WINDOW_SECONDS = 60.0
+
+    _shared: Dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        """
+        Args:
+            requests_per_minute: Límite de requests por minuto de la cuenta, si se conoce
+            tokens_per_minute: Límite inicial de tokens por minuto, hasta recibir headers
+        """
+        self._lock = threading.Lock()
+        self.rpm: Optional[TokenBucket] = None
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        self.paused_until = 0.0
+
+        if requests_per_minute:
+            self.rpm = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / self.TOKEN_WINDOW_SECONDS)
+
+    @classmethod
+    def shared(cls, key: str) -> "RateLimiter":
+        """Devuelve el limitador del proceso asociado a `key` (por ejemplo, la API key)."""
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls()
+            return cls._shared[key]
+
+    def _buckets(self) -> List[TokenBucket]:
+        return [bucket for bucket in (self.rpm, self.requests) if bucket is not None]
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserva capacidad para una request que consumirá aproximadamente `tokens`.
+
+        Returns:
+            Segundos que hay que esperar antes de enviar la request
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            for bucket in self._buckets():
+                wait = max(wait, bucket.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def refund(self, tokens: int) -> None:
+        """Devuelve una reserva cuya request no llegó a consumir cuota (por ejemplo, un 429)."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets():
+                bucket.refund(1, now)
+            if self.tokens is not None:
+                self.tokens.refund(tokens, now)
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Corrige el bucket de tokens con el consumo real informado en `usage`."""
+        if actual_tokens is None or self.tokens is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.tokens.refund(difference, now)
+            else:
+                self.tokens.reserve(-difference, now)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Sincroniza los buckets con los headers `x-ratelimit-*` de una respuesta."""
+        with self._lock:
+            now = time.monotonic()
+
+            limit = _parse_int(headers.get("x-ratelimit-limit-requests"))
+            if limit:
+                if self.requests is None:
+                    self.requests = TokenBucket(limit, limit / self.REQUEST_WINDOW_SECONDS)
+                self.requests.sync(
+                    now,
+                    limit=limit,
+                    remaining=_parse_int(headers.get("x-ratelimit-remaining-requests")),
+                    reset_seconds=parse_duration(headers.get("x-ratelimit-reset-requests")),
+                )
+
+            limit = _parse_int(headers.get("x-ratelimit-limit-tokens"))
+            if limit:
+                if self.tokens is None:
+                    self.tokens = TokenBucket(limit, limit / self.TOKEN_WINDOW_SECONDS)
+                self.tokens.sync(
+                    now,
+                    limit=limit,
+                    remaining=_parse_int(headers.get("x-ratelimit-remaining-tokens")),
+                    reset_seconds=parse_duration(headers.get("x-ratelimit-reset-tokens")),
+                )
+
+    def pause(self, headers: Mapping[str, str], default_seconds: float = 1.0) -> float:
+        """
+        Pausa a todos los usuarios del limitador tras un 429.
+
+        Usa `retry-after` si está presente y, si no, el mayor de los tiempos de
+        reset informados (o `default_seconds`).
+
+        Returns:
+            Duración de la pausa en segundos
+        """
+        self.update_from_headers(headers)
+
+        seconds = parse_duration(headers.get("retry-after"))
+        if seconds is None:
+            resets = [
+                parse_duration(headers.get("x-ratelimit-reset-requests")),
+                parse_duration(headers.get("x-ratelimit-reset-tokens")),
+            ]
+            resets = [reset for reset in resets if reset is not None]
+            seconds = max(resets) if resets else default_seconds
+
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        return seconds
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    """
+    Estima los tokens que consumirá una request (≈ 4 caracteres por token de
+    prompt más el máximo de tokens a generar). El estimado se corrige luego
+    con `RateLimiter.settle`.
+    """
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + 1 + (max_tokens or 0)
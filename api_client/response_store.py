@@ -0,0 +1,110 @@
+"""
+Almacén de respuestas direccionado por contenido para GroqClient.
+
+Cada llamada se identifica por el hash de modelo + mensajes + parámetros de
+muestreo + índice de muestra, y se guarda en una base SQLite local. Esto
+permite re-ejecutar experimentos completos sin red y de forma determinística.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, Any, Tuple
+
+RECORD = "record"                  # Siempre llama a la API y guarda la respuesta
+REPLAY = "replay"                  # Sólo sirve respuestas guardadas, nunca llama a la API
+RECORD_MISSING = "record-missing"  # Sirve lo guardado y llama a la API sólo para lo que falta
+MODES = (RECORD, REPLAY, RECORD_MISSING)
+
+
+class ResponseNotRecordedError(LookupError):
+    """Se pidió en modo replay una respuesta que no está en el almacén."""
+
+
+class ResponseStore:
+    """Almacén SQLite de respuestas de chat, seguro para usar desde varios hilos."""
+
+    def __init__(self, path: str):
+        """
+        Abre (o crea) el almacén.
+
+        Args:
+            path: Ruta del archivo SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL permite leer mientras se escribe y hace baratos los commits por fila
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                sample_index INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                latency_seconds REAL,
+                recorded_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def request_hash(request: Dict[str, Any]) -> str:
+        """Hash del contenido de una request (modelo, mensajes y parámetros de muestreo)."""
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(request_hash: str, sample_index: int) -> str:
+        """Clave de una muestra concreta de una request."""
+        return f"{request_hash}:{sample_index}"
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        """
+        Busca una respuesta guardada.
+
+        Returns:
+            Tupla (contenido, latencia registrada) o None si la clave no existe
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, latency_seconds FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def put(
+        self,
+        key: str,
+        request: Dict[str, Any],
+        sample_index: int,
+        content: str,
+        latency_seconds: Optional[float] = None,
+    ) -> None:
+        """Guarda (o reemplaza) la respuesta asociada a `key`."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(request, ensure_ascii=False),
+                    sample_index,
+                    content,
+                    latency_seconds,
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        """Cierra la conexión con la base."""
+        with self._lock:
+            self._connection.close()
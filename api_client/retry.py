@@ -0,0 +1,215 @@
+"""
+Política de reintentos y circuit breaker del cliente.
+
+`RetryPolicy` decide, para cada error, si se reintenta y cuánto esperar:
+
+- Reglas por clase de error: cantidad máxima de reintentos de cada clase
+  (los errores sin regla, como un 400, no se reintentan).
+- Backoff exponencial con jitter (`full`: uniforme entre 0 y el tope del
+  intento; `equal`: la mitad fija y la otra mitad aleatoria; `none`).
+- `retry-after`: un 429 pausa el limitador de tasa el tiempo indicado (así
+  esperan todos los workers, no sólo el que lo recibió); en otros errores
+  el header es una espera mínima.
+
+`CircuitBreaker` observa las fallas del servicio (errores transitorios, no
+los 429, que ya maneja el limitador). Si en la ventana de las últimas
+requests la fracción de fallas supera el umbral, se abre y todos los workers
+que lo comparten esperan `cooldown` segundos antes de enviar, en lugar de
+gastar reintentos contra un servicio caído. Al vencer la espera pasa a
+semiabierto y deja pasar una sola request de prueba; el resto sigue esperando
+hasta que la prueba lo cierra (éxito) o lo vuelve a abrir con el doble de
+espera (falla). Si la prueba termina sin veredicto (un 429 o un error que no
+es del servicio) o no responde en `probe_timeout`, pasa otra.
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple, Type
+
+import httpx
+from groq import RateLimitError, APIConnectionError, InternalServerError
+
+from .rate_limiter import parse_duration
+
+# Un corte a mitad de un stream llega como error de httpx, no del SDK
+TRANSIENT_ERRORS = (APIConnectionError, InternalServerError, httpx.TransportError)
+
+DEFAULT_MAX_RETRIES: Dict[Type[BaseException], int] = {
+    RateLimitError: 8,        # Esperando lo que indique el limitador
+    APIConnectionError: 2,    # Incluye timeouts
+    InternalServerError: 2,   # 5xx
+    httpx.TransportError: 2,  # Corte de la conexión durante un stream
+}
+JITTER_MODES = ("full", "equal", "none")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Cada cuánto vuelven a consultar los que esperan el resultado de la prueba
+PROBE_POLL_INTERVAL = 0.25
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Segundos del header `retry-after` de la respuesta de error, si lo hay."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    return parse_duration(response.headers.get("retry-after"))
+
+
+class RetryPolicy:
+    """Reintentos por clase de error con backoff exponencial y jitter."""
+
+    def __init__(
+        self,
+        max_retries: Optional[Dict[Type[BaseException], int]] = None,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        jitter: str = "full",
+        respect_retry_after: bool = True,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_retries: Reintentos máximos por clase de error; se usa la primera
+                clase (en orden de inserción) de la que el error es instancia
+            backoff_base: Espera base (s) del primer reintento; se duplica en cada uno
+            backoff_cap: Espera máxima (s) de un reintento
+            jitter: "full", "equal" o "none"
+            respect_retry_after: Pausar el limitador según `retry-after` ante un 429
+            seed: Semilla del jitter (None = no reproducible)
+        """
+        if jitter not in JITTER_MODES:
+            raise ValueError(f"Jitter inválido: {jitter} (opciones: {', '.join(JITTER_MODES)})")
+        self.max_retries = dict(DEFAULT_MAX_RETRIES if max_retries is None else max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def rule_for(self, error: BaseException) -> Optional[Tuple[Type[BaseException], int]]:
+        """Clase de error que aplica y su máximo de reintentos, o None si no se reintenta."""
+        for error_class, max_retries in self.max_retries.items():
+            if isinstance(error, error_class):
+                return error_class, max_retries
+        return None
+
+    def backoff(self, retry: int, minimum: Optional[float] = None) -> float:
+        """Espera antes del reintento número `retry` (desde 1) de una misma clase de error."""
+        ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (retry - 1))
+        with self._lock:
+            if self.jitter == "full":
+                delay = self._random.uniform(0, ceiling)
+            elif self.jitter == "equal":
+                delay = ceiling / 2 + self._random.uniform(0, ceiling / 2)
+            else:
+                delay = ceiling
+        return max(delay, minimum or 0.0)
+
+
+class CircuitBreaker:
+    """Pausa a todos sus usuarios cuando la tasa de fallas del servicio se dispara."""
+
+    _shared: Dict[str, "CircuitBreaker"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        window: int = 20,
+        failure_threshold: float = 0.5,
+        min_requests: int = 10,
+        cooldown: float = 5.0,
+        max_cooldown: float = 120.0,
+        probe_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            window: Cantidad de resultados recientes que se observan
+            failure_threshold: Fracción de fallas en la ventana que abre el circuito
+            min_requests: Resultados mínimos en la ventana antes de poder abrirlo
+            cooldown: Espera (s) al abrirse por primera vez
+            max_cooldown: Espera máxima (s) tras fallas repetidas en semiabierto
+            probe_timeout: Tiempo (s) tras el cual, si la request de prueba no
+                informó su resultado, se deja pasar otra
+        """
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trips = 0  # Veces que se abrió
+        self._outcomes: deque = deque(maxlen=window)
+        self._probe_started: Optional[float] = None  # Prueba en vuelo (semiabierto)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key: str) -> "CircuitBreaker":
+        """Devuelve el circuit breaker del proceso asociado a `key` (por ejemplo, la API key)."""
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls()
+            return cls._shared[key]
+
+    def wait_time(self) -> float:
+        """
+        Segundos que hay que esperar antes de volver a consultar; 0 si se puede enviar.
+
+        En semiabierto, el primero que obtiene 0 es la request de prueba: debe
+        informar su resultado con `record_success`, `record_failure` o `release`.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.open_until - now
+                if remaining > 0:
+                    return remaining
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self._probe_started is not None and now - self._probe_started < self.probe_timeout:
+                return min(PROBE_POLL_INTERVAL, self._probe_started + self.probe_timeout - now)
+            self._probe_started = now
+            return 0.0
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.open_until = time.monotonic() + self.cooldown
+        self.trips += 1
+        self._outcomes.clear()
+        self._probe_started = None
+
+    def release(self) -> None:
+        """Informa una request que terminó sin decir nada del servicio; en semiabierto deja pasar otra prueba."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_started = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self._probe_started = None
+            self._outcomes.append(False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                return  # Requests enviadas antes de abrirse; ya se está esperando
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+                return
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.failure_threshold:
+                self._open()
@@ -0,0 +1,308 @@
+"""
+Cliente simulado, sin red, ajustado a los resultados de los experimentos.
+
+`SimulatedClient` es un AsyncGroqClient que no llama a la API: cada respuesta
+se sortea de una distribución categórica ajustada a un archivo de resultados
+(por temperatura y top-p, si el archivo las tiene) y cada latencia de las
+latencias observadas.
+
+Para una (temperatura, top-p) que no está en el archivo se reescala una
+distribución base con las mismas reglas que capitulo_4.logprobs:
+p_T(x) ∝ p(x)^(1/T) y después el truncamiento top-p. La base se despeja de la
+configuración ajustada con mayor top-p y, entre ésas, mayor temperatura (la
+que más respuestas distintas muestra): p(x) ∝ p_T(x)^T. Las respuestas que
+nunca se observaron quedan con probabilidad 0. Si el archivo no tiene una
+configuración con temperatura positiva, se usa la distribución de todas las
+configuraciones juntas, con un aviso. Como reemplaza sólo el envío, todo lo demás funciona
+igual que contra la API: `chat`, `chat_detailed`, `chat_stream` con parsers,
+`first_token_logprobs`, `chat_many`, los hooks y los histogramas de latencia.
+
+Las latencias se informan pero no se esperan (salvo con `time_scale > 0`), así
+que un experimento corre tan rápido como lo permite el propio código. Los
+sorteos se hacen con NumPy en bloques, con una semilla fija: la misma
+secuencia de llamadas produce las mismas respuestas. Para generar millones de
+respuestas sin pasar por el cliente, `SimulatedModel.sample` devuelve arrays.
+"""
+
+import asyncio
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .groq_client import AsyncGroqClient, StreamResult, _latency_key, _extract_content
+from .parsers import AnswerParser, PENDING, COMPLETE
+from .rate_limiter import RateLimiter, estimate_tokens
+from .retry import CircuitBreaker
+from .stand_in_server import PROMPT_SHARE, DEFAULT_ANSWER, _split_tokens
+
+ANSWER_COLUMNS = ("response", "response_text", "responses")  # Caps. 4, 2 y 1
+LATENCY_KINDS = ("empirical", "exponential")
+DEFAULT_LATENCY = 0.3  # Segundos, si no hay latencias de las que ajustar
+BLOCK_SIZE = 4096      # Sorteos por bloque en el camino de a una request
+
+
+class SimulatedModel:
+    """Distribuciones de respuestas (por configuración) y de latencias."""
+
+    def __init__(
+        self,
+        answers: Optional[Dict[Optional[Tuple[float, float]], Dict[str, int]]] = None,
+        latencies: Optional[np.ndarray] = None,
+        latency_kind: str = "empirical",
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            answers: Conteos de cada respuesta por (temperatura, top-p); la clave
+                None agrupa las respuestas sin configuración
+            latencies: Latencias observadas (s)
+            latency_kind: "empirical" (remuestreo) o "exponential" (media muestral)
+            seed: Semilla del generador
+        """
+        if latency_kind not in LATENCY_KINDS:
+            raise ValueError(f"Distribución de latencia desconocida: {latency_kind}")
+        self.rng = np.random.default_rng(seed)
+        self.latency_kind = latency_kind
+        self.latencies = np.asarray(latencies if latencies is not None and len(latencies) else [DEFAULT_LATENCY],
+                                    dtype=float)
+
+        # Por configuración: (valores, probabilidades acumuladas)
+        self.by_config: Dict[Tuple[float, float], Tuple[np.ndarray, np.ndarray]] = {}
+        pooled: Dict[str, int] = {}
+        for config, counts in (answers or {}).items():
+            for value, count in counts.items():
+                pooled[value] = pooled.get(value, 0) + count
+            if config is not None:
+                self.by_config[config] = self._categorical(counts)
+        self.pooled = self._categorical(pooled or {DEFAULT_ANSWER: 1})
+        self.base = self._base_distribution()
+        self._rescaled: Dict[Tuple[float, float], Tuple[np.ndarray, np.ndarray]] = {}
+        self._buffers: Dict[Any, Tuple[np.ndarray, int]] = {}
+
+    @staticmethod
+    def _categorical(counts: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.array(list(counts), dtype=object)
+        weights = np.array(list(counts.values()), dtype=float)
+        cdf = np.cumsum(weights) / weights.sum()
+        cdf[-1] = 1.0
+        return values, cdf
+
+    def _base_distribution(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(valores, log-probabilidades) a temperatura 1 y top-p 1, o None si no hay de dónde despejarla."""
+        candidates = [config for config in self.by_config if config[0] > 0]
+        if not candidates:
+            return None
+        temperature, top_p = max(candidates, key=lambda config: (config[1], config[0]))
+        values, cdf = self.by_config[(temperature, top_p)]
+        logprobs = temperature * np.log(np.diff(cdf, prepend=0.0))
+        return values, logprobs - np.logaddexp.reduce(logprobs)
+
+    def _rescale(self, temperature: float, top_p: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Distribución base llevada a (temperatura, top-p), como `capitulo_4.logprobs.induced_distribution`."""
+        values, logprobs = self.base
+        if temperature <= 0:
+            # Greedy: siempre la respuesta más probable
+            return values[[int(np.argmax(logprobs))]], np.array([1.0])
+        scaled = logprobs / temperature
+        probs = np.exp(scaled - scaled.max())
+        probs /= probs.sum()
+        # Top-p: el menor prefijo (por probabilidad decreciente) cuya masa alcanza top_p
+        order = np.argsort(-probs, kind="stable")
+        mass_before = np.cumsum(probs[order]) - probs[order]
+        kept = order[mass_before < top_p]
+        return self._categorical(dict(zip(values[kept], probs[kept])))
+
+    @classmethod
+    def from_results(
+        cls,
+        answers_from: Optional[str] = None,
+        latency_from: Optional[str] = None,
+        latency_kind: str = "empirical",
+        seed: Optional[int] = None,
+    ) -> "SimulatedModel":
+        """
+        Ajusta el modelo a archivos de resultados (Parquet o CSV).
+
+        Las respuestas se toman de la columna `response` (Cap. 4),
+        `response_text` (Cap. 2) o `responses` (Cap. 1); las filas "ERROR" no
+        cuentan, pero "INVALID" sí, para conservar la tasa de inválidas (igual
+        que `stand_in_server.AnswerModel`). Las latencias son las
+        `latency_seconds` de las requests exitosas.
+        """
+        from results_io import read_results, result_columns
+
+        answers: Dict[Optional[Tuple[float, float]], Dict[str, int]] = {}
+        if answers_from is not None:
+            columns = result_columns(answers_from)
+            column = next((name for name in ANSWER_COLUMNS if name in columns), None)
+            if column is not None:
+                config_columns = [name for name in ("temperature", "top_p") if name in columns]
+                df = read_results(answers_from, columns=[column] + config_columns)
+                if column == "responses":
+                    df = df.explode(column)
+                df = df[df[column].notna()]
+                df = df[df[column].astype(str) != "ERROR"]
+                if len(config_columns) == 2:
+                    groups = df.groupby(config_columns, observed=True)[column]
+                else:
+                    groups = [(None, df[column])]
+                for config, values in groups:
+                    key = None if config is None else (float(config[0]), float(config[1]))
+                    answers[key] = values.astype(str).value_counts().to_dict()
+
+        latencies = None
+        if latency_from is not None and "latency_seconds" in result_columns(latency_from):
+            columns = ["latency_seconds"] + (["status"] if "status" in result_columns(latency_from) else [])
+            df = read_results(latency_from, columns=columns)
+            if "status" in df:
+                df = df[df["status"] == "ok"]
+            latencies = df["latency_seconds"].dropna().to_numpy(dtype=float)
+
+        return cls(answers, latencies, latency_kind, seed)
+
+    def _distribution(self, temperature: float, top_p: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(valores, probabilidades acumuladas) de una configuración: la ajustada, o la reescalada si no está."""
+        config = (float(temperature), float(top_p))
+        if config in self.by_config:
+            return self.by_config[config]
+        if not self.by_config:
+            return self.pooled  # El archivo no distingue configuraciones
+        if config not in self._rescaled:
+            if self.base is None:
+                warnings.warn(f"No hay respuestas ajustadas para temperatura={config[0]:g}, top_p={config[1]:g} "
+                              f"ni una configuración de la que reescalarlas; se usan las de todas las configuraciones")
+                self._rescaled[config] = self.pooled
+            else:
+                self._rescaled[config] = self._rescale(*config)
+        return self._rescaled[config]
+
+    def sample_answers(self, n: int, temperature: float = 1.0, top_p: float = 1.0) -> np.ndarray:
+        values, cdf = self._distribution(temperature, top_p)
+        return values[np.searchsorted(cdf, self.rng.random(n), side="right")]
+
+    def sample_latencies(self, n: int) -> np.ndarray:
+        if self.latency_kind == "exponential":
+            return self.rng.exponential(self.latencies.mean(), n)
+        return self.latencies[self.rng.integers(len(self.latencies), size=n)]
+
+    def sample(self, n: int, temperature: float = 1.0, top_p: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """`n` respuestas y `n` latencias de una configuración, vectorizado."""
+        return self.sample_answers(n, temperature, top_p), self.sample_latencies(n)
+
+    def _next(self, key, draw):
+        """Próximo valor de un bloque pre-sorteado (se repone de a BLOCK_SIZE)."""
+        block, position = self._buffers.get(key, (None, BLOCK_SIZE))
+        if position >= BLOCK_SIZE:
+            block, position = draw(BLOCK_SIZE), 0
+        self._buffers[key] = (block, position + 1)
+        return block[position]
+
+    def next_answer(self, temperature: float, top_p: float) -> str:
+        config = (float(temperature), float(top_p))
+        return str(self._next(("answer", config), lambda n: self.sample_answers(n, *config)))
+
+    def next_latency(self) -> float:
+        return float(self._next("latency", self.sample_latencies))
+
+    def top_logprobs(self, temperature: float, top_p: float, k: int) -> List[Tuple[str, float]]:
+        """Las `k` respuestas más probables con su logprob (cada respuesta como un único token)."""
+        values, cdf = self._distribution(temperature, top_p)
+        probabilities = np.diff(cdf, prepend=0.0)
+        order = np.argsort(-probabilities, kind="stable")[:k]
+        return [(str(values[i]), float(np.log(probabilities[i]))) for i in order]
+
+
+class SimulatedClient(AsyncGroqClient):
+    """AsyncGroqClient cuyas respuestas se sortean de un SimulatedModel, sin red."""
+
+    def __init__(self, model: SimulatedModel, time_scale: float = 0.0, **kwargs):
+        """
+        Args:
+            model: Distribuciones de respuestas y latencias
+            time_scale: Fracción de cada latencia que se espera de verdad (0 = no esperar)
+            **kwargs: Los mismos argumentos que AsyncGroqClient (sin almacén: las
+                respuestas simuladas nunca se guardan)
+        """
+        kwargs.setdefault("rate_limiter", RateLimiter())
+        kwargs.setdefault("circuit_breaker", CircuitBreaker())
+        super().__init__(api_key="simulated", use_env_store=False, **kwargs)
+        self.store = None
+        self.simulation = model
+        self.time_scale = time_scale
+
+    async def _wait(self, latency: float) -> None:
+        if self.time_scale > 0:
+            await asyncio.sleep(latency * self.time_scale)
+
+    def _tokens(self, request: Dict[str, Any]) -> List[str]:
+        answer = self.simulation.next_answer(request["temperature"], request["top_p"])
+        return _split_tokens(answer)[: request["max_tokens"] or None]
+
+    async def _call_api(self, request: Dict[str, Any], extract=_extract_content) -> Tuple[Any, float]:
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        async def send():
+            latency = self.simulation.next_latency()
+            await self._wait(latency)
+            if request.get("logprobs"):
+                result = self.simulation.top_logprobs(request["temperature"], request["top_p"], request["top_logprobs"])
+            else:
+                result = "".join(self._tokens(request))
+            return result, latency
+
+        key = _latency_key(request)
+        result, latency = await self._send_with_retries(estimated, send, key)
+        self.last_latency = latency
+        self.latency_recorder.record(key, latency)
+        return result, latency
+
+    async def _call_api_stream(self, request: Dict[str, Any], parser: Optional[AnswerParser] = None) -> StreamResult:
+        estimated = estimate_tokens(request["messages"], request["max_tokens"])
+
+        async def send():
+            latency = self.simulation.next_latency()
+            tokens = self._tokens(request)
+            # Mismo reparto que stand_in_server: el prompt antes del primer token y
+            # la generación repartida en partes iguales entre los tokens
+            prompt_time = latency * PROMPT_SHARE
+            gap = (latency - prompt_time) / max(len(tokens), 1)
+            arrivals = [prompt_time + gap * i for i in range(len(tokens))]
+
+            state = PENDING
+            received = len(tokens)
+            for i in range(len(tokens)):
+                if parser is not None:
+                    state = parser.feed("".join(tokens[: i + 1]))
+                    if state != PENDING:
+                        received = i + 1
+                        break
+            stopped_early = state != PENDING
+            elapsed = arrivals[received - 1] if stopped_early else latency
+            await self._wait(elapsed)
+
+            content = "".join(tokens[:received])
+            if parser is not None and not stopped_early:
+                state = parser.finish(content)
+            server_timing = {} if stopped_early else {
+                "queue_time": 0.0,
+                "prompt_time": prompt_time,
+                "completion_time": latency - prompt_time,
+                "total_time": latency,
+            }
+            return StreamResult(
+                content,
+                elapsed,
+                ttft=arrivals[0] if received else None,
+                token_gaps=[gap] * (received - 1) if received else [],
+                server_timing=server_timing,
+                answer_state=state if parser is not None else None,
+                answer=parser.extract(content) if parser is not None and state == COMPLETE else None,
+                stopped_early=stopped_early,
+            )
+
+        key = _latency_key(request, stream=True, parser=parser)
+        result = await self._send_with_retries(estimated, send, key)
+        self.last_latency = result.latency
+        self.latency_recorder.record(key, result.latency)
+        return result
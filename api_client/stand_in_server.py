@@ -0,0 +1,536 @@
+"""
+Servidor local compatible con el endpoint de chat de Groq, para pruebas de carga sin red.
+
+Implementa `POST /openai/v1/chat/completions` con HTTP/1.1 keep-alive sobre
+asyncio y permite configurar:
+
+- la distribución de latencias (constante, exponencial o empírica, ajustada
+  desde los resultados del Capítulo 3),
+- la distribución categórica de respuestas (ajustada desde los resultados de
+  cualquier capítulo, por temperatura y top-p si el archivo las tiene),
+- límites de requests/tokens con headers `x-ratelimit-*` y 429 inyectados,
+- fallas a nivel conexión (reset o respuesta truncada).
+
+Con `stream: true` responde eventos SSE, un chunk por token, repartiendo la
+latencia entre el prompt y la generación como los tiempos de `usage`.
+
+Uso:
+    python -m api_client.stand_in_server --port 8000 \\
+        --latency exponential --latency-from capitulo_3/resultados.csv \\
+        --answers-from capitulo_4/resultados.csv --rate-limit-prob 0.01
+
+y luego `GroqClient(base_url="http://127.0.0.1:8000")`.
+"""
+
+import json
+import math
+import re
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter, defaultdict
+from typing import Optional, List, Dict, Tuple, Any, AsyncIterator, Union
+
+CHAT_PATH = "/openai/v1/chat/completions"
+DEFAULT_ANSWER = "A"
+PROMPT_SHARE = 0.3  # Fracción de la latencia que corresponde al prompt (antes del primer token)
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests"}
+
+
+class LatencyModel:
+    """Distribución de latencias del servidor."""
+
+    def __init__(self, kind: str = "none", mean: float = 0.0, samples: Optional[List[float]] = None):
+        """
+        Args:
+            kind: "none", "constant", "exponential" o "empirical"
+            mean: Latencia media en segundos (constante o exponencial)
+            samples: Latencias observadas, para el modo empírico
+        """
+        if kind not in ("none", "constant", "exponential", "empirical"):
+            raise ValueError(f"Distribución de latencia desconocida: {kind}")
+        if kind == "empirical" and not samples:
+            raise ValueError("La distribución empírica requiere muestras")
+        self.kind = kind
+        self.mean = mean
+        self.samples = samples or []
+
+    @classmethod
+    def from_results(cls, kind: str, filepath: str) -> "LatencyModel":
+        """Ajusta la distribución con las latencias exitosas de un archivo de resultados (Parquet o CSV)."""
+        from results_io import read_results, result_columns
+
+        columns = result_columns(filepath)
+        if "latency_seconds" not in columns:
+            raise ValueError(f"{filepath} no tiene la columna latency_seconds")
+        df = read_results(filepath, columns=["latency_seconds"] + (["status"] if "status" in columns else []))
+        if "status" in df:
+            df = df[df["status"] == "ok"]
+        latencies = df["latency_seconds"].dropna().astype(float).tolist()
+        if not latencies:
+            raise ValueError(f"No hay latencias en {filepath}")
+        # El estimador MLE de la media de la exponencial es la media muestral
+        return cls(kind, mean=sum(latencies) / len(latencies), samples=latencies)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            return self.mean
+        if self.kind == "exponential":
+            return rng.expovariate(1.0 / self.mean) if self.mean > 0 else 0.0
+        if self.kind == "empirical":
+            return rng.choice(self.samples)
+        return 0.0
+
+
+class AnswerModel:
+    """Distribución categórica de respuestas, opcionalmente condicionada a (temperatura, top-p)."""
+
+    def __init__(self, answers: Optional[Dict[Optional[Tuple[float, float]], Counter]] = None):
+        self.by_config: Dict[Tuple[float, float], Tuple[List[str], List[int]]] = {}
+        self.pooled: Tuple[List[str], List[int]] = ([DEFAULT_ANSWER], [1])
+
+        pooled = Counter()
+        for config, counts in (answers or {}).items():
+            pooled.update(counts)
+            if config is not None:
+                self.by_config[config] = (list(counts), list(counts.values()))
+        if pooled:
+            self.pooled = (list(pooled), list(pooled.values()))
+
+    @classmethod
+    def from_results(cls, filepath: str) -> "AnswerModel":
+        """
+        Ajusta la distribución con las respuestas de un archivo de resultados.
+
+        Reconoce las columnas de los distintos capítulos: `response` (Cap. 4),
+        `response_text` (Cap. 2) y `responses` (Cap. 1, lista por ensayo), en
+        Parquet o CSV. Sólo se leen la columna de respuestas y, si están,
+        `temperature` y `top_p`. Las filas "ERROR" no cuentan, pero "INVALID"
+        sí, para conservar la tasa de inválidas (igual que `SimulatedModel`).
+        """
+        from results_io import read_results, result_columns
+
+        columns = result_columns(filepath)
+        column = next((name for name in ("response", "response_text", "responses") if name in columns), None)
+        if column is None:
+            raise ValueError(f"{filepath} no tiene una columna de respuestas reconocida")
+        config_columns = [name for name in ("temperature", "top_p") if name in columns]
+        df = read_results(filepath, columns=[column] + config_columns)
+        if column == "responses":
+            df = df.explode(column)
+        df = df[df[column].notna()]
+        df[column] = df[column].astype(str)
+        df = df[df[column] != "ERROR"]
+
+        answers: Dict[Optional[Tuple[float, float]], Counter] = defaultdict(Counter)
+        if len(config_columns) == 2:
+            configured = df["temperature"].notna() & df["top_p"].notna()
+            for (temperature, top_p), values in df[configured].groupby(config_columns)[column]:
+                answers[(float(temperature), float(top_p))].update(values.value_counts().to_dict())
+            df = df[~configured]
+        answers[None].update(df[column].value_counts().to_dict())
+        return cls(answers)
+
+    def sample(self, rng: random.Random, temperature: float, top_p: float) -> str:
+        values, weights = self.by_config.get((float(temperature), float(top_p)), self.pooled)
+        return rng.choices(values, weights)[0]
+
+    def top_logprobs(self, temperature: float, top_p: float, k: int) -> List[Dict[str, Any]]:
+        """Los `k` valores más probables con su logprob (cada respuesta se trata como un único token)."""
+        values, weights = self.by_config.get((float(temperature), float(top_p)), self.pooled)
+        total = sum(weights)
+        ranked = sorted(zip(values, weights), key=lambda item: -item[1])[:k]
+        return [{"token": value, "logprob": math.log(weight / total), "bytes": None} for value, weight in ranked]
+
+
+class _Bucket:
+    """Bucket de recarga continua para simular los límites de la cuenta."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.rate = limit / window_seconds
+        self.level = float(limit)
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reset_seconds(self) -> float:
+        return (self.limit - self.level) / self.rate
+
+
+class StandInServer:
+    """Servidor HTTP asíncrono que imita el endpoint de chat de Groq."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        latency: Optional[LatencyModel] = None,
+        answers: Optional[AnswerModel] = None,
+        requests_per_day: int = 14400,
+        tokens_per_minute: int = 1_000_000,
+        rate_limit_prob: float = 0.0,
+        retry_after: float = 1.0,
+        fault_prob: float = 0.0,
+        seed: Optional[int] = None,
+        capacity: Optional[int] = None,
+        handshake_latency: float = 0.0,
+    ):
+        """
+        Args:
+            host: Dirección de escucha
+            port: Puerto de escucha (0 elige uno libre)
+            latency: Distribución de latencias (por defecto, sin latencia)
+            answers: Distribución de respuestas (por defecto, siempre "A")
+            requests_per_day: Límite simulado de requests (informado en los headers)
+            tokens_per_minute: Límite simulado de tokens por minuto
+            rate_limit_prob: Probabilidad de responder 429 aunque haya cuota
+            retry_after: Valor de `retry-after` (s) para los 429 inyectados
+            fault_prob: Probabilidad de una falla de conexión (reset o respuesta truncada)
+            seed: Semilla del generador aleatorio
+            capacity: Requests que se atienden a la vez; el resto espera en cola
+                (None = capacidad ilimitada, sin cola)
+            handshake_latency: Demora (s) antes de la primera respuesta de cada
+                conexión, para simular el costo de establecerla (TCP + TLS)
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency or LatencyModel()
+        self.answers = answers or AnswerModel()
+        self.requests = _Bucket(requests_per_day, 86400.0)
+        self.tokens = _Bucket(tokens_per_minute, 60.0)
+        self.rate_limit_prob = rate_limit_prob
+        self.retry_after = retry_after
+        self.fault_prob = fault_prob
+        self.rng = random.Random(seed)
+        self.capacity = capacity
+        self.handshake_latency = handshake_latency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats = Counter()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL base para pasar a GroqClient(base_url=...)."""
+        return f"http://{self.host}:{self.port}"
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(self.requests.limit),
+            "x-ratelimit-remaining-requests": str(int(self.requests.level)),
+            "x-ratelimit-reset-requests": f"{self.requests.reset_seconds():.2f}s",
+            "x-ratelimit-limit-tokens": str(self.tokens.limit),
+            "x-ratelimit-remaining-tokens": str(int(self.tokens.level)),
+            "x-ratelimit-reset-tokens": f"{self.tokens.reset_seconds():.2f}s",
+        }
+
+    async def _handle_chat(self, body: bytes) -> Tuple[int, Dict[str, str], Union[bytes, AsyncIterator[bytes]]]:
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (ValueError, KeyError):
+            return 400, {}, _error_body("Request inválida", "invalid_request_error")
+
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+        max_tokens = request.get("max_tokens") or 1024
+
+        self.requests.refill()
+        self.tokens.refill()
+        headers = self._rate_limit_headers()
+        if self.requests.level < 1 or self.tokens.level < prompt_tokens:
+            wait = max(self.requests.reset_seconds() if self.requests.level < 1 else 0.0,
+                       (prompt_tokens - self.tokens.level) / self.tokens.rate)
+            headers["retry-after"] = f"{wait:.2f}"
+            self.stats["rate_limited"] += 1
+            return 429, headers, _error_body("Rate limit reached", "rate_limit_exceeded")
+        if self.rng.random() < self.rate_limit_prob:
+            headers["retry-after"] = f"{self.retry_after:.2f}"
+            self.stats["rate_limited"] += 1
+            return 429, headers, _error_body("Rate limit reached (inyectado)", "rate_limit_exceeded")
+
+        answer = self.answers.sample(self.rng, request.get("temperature", 1.0), request.get("top_p", 1.0))
+        tokens = _split_tokens(answer)[:max_tokens]
+        answer = "".join(tokens)
+        completion_tokens = max(1, len(tokens))
+        self.requests.level -= 1
+        self.tokens.level -= prompt_tokens + completion_tokens
+
+        # La latencia se reparte entre el procesamiento del prompt y la generación token a token
+        latency = self.latency.sample(self.rng)
+        prompt_time = PROMPT_SHARE * latency
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "queue_time": 0.0,
+            "prompt_time": prompt_time,
+            "completion_time": latency - prompt_time,
+            "total_time": latency,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = request.get("model", "")
+        self.stats["ok"] += 1
+
+        if request.get("stream"):
+            headers["content-type"] = "text/event-stream"
+            chunks = self._stream_chunks(completion_id, created, model, tokens, usage)
+            return 200, headers, chunks
+
+        usage["queue_time"] = await self._acquire_slot()
+        try:
+            if latency > 0:
+                await asyncio.sleep(latency)
+        finally:
+            self._release_slot()
+        usage["total_time"] += usage["queue_time"]
+
+        logprobs = None
+        if request.get("logprobs"):
+            top = self.answers.top_logprobs(
+                request.get("temperature", 1.0), request.get("top_p", 1.0), request.get("top_logprobs") or 1
+            )
+            answer_logprob = next((item["logprob"] for item in top if item["token"] == answer), top[-1]["logprob"])
+            logprobs = {"content": [{"token": answer, "logprob": answer_logprob, "bytes": None, "top_logprobs": top}]}
+
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "logprobs": logprobs,
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+            "x_groq": {"id": f"req_{uuid.uuid4().hex}"},
+        }
+        return 200, headers, json.dumps(payload).encode("utf-8")
+
+    async def _acquire_slot(self) -> float:
+        """Espera un lugar de atención si la capacidad es limitada; devuelve la espera en cola."""
+        if not self.capacity:
+            return 0.0
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        t_queued = time.monotonic()
+        await self._slots.acquire()
+        return time.monotonic() - t_queued
+
+    def _release_slot(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    async def _stream_chunks(self, completion_id: str, created: int, model: str,
+                             tokens: List[str], usage: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """
+        Eventos SSE de una respuesta en streaming: un chunk por token, espaciados
+        según los tiempos de `usage`, y el uso en `x_groq.usage` del último chunk.
+        """
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        usage["queue_time"] = await self._acquire_slot()
+        try:
+            yield event({"role": "assistant", "content": ""}, x_groq={"id": f"req_{uuid.uuid4().hex}"})
+            token_time = usage["completion_time"] / len(tokens) if tokens else 0.0
+            # El primer token sale después del prompt y de un paso de generación
+            await asyncio.sleep(usage["prompt_time"])
+            for token in tokens:
+                if token_time > 0:
+                    await asyncio.sleep(token_time)
+                yield event({"content": token})
+        finally:
+            self._release_slot()
+        usage["total_time"] += usage["queue_time"]
+        yield event({}, "stop", x_groq={"id": f"req_{uuid.uuid4().hex}", "usage": usage})
+        yield b"data: [DONE]\n\n"
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        handshake_pending = self.handshake_latency > 0
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                request_headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        request_headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(request_headers.get("content-length", 0)))
+                if handshake_pending:
+                    await asyncio.sleep(self.handshake_latency)
+                    handshake_pending = False
+
+                if self.fault_prob and self.rng.random() < self.fault_prob:
+                    self.stats["faults"] += 1
+                    if self.rng.random() < 0.5:
+                        # Reset: cerramos la conexión sin responder
+                        writer.transport.abort()
+                    else:
+                        # Respuesta truncada: headers que prometen más bytes de los que llegan
+                        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                                     b"content-length: 1000\r\n\r\n{\"id\":")
+                        await writer.drain()
+                        writer.close()
+                    return
+
+                if method == "POST" and path.split("?", 1)[0] == CHAT_PATH:
+                    status, headers, payload = await self._handle_chat(body)
+                else:
+                    status, headers, payload = 404, {}, _error_body(f"Ruta desconocida: {path}", "not_found")
+
+                keep_alive = request_headers.get("connection", "").lower() != "close"
+                headers.setdefault("content-type", "application/json")
+                streaming = not isinstance(payload, bytes)
+                response = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}"]
+                if streaming:
+                    # Los eventos SSE se mandan con codificación chunked para mantener la conexión
+                    response.append("transfer-encoding: chunked")
+                else:
+                    response.append(f"content-length: {len(payload)}")
+                response.append(f"connection: {'keep-alive' if keep_alive else 'close'}")
+                response += [f"{name}: {value}" for name, value in headers.items()]
+                head = ("\r\n".join(response) + "\r\n\r\n").encode("latin-1")
+                if streaming:
+                    writer.write(head)
+                    try:
+                        async for data in payload:
+                            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+                            await writer.drain()
+                    except ConnectionError:
+                        # El cliente cortó el stream antes de terminar
+                        self.stats["streams_closed_early"] += 1
+                        return
+                    finally:
+                        await payload.aclose()
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(head + payload)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            if not writer.is_closing():
+                writer.close()
+
+    async def start(self) -> None:
+        """Empieza a escuchar en el loop actual."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> str:
+        """
+        Levanta el servidor en un hilo de fondo (útil para benchmarks y pruebas).
+
+        Returns:
+            URL base del servidor
+        """
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Detiene un servidor levantado con `start_in_thread`."""
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _split_tokens(text: str) -> List[str]:
+    """Divide una respuesta en tokens aproximados de hasta 4 caracteres (con el espacio previo)."""
+    return re.findall(r"\s*\S{1,4}|\s+", text)
+
+
+def _error_body(message: str, code: str) -> bytes:
+    return json.dumps({"error": {"message": message, "type": code, "code": code}}).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatible con el endpoint de chat de Groq.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="none", choices=["none", "constant", "exponential", "empirical"],
+                        help="Distribución de latencias.")
+    parser.add_argument("--latency-mean", type=float, default=0.3,
+                        help="Latencia media en segundos (si no se ajusta desde un archivo).")
+    parser.add_argument("--latency-from", help="Resultados (Parquet o CSV) con latency_seconds para ajustar la latencia.")
+    parser.add_argument("--answers-from", help="Resultados (Parquet o CSV) para ajustar la distribución de respuestas.")
+    parser.add_argument("--requests-per-day", type=int, default=14400)
+    parser.add_argument("--tokens-per-minute", type=int, default=1_000_000)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0, help="Probabilidad de un 429 inyectado.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after (s) de los 429 inyectados.")
+    parser.add_argument("--fault-prob", type=float, default=0.0, help="Probabilidad de una falla de conexión.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="Requests atendidas a la vez; el resto espera en cola (simula saturación).")
+    parser.add_argument("--handshake-latency", type=float, default=0.0,
+                        help="Demora (s) de la primera respuesta de cada conexión (simula TCP + TLS).")
+    args = parser.parse_args()
+
+    if args.latency_from:
+        latency = LatencyModel.from_results(args.latency, args.latency_from)
+    else:
+        latency = LatencyModel(args.latency, mean=args.latency_mean)
+    answers = AnswerModel.from_results(args.answers_from) if args.answers_from else AnswerModel()
+
+    server = StandInServer(
+        host=args.host,
+        port=args.port,
+        latency=latency,
+        answers=answers,
+        requests_per_day=args.requests_per_day,
+        tokens_per_minute=args.tokens_per_minute,
+        rate_limit_prob=args.rate_limit_prob,
+        retry_after=args.retry_after,
+        fault_prob=args.fault_prob,
+        seed=args.seed,
+        capacity=args.capacity,
+        handshake_latency=args.handshake_latency,
+    )
+    print(f"Servidor local escuchando en {server.base_url}{CHAT_PATH}")
+    print(f"Latencia: {latency.kind} (media {latency.mean:.4f}s)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\nServidor detenido. Estadísticas: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Configuración del transporte HTTP del cliente.
+
+El SDK de Groq crea su propio cliente httpx con un pool de 100 conexiones
+(20 en keep-alive, que se cierran tras 5 s sin uso) y timeouts de 60 s. Con
+respuestas de pocos tokens, abrir una conexión nueva (TCP + TLS) puede costar
+tanto como la generación, así que conviene que el pool alcance para todas las
+requests en vuelo y que las conexiones ociosas sobrevivan entre requests.
+
+`TransportConfig` agrupa esos parámetros y construye los clientes httpx que
+se pasan al SDK. Un mismo cliente httpx se puede compartir entre varios
+GroqClient (argumento `http_client`) para que compartan el pool.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+
+@dataclass
+class TransportConfig:
+    """Pool, keep-alive, HTTP/2 y timeouts por fase del cliente HTTP."""
+
+    max_connections: Optional[int] = 100           # Conexiones abiertas a la vez (None = sin tope)
+    max_keepalive_connections: Optional[int] = 20  # Conexiones ociosas que se conservan
+    keepalive_expiry: Optional[float] = 30.0       # Segundos que se conserva una conexión ociosa
+    http2: bool = False                            # Requiere el paquete h2 (pip install httpx[http2])
+    connect_timeout: Optional[float] = 5.0         # Establecer la conexión (TCP + TLS)
+    read_timeout: Optional[float] = 60.0           # Entre bytes recibidos (en un stream, entre chunks)
+    write_timeout: Optional[float] = 60.0          # Enviar el cuerpo de la request
+    pool_timeout: Optional[float] = 60.0           # Esperar una conexión libre del pool
+
+    @classmethod
+    def for_concurrency(cls, max_in_flight: int, **overrides) -> "TransportConfig":
+        """Pool dimensionado para `max_in_flight` requests simultáneas, todas en keep-alive."""
+        defaults = cls()
+        config = {
+            "max_connections": max(max_in_flight, defaults.max_connections),
+            "max_keepalive_connections": max(max_in_flight, defaults.max_keepalive_connections),
+        }
+        config.update(overrides)
+        return cls(**config)
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def sync_client(self) -> httpx.Client:
+        return httpx.Client(limits=self.limits(), timeout=self.timeout(), http2=self.http2)
+
+    def async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self.limits(), timeout=self.timeout(), http2=self.http2)
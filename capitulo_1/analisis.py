@@ -2,18 +2,30 @@
 Análisis del Capítulo 1: Probabilidad de Colisiones
 
 Compara las probabilidades empíricas de colisión observadas en el experimento
-con la probabilidad teórica del Problema del Cumpleaños.
+con la probabilidad teórica del Problema del Cumpleaños, tanto en su versión
+uniforme como con la distribución no uniforme que efectivamente tiene el modelo
+(ver colisiones.py).
 """
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_io import read_results, iter_results, find_results, DEFAULT_CHUNK_ROWS
+from capitulo_1.colisiones import counts_distribution, exact_collision_prob, resampled_collision_curve
 
 # --- CONFIGURACIÓN ---
-INPUT_FILE = "resultados.csv"
-PLOT_FILE = "probabilidad_colision.png"
+INPUT_FILE = find_results(os.path.dirname(__file__))  # resultados.parquet o, si no existe, resultados.csv
+PLOT_FILE = os.path.join(os.path.dirname(__file__), "probabilidad_colision.png")
 THEORETICAL_M = 30  # Tamaño del espacio muestral (enteros del 1 al 30)
+VIRTUAL_TRIALS = 5000         # Ensayos virtuales por N al remuestrear el pool de respuestas
+BOOTSTRAP_REPLICATES = 1000   # Réplicas bootstrap para el intervalo de confianza
+SEED = 0
 
 def calculate_theoretical_prob(n, m):
     """
@@ -28,32 +40,105 @@ def calculate_theoretical_prob(n, m):
     exponent = - (n * (n - 1)) / (2 * m)
     return 1 - np.exp(exponent)
 
-def run_analysis():
+def chunked_stats(filepath, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Colisiones por N y frecuencia de cada respuesta, leyendo el archivo por bloques.
+
+    De cada bloque sólo quedan la cantidad de ensayos y de colisiones por N y
+    la frecuencia de cada respuesta, que se suman entre bloques: la memoria
+    depende de la cantidad de valores de N y de respuestas distintas, no de
+    la de ensayos.
+
+    Returns:
+        Tupla (stats con columnas N, prob_empirica y trials; Counter de respuestas)
+    """
+    collisions = pd.Series(dtype=float)
+    trials = pd.Series(dtype=float)
+    response_counts = Counter()
+    for chunk in iter_results(filepath, columns=['N', 'collision', 'responses'], chunk_rows=chunk_rows):
+        grouped = chunk.groupby('N')['collision'].agg(['sum', 'count'])
+        collisions = collisions.add(grouped['sum'], fill_value=0)
+        trials = trials.add(grouped['count'], fill_value=0)
+        # sort=False conserva el orden de aparición, como en empirical_distribution
+        response_counts.update(chunk['responses'].explode().value_counts(sort=False).to_dict())
+
+    stats = pd.DataFrame({
+        'N': collisions.index.astype(int),
+        'prob_empirica': (collisions / trials).values,
+        'trials': trials.values.astype(int),
+    })
+    return stats, response_counts
+
+def run_analysis(chunk_rows=None):
+    """
+    Analiza los resultados del experimento.
+
+    Con `chunk_rows` el archivo se lee por bloques de esa cantidad de filas.
+    En los dos casos la curva remuestreada se sortea de la frecuencia de cada
+    respuesta (no del pool), con las respuestas en el mismo orden, así que la
+    salida es idéntica.
+    """
     if not os.path.exists(INPUT_FILE):
         print(f"No se encontró el archivo {INPUT_FILE}. Ejecutá primero experimento.py")
         return
 
     print("Analizando resultados...")
-    df = pd.read_csv(INPUT_FILE)
-    
-    # Calculamos la probabilidad empírica para cada N
-    # Agrupamos por N y promediamos la columna 'collision' (True=1, False=0)
-    stats = df.groupby('N')['collision'].agg(['mean', 'count']).reset_index()
-    stats.rename(columns={'mean': 'prob_empirica', 'count': 'trials'}, inplace=True)
-    
-    print("Probabilidades empíricas calculadas:")
-    print(stats)
+    if chunk_rows:
+        stats, response_counts = chunked_stats(INPUT_FILE, chunk_rows)
+    else:
+        df = read_results(INPUT_FILE, columns=['N', 'collision', 'responses'])
+
+        # Calculamos la probabilidad empírica para cada N
+        # Agrupamos por N y promediamos la columna 'collision' (True=1, False=0)
+        stats = df.groupby('N')['collision'].agg(['mean', 'count']).reset_index()
+        stats.rename(columns={'mean': 'prob_empirica', 'count': 'trials'}, inplace=True)
+
+        # Frecuencia de cada respuesta, agrupando todos los ensayos (en orden de
+        # aparición, igual que chunked_stats)
+        response_counts = Counter(df['responses'].explode().value_counts(sort=False).to_dict())
+
+    labels, probs = counts_distribution(response_counts)
+    label_counts = np.array([response_counts[label] for label in labels])
 
     n_values = stats['N'].values
     prob_empirica = stats['prob_empirica'].values
+    print(f"Categorías observadas: {len(labels)} (más frecuente: '{labels[0]}' con p = {probs[0]:.3f})")
+
+    # Colisión exacta bajo la distribución no uniforme observada
+    stats['prob_exacta_no_uniforme'] = exact_collision_prob(probs, n_values)
+    stats['prob_teorica_uniforme'] = calculate_theoretical_prob(n_values, THEORETICAL_M)
+
+    print("Probabilidades empíricas calculadas:")
+    print(stats)
+
+    # Menor N para el que la colisión es más probable que no (N ≤ M + 1 siempre alcanza)
+    n_range = np.arange(1, len(labels) + 2)
+    n_half = n_range[np.argmax(exact_collision_prob(probs, n_range) >= 0.5)]
+    print(f"Con la distribución observada, P(colisión) ≥ 0.5 desde N = {n_half} "
+          f"(uniforme con M={THEORETICAL_M}: N ≈ {np.sqrt(2 * THEORETICAL_M * np.log(2)):.1f})")
     
     # Generamos la curva teórica para un rango continuo de N
     n_dense = np.linspace(min(n_values), max(n_values), 100)
     prob_teorica = calculate_theoretical_prob(n_dense, THEORETICAL_M)
+    n_integer = np.arange(2, max(n_values) + 1)
+    prob_exacta = exact_collision_prob(probs, n_integer)
+
+    # Curva densa remuestreando el pool (sorteando de sus frecuencias), sin nuevas llamadas a la API
+    curve = resampled_collision_curve(
+        codes=None, counts=label_counts, n_values=n_integer, virtual_trials=VIRTUAL_TRIALS,
+        bootstrap_replicates=BOOTSTRAP_REPLICATES, seed=SEED
+    )
+    print(f"\nCurva remuestreada ({VIRTUAL_TRIALS} ensayos virtuales por N, IC bootstrap 95%):")
+    for n, estimate, lower, upper in zip(curve['N'], curve['estimate'], curve['lower'], curve['upper']):
+        if n in n_values:
+            print(f"  N={n}: {estimate:.4f} [{lower:.4f}, {upper:.4f}]")
 
-    # Graficamos: curva teórica vs puntos empíricos
+    # Graficamos: curvas teóricas vs puntos empíricos
     plt.figure(figsize=(10, 6))
-    plt.plot(n_dense, prob_teorica, 'r--', label=f'Teórico (M={THEORETICAL_M})')
+    plt.plot(n_dense, prob_teorica, 'r--', label=f'Teórico uniforme (M={THEORETICAL_M})')
+    plt.plot(n_integer, prob_exacta, 'g-', label=f'Exacto no uniforme ({len(labels)} categorías observadas)')
+    plt.plot(curve['N'], curve['estimate'], 'm:', label='Remuestreo del pool')
+    plt.fill_between(curve['N'], curve['lower'], curve['upper'], color='m', alpha=0.15, label='IC bootstrap 95%')
     plt.plot(n_values, prob_empirica, 'bo-', label='Empírico (Groq Llama 3.1)')
     
     plt.xlabel('Número de ejecuciones (N)')
@@ -66,4 +151,9 @@ def run_analysis():
     print(f"Gráfico guardado en {PLOT_FILE}")
 
 if __name__ == "__main__":
-    run_analysis()
+    parser = argparse.ArgumentParser(description='Analizar las colisiones del Capítulo 1.')
+    parser.add_argument('--chunked', nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar='FILAS',
+                        help=f'Leer el archivo por bloques de FILAS filas (por defecto {DEFAULT_CHUNK_ROWS}), con memoria acotada')
+    args = parser.parse_args()
+
+    run_analysis(chunk_rows=args.chunked)
@@ -0,0 +1,238 @@
+"""
+Probabilidad de colisión exacta para distribuciones no uniformes.
+
+El Problema del Cumpleaños clásico supone que las M respuestas posibles son
+equiprobables. Con probabilidades p_1, ..., p_M arbitrarias, la probabilidad de
+que N muestras independientes sean todas distintas es
+
+    P(sin colisión | N) = N! · e_N(p_1, ..., p_M)
+
+donde e_N es el polinomio simétrico elemental de grado N. Los e_k se calculan
+para todos los k ≤ N a la vez con la recurrencia
+
+    e_k ← e_k + p_i · e_{k-1}     (para cada categoría i)
+
+en escala logarítmica, de modo que no hay underflow aunque N y M sean grandes.
+Para espacios muy grandes también se ofrece una estimación por Monte Carlo.
+
+Además, `resampled_collision_curve` estima la curva directamente desde el pool
+de respuestas guardadas: arma miles de ensayos virtuales por N remuestreando el
+pool y acompaña cada punto con un intervalo bootstrap.
+"""
+
+import math
+from collections import Counter
+from typing import Iterable, Tuple, Optional, Dict
+
+import numpy as np
+import pandas as pd
+
+EXCLUDED_RESPONSES = ("ERROR", "INVALID")
+
+
+def empirical_distribution(responses: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distribución empírica de categorías a partir de respuestas agrupadas.
+
+    Las respuestas "ERROR" e "INVALID" no son valores del espacio muestral y se
+    descartan.
+
+    Returns:
+        Tupla (categorías, probabilidades) ordenada por probabilidad decreciente
+    """
+    return counts_distribution(Counter(responses))
+
+
+def counts_distribution(counts: Counter) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `empirical_distribution` a partir de la frecuencia de cada respuesta.
+
+    Permite acumular las frecuencias por bloques (ver analisis.py) en lugar de
+    tener todas las respuestas en memoria.
+    """
+    counts = Counter({r: n for r, n in counts.items() if r not in EXCLUDED_RESPONSES and n > 0})
+    if not counts:
+        raise ValueError("No hay respuestas válidas para estimar la distribución")
+
+    labels, values = zip(*counts.most_common())
+    probs = np.array(values, dtype=float)
+    return np.array(labels), probs / probs.sum()
+
+
+def log_elementary_symmetric(probs: np.ndarray, max_degree: int) -> np.ndarray:
+    """
+    log e_k(p) para k = 0..max_degree.
+
+    Args:
+        probs: Probabilidades de las categorías; con forma (réplicas, M) se
+            calcula una fila por réplica, todas a la vez
+
+    Returns:
+        Arreglo de largo max_degree + 1 en la última dimensión (−inf donde
+        e_k = 0, es decir k > M)
+    """
+    probs = np.asarray(probs, dtype=float)
+    log_e = np.full(probs.shape[:-1] + (max_degree + 1,), -np.inf)
+    log_e[..., 0] = 0.0
+    with np.errstate(divide="ignore"):
+        log_probs = np.log(probs)
+    for i in range(probs.shape[-1]):
+        log_p = log_probs[..., i, None]
+        # El lado derecho usa los e_{k-1} anteriores a incorporar esta categoría
+        log_e[..., 1:] = np.logaddexp(log_e[..., 1:], log_p + log_e[..., :-1])
+    return log_e
+
+
+def exact_collision_prob(probs: np.ndarray, n_values: Iterable[int]) -> np.ndarray:
+    """
+    Probabilidad exacta de al menos una colisión entre N muestras de `probs`.
+
+    Args:
+        probs: Probabilidades de las categorías (se normalizan)
+        n_values: Valores de N a evaluar
+
+    Returns:
+        P(colisión | N) para cada N de `n_values`
+    """
+    probs = np.asarray(probs, dtype=float)
+    probs = probs / probs.sum()
+    n_values = np.asarray(list(n_values), dtype=int)
+
+    log_e = log_elementary_symmetric(probs, int(n_values.max()))
+    log_factorial = np.array([math.lgamma(n + 1) for n in n_values])
+    no_collision = np.exp(np.minimum(0.0, log_factorial + log_e[n_values]))
+    return 1.0 - no_collision
+
+
+def uniform_collision_prob(n_values: Iterable[int], m: int) -> np.ndarray:
+    """Probabilidad exacta del Problema del Cumpleaños uniforme: 1 - Π_{k<N} (1 - k/M)."""
+    return exact_collision_prob(np.full(m, 1.0 / m), n_values)
+
+
+def monte_carlo_collision_prob(
+    probs: np.ndarray,
+    n_values: Iterable[int],
+    trials: int = 10000,
+    seed: Optional[int] = None,
+    chunk_size: int = 1_000_000,
+) -> np.ndarray:
+    """
+    Estimación por Monte Carlo de P(colisión | N), útil cuando M es muy grande.
+
+    Cada ensayo virtual sortea N categorías, las ordena y busca dos vecinas
+    iguales. Los ensayos se procesan en bloques de a lo sumo `chunk_size`
+    muestras para acotar la memoria.
+    """
+    rng = np.random.default_rng(seed)
+    probs = np.asarray(probs, dtype=float)
+    cumulative = np.cumsum(probs / probs.sum())
+
+    estimates = []
+    for n in n_values:
+        if n < 2:
+            estimates.append(0.0)
+            continue
+        rows_per_chunk = max(1, chunk_size // n)
+        collisions = 0
+        done = 0
+        while done < trials:
+            rows = min(rows_per_chunk, trials - done)
+            # Muestreo por inversión de la acumulada: una búsqueda binaria por muestra
+            draws = np.searchsorted(cumulative, rng.random((rows, n)), side="right")
+            draws.sort(axis=1)
+            collisions += int((draws[:, 1:] == draws[:, :-1]).any(axis=1).sum())
+            done += rows
+        estimates.append(collisions / trials)
+    return np.array(estimates)
+
+
+def pooled_codes(responses: Iterable[str]) -> np.ndarray:
+    """
+    Pool de respuestas válidas en formato largo, codificado como enteros.
+
+    Cada respuesta distinta recibe un código; comparar enteros es mucho más
+    barato que comparar strings al buscar colisiones.
+    """
+    responses = pd.Series(list(responses), dtype=object)
+    responses = responses[~responses.isin(EXCLUDED_RESPONSES) & responses.notna()]
+    if responses.empty:
+        raise ValueError("No hay respuestas válidas en el pool")
+    codes, _ = pd.factorize(responses)
+    return codes
+
+
+def _collision_rate(draws: np.ndarray) -> float:
+    # draws: (ensayos, N). Ordenando cada ensayo, una colisión son dos vecinos iguales
+    draws = np.sort(draws, axis=1)
+    return float((draws[:, 1:] == draws[:, :-1]).any(axis=1).mean())
+
+
+def resampled_collision_curve(
+    codes: np.ndarray,
+    n_values: Iterable[int],
+    virtual_trials: int = 5000,
+    bootstrap_replicates: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    counts: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Curva de colisión estimada remuestreando un pool de respuestas.
+
+    Para cada N se arman `virtual_trials` ensayos virtuales de N respuestas
+    sorteadas (con reposición) del pool, con indexado vectorizado de NumPy, y
+    se cuenta la fracción con alguna respuesta repetida.
+
+    El intervalo es un bootstrap percentil sobre el pool: cada réplica es un
+    vector de conteos multinomial con las frecuencias observadas, y para cada
+    una se calcula la curva exacta (todas las réplicas a la vez), sin ruido de
+    Monte Carlo adicional.
+
+    Con `counts` (la frecuencia de cada código) no hace falta el pool: los
+    ensayos se sortean de la distribución empírica, que es lo mismo que
+    remuestrear el pool con reposición, con memoria proporcional a la cantidad
+    de respuestas distintas.
+
+    Args:
+        codes: Pool de respuestas codificadas (ver pooled_codes); None si se pasa `counts`
+        n_values: Valores de N a evaluar
+        virtual_trials: Ensayos virtuales por N
+        bootstrap_replicates: Réplicas bootstrap del pool (0 = sin intervalo)
+        confidence: Nivel de confianza del intervalo
+        seed: Semilla del generador aleatorio
+        counts: Frecuencia de cada código, en lugar del pool
+
+    Returns:
+        Diccionario con arreglos "N", "estimate", "lower" y "upper"
+    """
+    rng = np.random.default_rng(seed)
+    n_values = np.asarray(list(n_values), dtype=int)
+    if counts is None:
+        codes = np.asarray(codes)
+        draw = lambda size: codes[rng.integers(0, len(codes), size=size)]
+    else:
+        counts = np.asarray(counts)
+        cdf = np.cumsum(counts) / counts.sum()
+        draw = lambda size: np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), len(counts) - 1)
+
+    estimates = np.zeros(len(n_values))
+    for i, n in enumerate(n_values):
+        if n >= 2:
+            estimates[i] = _collision_rate(draw((virtual_trials, n)))
+
+    if bootstrap_replicates == 0:
+        nan = np.full(len(n_values), np.nan)
+        return {"N": n_values, "estimate": estimates, "lower": nan, "upper": nan.copy()}
+
+    if counts is None:
+        counts = np.bincount(codes)
+    total = int(counts.sum())
+    boot_probs = rng.multinomial(total, counts / total, size=bootstrap_replicates) / total
+    # (réplicas, N): curva exacta de cada réplica
+    log_e = log_elementary_symmetric(boot_probs, int(n_values.max()))
+    log_factorial = np.array([math.lgamma(n + 1) for n in n_values])
+    curves = 1.0 - np.exp(np.minimum(0.0, log_factorial + log_e[:, n_values]))
+
+    alpha = 1 - confidence
+    lower, upper = np.quantile(curves, [alpha / 2, 1 - alpha / 2], axis=0)
+    return {"N": n_values, "estimate": estimates, "lower": lower, "upper": upper}
@@ -3,112 +3,109 @@ Experimento del Capítulo 1: Colisiones en Modelos Generativos
 
 Este script ejecuta múltiples consultas al modelo de lenguaje para observar
 colisiones (respuestas idénticas) y compararlas con el Problema del Cumpleaños.
+
+Cada ensayo (N, trial) es una unidad de trabajo del runner; se puede ejecutar
+con `python capitulo_1/experimento.py` o `python -m runner capitulo_1`.
+
+Con `--set early_stop=true` cada respuesta se recibe en streaming y se corta
+apenas se completa el número (ver api_client/parsers.py). Está desactivado por
+defecto: el criterio de validez cambia (ver README) y se pierde el texto completo.
 """
 
 import os
 import sys
-import time
-import pandas as pd
-from tqdm import tqdm
+import asyncio
 import groq
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_client.groq_client import GroqClient
+from runner import main, unit_sample_index
+from results_io.schemas import CAPITULO_1
+from api_client.parsers import DigitsParser
 
 # --- CONFIGURACIÓN ---
-PROMPT = """Elegí un número entero del 1 al 30 inclusive.
-Respondé únicamente con el número, sin texto adicional."""
-
-SYSTEM_MESSAGE = "Sos un asistente útil que responde de manera concisa."
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": """Elegí un número entero del 1 al 30 inclusive.
+Respondé únicamente con el número, sin texto adicional.""",
+    "system_message": "Sos un asistente útil que responde de manera concisa.",
+    "n_values": [5, 10, 20, 30],  # Cantidad de respuestas a generar por ensayo
+    "trials_per_n": 6,            # Cantidad de ensayos por cada valor de N
+    "temperature": 0.8,
+    "top_p": 1.0,
+    "max_tokens": 10,
+    "early_stop": False,          # Cortar el stream apenas se completa el número
+    "max_in_flight": 16,          # Cantidad máxima de requests simultáneas
+    "flush_every": 1,             # Ensayos por lote escrito en el archivo de resultados
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados.parquet"),
+}
 
-N_VALUES = [5, 10, 20, 30]  # Cantidad de respuestas a generar por ensayo
-TRIALS_PER_N = 6            # Cantidad de ensayos por cada valor de N
-OUTPUT_FILE = "resultados.csv"
+SCHEMA = CAPITULO_1
+ANSWER_PARSER = DigitsParser()
 
-def run_experiment():
-    print("Iniciando experimento del Capítulo 1 (Colisiones)...")
-    
-    try:
-        client = GroqClient()
-    except ValueError as e:
-        print(f"Error al inicializar el cliente: {e}")
-        print("Asegurate de tener la variable de entorno GROQ_API_KEY configurada.")
-        return
+def build_request(config):
+    """Argumentos de `chat` para una única respuesta del modelo."""
+    return {
+        "messages": [
+            {"role": "system", "content": config["system_message"]},
+            {"role": "user", "content": config["prompt"]}
+        ],
+        "temperature": config["temperature"],
+        "top_p": config["top_p"],
+        "max_tokens": config["max_tokens"]
+    }
 
-    results = []
-    completed_trials = set()
+async def chat(client, request, config, sample_index=None):
+    """
+    Una respuesta del modelo. Con `early_stop` se corta el stream apenas se
+    completa el número y se devuelve sólo el número ("7" en lugar de "7 es mi elección").
+    """
+    if not config["early_stop"]:
+        return await client.chat(**request, sample_index=sample_index)
+    result = await client.chat_stream(**request, parser=ANSWER_PARSER, sample_index=sample_index)
+    return result.answer if result.answer is not None else result.content
 
-    # Reanudación: si existe un archivo previo, continuar desde donde quedó
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            print(f"Archivo {OUTPUT_FILE} encontrado. Intentando resumir...")
-            df = pd.read_csv(OUTPUT_FILE)
-            results = df.to_dict('records')
-            for _, row in df.iterrows():
-                completed_trials.add((row['N'], row['trial']))
-            print(f"Se encontraron {len(completed_trials)} pruebas completadas.")
-        except pd.errors.EmptyDataError:
-            print("El archivo está vacío. Iniciando desde cero.")
-        except Exception as e:
-            print(f"Error leyendo archivo existente: {e}. Iniciando desde cero.")
+def work_units(config):
+    """Un ensayo por cada valor de N y cada número de ensayo."""
+    for n in config["n_values"]:
+        for trial in range(1, config["trials_per_n"] + 1):
+            yield {"unit_id": f"{n}:{trial}", "N": n, "trial": trial}
 
-    # Iteramos sobre cada valor de N (cantidad de respuestas por ensayo)
-    for n in tqdm(N_VALUES, desc="Progreso General (N)"):
-        # Ejecutamos T ensayos para cada N
-        for t in range(TRIALS_PER_N):
-            current_trial = t + 1
-            if (n, current_trial) in completed_trials:
-                continue
+async def run_unit(client, unit, config):
+    n = unit["N"]
+    request = build_request(config)
+    results = await asyncio.gather(
+        *(chat(client, request, config, unit_sample_index(unit["unit_id"], k)) for k in range(n)),
+        return_exceptions=True
+    )
 
-            responses = []
-            
-            # Generamos N respuestas del modelo
-            for _ in range(n):
-                try:
-                    response = client.chat(
-                        messages=[
-                            {"role": "system", "content": SYSTEM_MESSAGE},
-                            {"role": "user", "content": PROMPT}
-                        ],
-                        temperature=0.8,
-                        top_p=1.0,
-                        max_tokens=10
-                    )
-                    content = response.strip()
-                    if content.isdigit():
-                        responses.append(content)
-                    else:
-                        print(f"Respuesta inválida recibida: '{content}'")
-                        responses.append("INVALID")
-                except groq.RateLimitError:
-                    print(f"\n[CRÍTICO] Rate Limit alcanzado durante N={n}, trial={current_trial}.")
-                    print("Guardando progreso y deteniendo ejecución.")
-                    print("Podés volver a ejecutar el script más tarde para continuar.")
-                    sys.exit(0)
-                except Exception as e:
-                    print(f"Error en llamada API: {e}")
-                    responses.append("ERROR")
-                
-                time.sleep(0.1)
+    with client.phase("parse"):
+        responses = []
+        for result in results:
+            if isinstance(result, groq.RateLimitError):
+                # Sin cuota: detenemos el runner; el ensayo se repite al reanudar
+                raise result
+            elif isinstance(result, Exception):
+                print(f"Error en llamada API: {result}")
+                responses.append("ERROR")
+            else:
+                content = result.strip()
+                if content.isdigit():
+                    responses.append(content)
+                else:
+                    print(f"Respuesta inválida recibida: '{content}'")
+                    responses.append("INVALID")
 
-            # Analizamos el ensayo: verificamos si hubo colisión
-            unique_responses = set(responses)
-            num_unique = len(unique_responses)
-            has_collision = num_unique < n  # Colisión = menos únicos que respuestas
-            
-            results.append({
-                "N": n,
-                "trial": current_trial,
-                "unique_count": num_unique,
-                "collision": has_collision,
-                "responses": str(responses)
-            })
-            
-            # Guardado incremental para no perder datos
-            df = pd.DataFrame(results)
-            df.to_csv(OUTPUT_FILE, index=False)
+        # Analizamos el ensayo: verificamos si hubo colisión
+        num_unique = len(set(responses))
+        has_collision = num_unique < n  # Colisión = menos únicos que respuestas
 
-    print(f"Experimento finalizado. Resultados guardados en {OUTPUT_FILE}")
+        return [{
+            "N": n,
+            "trial": unit["trial"],
+            "unique_count": num_unique,
+            "collision": has_collision,
+            "responses": responses
+        }]
 
 if __name__ == "__main__":
-    run_experiment()
+    main(module=sys.modules[__name__])
@@ -6,14 +6,21 @@ distribución de las respuestas del modelo.
 """
 
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_io import read_results, iter_results, find_results, DEFAULT_CHUNK_ROWS
 
 # --- CONFIGURACIÓN ---
-RESULTS_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
+RESULTS_FILE = find_results(os.path.dirname(__file__))
 CONVERGENCE_PLOT = os.path.join(os.path.dirname(__file__), "convergencia_probabilidad.png")
 DISTRIBUTION_PLOT = os.path.join(os.path.dirname(__file__), "distribucion_respuestas.png")
 CONFIDENCE_LEVEL = 1.96  # z para 95% de confianza
+CURVE_POINTS = 2000      # Puntos de la curva de convergencia en la lectura por bloques
 
 def calculate_normal_approx_interval_vectorized(n_series, p_hat_series, z=1.96):
     """
@@ -29,17 +36,64 @@ def calculate_normal_approx_interval_vectorized(n_series, p_hat_series, z=1.96):
     
     return lower, upper
 
-def main():
+def chunked_convergence(filepath, chunk_rows=DEFAULT_CHUNK_ROWS, points=CURVE_POINTS):
+    """
+    Curva de convergencia y frecuencia de respuestas, leyendo el archivo por bloques.
+
+    Las filas están en orden de finalización, pero la cantidad de ejecuciones
+    (y de eventos) con run_id ≤ r no depende del orden. Una primera pasada
+    busca el run_id máximo y la segunda cuenta filas y eventos en `points`
+    tramos de run_id: sus sumas acumuladas son exactamente la curva de la
+    lectura completa, evaluada al final de cada tramo. La memoria depende de
+    `points` y de la cantidad de respuestas distintas, no de la de ejecuciones.
+
+    Returns:
+        Tupla (curva con cumulative_n y cumulative_events, frecuencia de cada respuesta)
+    """
+    max_run_id = 0
+    for chunk in iter_results(filepath, columns=['run_id'], chunk_rows=chunk_rows):
+        max_run_id = max(max_run_id, int(chunk['run_id'].max()))
+    width = max(1, -(-max_run_id // points))  # División redondeando hacia arriba
+    n_blocks = max_run_id // width + 1
+
+    rows = np.zeros(n_blocks, dtype=np.int64)
+    events = np.zeros(n_blocks, dtype=np.int64)
+    response_counts = pd.Series(dtype=np.int64)
+    for chunk in iter_results(filepath, columns=['run_id', 'response_text', 'event'], chunk_rows=chunk_rows):
+        blocks = chunk['run_id'].to_numpy(dtype=np.int64) // width
+        rows += np.bincount(blocks, minlength=n_blocks)
+        events += np.bincount(blocks, weights=chunk['event'].to_numpy(dtype=float), minlength=n_blocks).astype(np.int64)
+        response_counts = response_counts.add(chunk['response_text'].astype(str).value_counts(), fill_value=0)
+
+    curve = pd.DataFrame({'cumulative_n': np.cumsum(rows), 'cumulative_events': np.cumsum(events)})
+    curve = curve[rows > 0].reset_index(drop=True)
+    return curve, response_counts.astype(np.int64).sort_values(ascending=False, kind='stable')
+
+def main(chunk_rows=None):
+    """
+    Genera los gráficos de convergencia y de distribución de respuestas.
+
+    Con `chunk_rows` el archivo se lee por bloques de esa cantidad de filas y
+    la curva se evalúa en CURVE_POINTS puntos (ver chunked_convergence).
+    """
     if not os.path.exists(RESULTS_FILE):
         print(f"No se encontró {RESULTS_FILE}. Ejecutá primero experimento.py")
         return
 
-    df = pd.read_csv(RESULTS_FILE)
+    if chunk_rows:
+        df, response_counts = chunked_convergence(RESULTS_FILE, chunk_rows)
+    else:
+        # El experimento escribe las filas en orden de finalización
+        df = read_results(RESULTS_FILE, columns=['run_id', 'response_text', 'event'])
+        df = df.sort_values('run_id', ignore_index=True)
+        response_counts = df['response_text'].value_counts()
+
+        # Calculamos estadísticas acumulativas
+        # Si la corrida se interrumpió puede haber run_id faltantes: contamos filas
+        df['cumulative_n'] = range(1, len(df) + 1)
+        df['cumulative_events'] = df['event'].cumsum()
     
     # --- 1. Gráfico de Convergencia del Intervalo de Confianza ---
-    # Calculamos estadísticas acumulativas
-    df['cumulative_n'] = df['run_id']
-    df['cumulative_events'] = df['event'].cumsum()
     df['p_hat'] = df['cumulative_events'] / df['cumulative_n']
     
     df['ci_lower'], df['ci_upper'] = calculate_normal_approx_interval_vectorized(
@@ -64,7 +118,7 @@ def main():
     plt.figure(figsize=(10, 6))
     
     # Top 5 respuestas más frecuentes
-    counts = df['response_text'].value_counts().head(5)
+    counts = response_counts.head(5)
     
     # Verde para respuestas correctas, Rojo para incorrectas
     colors = []
@@ -85,4 +139,9 @@ def main():
     print(f"Gráfico guardado: {DISTRIBUTION_PLOT}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Graficar la convergencia del Capítulo 2.')
+    parser.add_argument('--chunked', nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar='FILAS',
+                        help=f'Leer el archivo por bloques de FILAS filas (por defecto {DEFAULT_CHUNK_ROWS}), con memoria acotada')
+    args = parser.parse_args()
+
+    main(chunk_rows=args.chunked)
@@ -3,29 +3,59 @@ Experimento del Capítulo 2: Estimación de Eventos Raros
 
 Este script estima la probabilidad de un fallo de factualidad (error histórico)
 en el modelo de lenguaje, utilizando un prompt con conflicto interno.
+
+Cada ejecución (run_id) es una unidad de trabajo del runner; se puede ejecutar
+con `python capitulo_2/experimento.py` o `python -m runner capitulo_2`.
+
+Con `--set early_stop=true` la respuesta se recibe en streaming y se corta
+apenas se completa el año o queda claro que no es uno (ver api_client/parsers.py).
+Está desactivado por defecto porque cambia la definición del evento: se guarda
+sólo el año y "1713 fue..." cuenta como correcta.
+
+Con `--set sequential=true` el muestreo es secuencial (ver secuencial.py):
+`n_runs` pasa a ser el presupuesto máximo y la ejecución se detiene apenas el
+intervalo de confianza alcanza el ancho objetivo o decide contra el umbral.
 """
 
 import sys
 import os
-import time
 import math
-import pandas as pd
-from tqdm import tqdm
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_client.groq_client import GroqClient
+from runner import main, has_results, unit_sample_index
+from results_io import read_results
+from results_io.schemas import CAPITULO_2
+from capitulo_2.secuencial import SequentialRule, proportion_interval
+from api_client.parsers import YearParser
 
 # --- CONFIGURACIÓN ---
-SYSTEM_MESSAGE = "Sos un asistente útil."
-
-PROMPT = """Respondé con una única frase afirmativa.
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "system_message": "Sos un asistente útil.",
+    "prompt": """Respondé con una única frase afirmativa.
 
 ¿En qué año Jacob Bernoulli publicó el libro "Ars Conjectandi"?
-(Solo respondé con el año)"""
-
-EXPECTED_RESPONSE = "1713"  # Respuesta correcta esperada
-N_VALUES = [200]            # Cantidad de ejecuciones
-OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
+(Solo respondé con el año)""",
+    "expected_response": "1713",  # Respuesta correcta esperada
+    "n_runs": 200,                # Cantidad de ejecuciones (presupuesto máximo en modo secuencial)
+    "temperature": 0.8,
+    "top_p": 1.0,
+    "max_tokens": 20,
+    "early_stop": False,          # Cortar el stream apenas se decide la respuesta
+    "max_in_flight": 16,          # Cantidad máxima de requests simultáneas
+    "flush_every": 10,            # Filas por lote escrito en el archivo de resultados
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados.parquet"),
+    # Muestreo secuencial (0 desactiva el criterio correspondiente)
+    "sequential": False,
+    "interval_method": "wilson",  # "wilson" o "clopper-pearson"
+    "confidence": 0.95,
+    "target_width": 0.05,         # Detenerse cuando upper - lower <= target_width
+    "decision_threshold": 0.0,    # Detenerse cuando el intervalo queda de un lado de este umbral
+    "min_runs": 20,               # Ejecuciones mínimas antes de evaluar la parada
+}
+
+SCHEMA = CAPITULO_2
+ANSWER_PARSER = YearParser()
 
 def calculate_normal_approx_interval(n, p_hat, confidence=0.95):
     """
@@ -47,80 +77,92 @@ def calculate_normal_approx_interval(n, p_hat, confidence=0.95):
     
     return lower, upper
 
-def run_experiment():
-    print(f"=== Capítulo 2 - Estimación de Eventos Raros ===")
-    print(f"Evento E: Respuesta != '{EXPECTED_RESPONSE}'")
-    
+def work_units(config):
+    for run_id in range(1, config["n_runs"] + 1):
+        yield {"unit_id": str(run_id), "run_id": run_id}
+
+async def run_unit(client, unit, config):
+    # Las filas se escriben en orden de finalización, el análisis las reordena por run_id
+    request = dict(
+        messages=[
+            {"role": "system", "content": config["system_message"]},
+            {"role": "user", "content": config["prompt"]}
+        ],
+        temperature=config["temperature"],
+        top_p=config["top_p"],
+        max_tokens=config["max_tokens"]
+    )
+    sample_index = unit_sample_index(unit["unit_id"])
     try:
-        client = GroqClient()
-    except ValueError as e:
-        print(f"Error al inicializar cliente: {e}")
-        return
-
-    results = []
-    total_runs = N_VALUES[0]
-    print(f"Iniciando {total_runs} ejecuciones...")
-
-    success_count = 0
-    event_count = 0  # Cuenta de errores (respuestas incorrectas)
-
-    for i in tqdm(range(total_runs), desc="Progreso"):
-        run_id = i + 1
-        
-        try:
-            response = client.chat(
-                messages=[
-                    {"role": "system", "content": SYSTEM_MESSAGE},
-                    {"role": "user", "content": PROMPT}
-                ],
-                temperature=0.8,
-                top_p=1.0,
-                max_tokens=20
-            )
-            
-            content = response.strip()
-            
-            # Verificamos si la respuesta es correcta
-            if content == EXPECTED_RESPONSE or content == f"{EXPECTED_RESPONSE}.":
-                is_event = 0
-                success_count += 1
-            else:
-                is_event = 1
-                event_count += 1
-                
-            results.append({
-                "run_id": run_id,
-                "response_text": content,
-                "event": is_event
-            })
-            
-            time.sleep(0.2)
-
-        except Exception as e:
-            print(f"Error en ejecución {run_id}: {e}")
-            results.append({
-                "run_id": run_id,
-                "response_text": "ERROR",
-                "event": 0
-            })
-
-    # Guardamos los resultados
-    df = pd.DataFrame(results)
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"\nResultados guardados en {OUTPUT_FILE}")
-    
-    # Calculamos estadísticas finales
+        if config["early_stop"]:
+            streamed = await client.chat_stream(**request, parser=ANSWER_PARSER, sample_index=sample_index)
+            # Si la respuesta es válida guardamos sólo la respuesta, si no el texto recibido
+            result = streamed.answer if streamed.answer is not None else streamed.content
+        else:
+            result = await client.chat(**request, sample_index=sample_index)
+    except Exception as e:
+        print(f"Error en ejecución {unit['run_id']}: {e}")
+        return [{"run_id": unit["run_id"], "response_text": "ERROR", "event": 0}]
+
+    with client.phase("parse"):
+        content = result.strip()
+        expected = config["expected_response"]
+
+        # Verificamos si la respuesta es correcta; el evento E es una respuesta incorrecta
+        is_event = 0 if content in (expected, f"{expected}.") else 1
+
+        return [{"run_id": unit["run_id"], "response_text": content, "event": is_event}]
+
+def make_monitor(config):
+    """Regla de parada del modo secuencial, inicializada con lo ya guardado al reanudar."""
+    if not config["sequential"]:
+        return None
+
+    rule = SequentialRule(
+        confidence=config["confidence"],
+        method=config["interval_method"],
+        target_width=config["target_width"] or None,
+        decision_threshold=config["decision_threshold"] or None,
+        min_runs=config["min_runs"],
+        max_runs=config["n_runs"],
+    )
+    if has_results(config["output_file"]):
+        df = read_results(config["output_file"], columns=["response_text", "event"])
+        df = df[df["response_text"] != "ERROR"]
+        rule.update(int(df["event"].sum()), len(df))
+
+    def monitor(rows):
+        # Las llamadas fallidas no son observaciones del evento
+        rows = [row for row in rows if row["response_text"] != "ERROR"]
+        return rule.update(sum(row["event"] for row in rows), len(rows))
+
+    return monitor
+
+def summarize(config):
+    """Estadísticas finales sobre todas las ejecuciones guardadas."""
+    df = read_results(config["output_file"], columns=["response_text", "event"])
     n = len(df)
-    events = df['event'].sum()
+    events = int(df["event"].sum())
     p_hat = events / n if n > 0 else 0
     
     lower, upper = calculate_normal_approx_interval(n, p_hat)
     
     print("\n=== Resultados Finales ===")
+    print(f"Evento E: Respuesta != '{config['expected_response']}'")
     print(f"Total ejecuciones (n): {n}")
     print(f"Eventos observados (E): {events}")
     print(f"Proporción estimada (p̂): {p_hat:.4f}")
     print(f"Intervalo de confianza (95%): [{lower:.4f}, {upper:.4f}]")
 
+    if config["sequential"]:
+        valid = df[df["response_text"] != "ERROR"]
+        lower, upper = proportion_interval(
+            int(valid["event"].sum()), len(valid), config["confidence"], config["interval_method"]
+        )
+        print(
+            f"Intervalo {config['interval_method']} ({config['confidence']:.0%}, "
+            f"sin errores de API): [{lower:.4f}, {upper:.4f}]"
+        )
+
 if __name__ == "__main__":
-    run_experiment()
+    main(module=sys.modules[__name__])
@@ -0,0 +1,189 @@
+"""
+Muestreo secuencial con parada temprana para la estimación de eventos raros.
+
+Después de cada respuesta se actualiza un intervalo de confianza para la
+proporción (Wilson o Clopper-Pearson) y se decide si seguir muestreando:
+
+- Ancho objetivo: se detiene cuando `upper - lower <= target_width`.
+- Umbral de decisión: se detiene cuando el intervalo queda entero de un lado
+  de `decision_threshold` (P(E) < umbral o P(E) > umbral con la confianza pedida).
+- Presupuesto: nunca se superan `max_runs` ejecuciones.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+WILSON = "wilson"
+CLOPPER_PEARSON = "clopper-pearson"
+METHODS = (WILSON, CLOPPER_PEARSON)
+
+
+def wilson_interval(events: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Intervalo de Wilson para una proporción.
+
+    A diferencia de la aproximación normal, no colapsa a [0, 0] cuando no se
+    observó ningún evento, por lo que sirve para eventos raros.
+    """
+    if n == 0:
+        return 0.0, 1.0
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p_hat = events / n
+    denominator = 1 + z ** 2 / n
+    center = (p_hat + z ** 2 / (2 * n)) / denominator
+    margin = z * math.sqrt(p_hat * (1 - p_hat) / n + z ** 2 / (4 * n ** 2)) / denominator
+
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def _beta_continued_fraction(x: float, a: float, b: float) -> float:
+    # Fracción continua de la beta incompleta (método de Lentz)
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = 1.0
+    d = 1 - qab * x / qap
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-14:
+            break
+    return h
+
+
+def regularized_beta(x: float, a: float, b: float) -> float:
+    """Función beta incompleta regularizada I_x(a, b), calculada en escala logarítmica."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    log_front = (
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log1p(-x)
+    )
+    # La fracción continua converge rápido sólo de un lado de la media
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_continued_fraction(x, a, b) / a
+    return 1 - math.exp(log_front) * _beta_continued_fraction(1 - x, b, a) / b
+
+
+def _beta_quantile(q: float, a: float, b: float) -> float:
+    # I_x(a, b) es creciente en x: bisección
+    low, high = 0.0, 1.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if regularized_beta(middle, a, b) < q:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def clopper_pearson_interval(events: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Intervalo exacto de Clopper-Pearson para una proporción.
+
+    Usa la relación entre la cola binomial y la beta:
+    lower = Beta(α/2; k, n-k+1), upper = Beta(1-α/2; k+1, n-k).
+    """
+    if n == 0:
+        return 0.0, 1.0
+
+    alpha = 1 - confidence
+    lower = 0.0 if events == 0 else _beta_quantile(alpha / 2, events, n - events + 1)
+    upper = 1.0 if events == n else _beta_quantile(1 - alpha / 2, events + 1, n - events)
+    return lower, upper
+
+
+def proportion_interval(
+    events: int, n: int, confidence: float = 0.95, method: str = WILSON
+) -> Tuple[float, float]:
+    """Intervalo de confianza para una proporción con el método pedido."""
+    if method == WILSON:
+        return wilson_interval(events, n, confidence)
+    if method == CLOPPER_PEARSON:
+        return clopper_pearson_interval(events, n, confidence)
+    raise ValueError(f"Método desconocido: {method}. Opciones: {', '.join(METHODS)}")
+
+
+class SequentialRule:
+    """Acumula observaciones y decide cuándo detener el muestreo."""
+
+    def __init__(
+        self,
+        confidence: float = 0.95,
+        method: str = WILSON,
+        target_width: Optional[float] = None,
+        decision_threshold: Optional[float] = None,
+        min_runs: int = 0,
+        max_runs: Optional[int] = None,
+    ):
+        """
+        Args:
+            confidence: Nivel de confianza de los intervalos
+            method: "wilson" o "clopper-pearson"
+            target_width: Ancho de intervalo que alcanza para detenerse (None = no usar)
+            decision_threshold: Umbral p0 a decidir si P(E) está por debajo o por encima (None = no usar)
+            min_runs: Ejecuciones mínimas antes de evaluar los criterios de parada
+            max_runs: Presupuesto máximo de ejecuciones
+        """
+        if method not in METHODS:
+            raise ValueError(f"Método desconocido: {method}. Opciones: {', '.join(METHODS)}")
+        self.confidence = confidence
+        self.method = method
+        self.target_width = target_width
+        self.decision_threshold = decision_threshold
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.events = 0
+        self.n = 0
+
+    @property
+    def interval(self) -> Tuple[float, float]:
+        return proportion_interval(self.events, self.n, self.confidence, self.method)
+
+    def update(self, events: int, n: int) -> Optional[str]:
+        """
+        Agrega `events` eventos en `n` ejecuciones nuevas.
+
+        Returns:
+            Motivo de parada, o None si hay que seguir muestreando
+        """
+        self.events += events
+        self.n += n
+        return self.stop_reason()
+
+    def stop_reason(self) -> Optional[str]:
+        """Motivo de parada con lo observado hasta ahora, o None para seguir."""
+        if self.max_runs is not None and self.n >= self.max_runs:
+            return f"presupuesto agotado ({self.n} ejecuciones)"
+        if self.n < max(1, self.min_runs):
+            return None
+
+        lower, upper = self.interval
+        if self.target_width is not None and upper - lower <= self.target_width:
+            return f"ancho del intervalo {upper - lower:.4f} <= {self.target_width}"
+        if self.decision_threshold is not None:
+            if upper < self.decision_threshold:
+                return f"P(E) < {self.decision_threshold} (cota superior {upper:.4f})"
+            if lower > self.decision_threshold:
+                return f"P(E) > {self.decision_threshold} (cota inferior {lower:.4f})"
+        return None
@@ -0,0 +1,192 @@
+"""
+Ajuste de distribuciones continuas a muestras de tiempos.
+
+Se usa para modelar cada componente de la latencia (TTFT, generación, cola,
+tiempos entre tokens) por separado. Para cada familia se estiman los
+parámetros por máxima verosimilitud y se reportan la log-verosimilitud, el AIC
+y el estadístico de Kolmogorov-Smirnov:
+
+- Exponencial: λ = 1 / x̄.
+- Exponencial desplazada: ubicación = mín(x), λ = 1 / (x̄ - mín(x)). Modela un
+  piso fijo (red, prompt) más una parte sin memoria.
+- Lognormal: μ y σ de log(x).
+- Gamma: forma por la aproximación cerrada de Minka al MLE, escala = x̄ / k.
+
+Las familias lognormal y gamma requieren valores positivos.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+EXPONENTIAL = "exponencial"
+SHIFTED_EXPONENTIAL = "exponencial desplazada"
+LOGNORMAL = "lognormal"
+GAMMA = "gamma"
+
+_GAMMA_EPS = 1e-12
+_GAMMA_MAX_ITER = 500
+
+
+def regularized_gamma_p(a: float, x: float) -> float:
+    """
+    Función gamma incompleta regularizada inferior P(a, x).
+
+    Usa la serie de potencias para x < a + 1 y la fracción continua
+    (algoritmo de Lentz) para el complemento en otro caso.
+    """
+    if x <= 0:
+        return 0.0
+    log_prefactor = a * math.log(x) - x - math.lgamma(a)
+
+    if x < a + 1:
+        term = 1.0 / a
+        total = term
+        denominator = a
+        for _ in range(_GAMMA_MAX_ITER):
+            denominator += 1
+            term *= x / denominator
+            total += term
+            if abs(term) < abs(total) * _GAMMA_EPS:
+                break
+        return min(1.0, total * math.exp(log_prefactor))
+
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, _GAMMA_MAX_ITER):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < _GAMMA_EPS:
+            break
+    return max(0.0, 1.0 - math.exp(log_prefactor) * h)
+
+
+def ks_statistic(samples: np.ndarray, cdf: Callable[[np.ndarray], np.ndarray]) -> float:
+    """Distancia de Kolmogorov-Smirnov entre la CDF empírica y `cdf`."""
+    x = np.sort(np.asarray(samples, dtype=float))
+    n = len(x)
+    fitted = cdf(x)
+    upper = np.arange(1, n + 1) / n - fitted
+    lower = fitted - np.arange(0, n) / n
+    return float(max(upper.max(), lower.max()))
+
+
+def _result(model: str, params: Dict[str, float], log_likelihood: float, samples: np.ndarray,
+            pdf: Callable, cdf: Callable) -> Dict:
+    return {
+        "model": model,
+        "params": params,
+        "log_likelihood": float(log_likelihood),
+        "aic": 2 * len(params) - 2 * float(log_likelihood),
+        "ks": ks_statistic(samples, cdf),
+        "pdf": pdf,
+        "cdf": cdf,
+    }
+
+
+def fit_exponential(samples: np.ndarray) -> Optional[Dict]:
+    x = np.asarray(samples, dtype=float)
+    mean = x.mean()
+    if mean <= 0 or x.min() < 0:
+        return None
+    rate = 1.0 / mean
+    log_likelihood = len(x) * math.log(rate) - rate * x.sum()
+    return _result(
+        EXPONENTIAL, {"rate": rate}, log_likelihood, x,
+        pdf=lambda t: np.where(t >= 0, rate * np.exp(-rate * t), 0.0),
+        cdf=lambda t: np.where(t >= 0, 1 - np.exp(-rate * t), 0.0),
+    )
+
+
+def fit_shifted_exponential(samples: np.ndarray) -> Optional[Dict]:
+    x = np.asarray(samples, dtype=float)
+    loc = x.min()
+    excess = x.mean() - loc
+    if excess <= 0:
+        return None
+    rate = 1.0 / excess
+    log_likelihood = len(x) * math.log(rate) - rate * (x - loc).sum()
+    return _result(
+        SHIFTED_EXPONENTIAL, {"loc": loc, "rate": rate}, log_likelihood, x,
+        pdf=lambda t: np.where(t >= loc, rate * np.exp(-rate * (t - loc)), 0.0),
+        cdf=lambda t: np.where(t >= loc, 1 - np.exp(-rate * (t - loc)), 0.0),
+    )
+
+
+def fit_lognormal(samples: np.ndarray) -> Optional[Dict]:
+    x = np.asarray(samples, dtype=float)
+    if x.min() <= 0:
+        return None
+    logs = np.log(x)
+    mu = logs.mean()
+    sigma = logs.std()
+    if sigma <= 0:
+        return None
+    log_likelihood = np.sum(-logs - math.log(sigma) - 0.5 * math.log(2 * math.pi)
+                            - (logs - mu) ** 2 / (2 * sigma ** 2))
+    normal = NormalDist(mu, sigma)
+
+    def pdf(t):
+        t = np.asarray(t, dtype=float)
+        safe = np.where(t > 0, t, 1.0)
+        density = np.exp(-(np.log(safe) - mu) ** 2 / (2 * sigma ** 2)) / (safe * sigma * math.sqrt(2 * math.pi))
+        return np.where(t > 0, density, 0.0)
+
+    def cdf(t):
+        t = np.asarray(t, dtype=float)
+        return np.array([normal.cdf(math.log(v)) if v > 0 else 0.0 for v in t.ravel()]).reshape(t.shape)
+
+    return _result(LOGNORMAL, {"mu": mu, "sigma": sigma}, log_likelihood, x, pdf, cdf)
+
+
+def fit_gamma(samples: np.ndarray) -> Optional[Dict]:
+    x = np.asarray(samples, dtype=float)
+    if x.min() <= 0:
+        return None
+    mean = x.mean()
+    s = math.log(mean) - np.log(x).mean()
+    if s <= 0:
+        return None
+    shape = (3 - s + math.sqrt((s - 3) ** 2 + 24 * s)) / (12 * s)
+    scale = mean / shape
+    log_likelihood = (np.sum((shape - 1) * np.log(x) - x / scale)
+                      - len(x) * (math.lgamma(shape) + shape * math.log(scale)))
+    log_norm = math.lgamma(shape) + shape * math.log(scale)
+
+    def pdf(t):
+        t = np.asarray(t, dtype=float)
+        safe = np.where(t > 0, t, 1.0)
+        density = np.exp((shape - 1) * np.log(safe) - safe / scale - log_norm)
+        return np.where(t > 0, density, 0.0)
+
+    def cdf(t):
+        t = np.asarray(t, dtype=float)
+        return np.array([regularized_gamma_p(shape, v / scale) for v in t.ravel()]).reshape(t.shape)
+
+    return _result(GAMMA, {"shape": shape, "scale": scale}, log_likelihood, x, pdf, cdf)
+
+
+FITTERS = (fit_exponential, fit_shifted_exponential, fit_lognormal, fit_gamma)
+
+
+def fit_all(samples: np.ndarray) -> List[Dict]:
+    """
+    Ajusta todas las familias que admiten la muestra.
+
+    Returns:
+        Lista de ajustes ordenada por AIC (el mejor primero)
+    """
+    fits = [fit for fit in (fitter(samples) for fitter in FITTERS) if fit is not None]
+    return sorted(fits, key=lambda fit: fit["aic"])
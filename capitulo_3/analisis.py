@@ -9,19 +9,192 @@ Metodología:
 - Se utiliza una "Timeline Virtual" para simular un sistema en saturación
 - Se eliminan los delays artificiales entre requests
 - Se trunca al último bucket completo para evitar sesgo
+
+Si la corrida se hizo en streaming, además se descompone la latencia (TTFT,
+generación, cola, prompt, red y tiempos entre tokens) y se ajustan
+distribuciones a cada componente por separado (ver ajustes.py).
+
+Con --chunked el archivo se lee por bloques y se acumula sólo lo necesario
+(ver incremental.py): momentos, histogramas, conteos por ventana y la
+Timeline Virtual son exactos; KS, AD y los ajustes por componente se calculan
+sobre una muestra uniforme de hasta SAMPLE_SIZE valores.
 """
 
 import os
+import sys
 import math
 import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
-DATA_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_io import read_results, iter_results, find_results, derived_path, result_columns, DEFAULT_CHUNK_ROWS
+from capitulo_3.ajustes import fit_all
+from capitulo_3.bondad import (
+    poisson_pmf,
+    chi2_quantile,
+    ks_exponential,
+    anderson_darling_exponential,
+    exponential_class_edges,
+    chi2_exponential,
+    chi2_exponential_counts,
+    chi2_poisson,
+    dispersion_test,
+)
+from capitulo_3.incremental import RunningMoments, Reservoir, WindowCounter
+
+DATA_FILE = find_results(os.path.dirname(__file__))
 DEFAULT_BUCKET_SIZE = 1.0  # Tamaño de ventana en segundos
+MIN_COMPONENT_SAMPLES = 10  # Muestras mínimas para ajustar una componente
+TOKEN_GAPS = 'Entre tokens'  # Componente por token (el resto tiene una muestra por request)
+DISPERSION_LEVEL = 0.95  # Cobertura de la banda Poisson en la curva de dispersión
+MIN_DISPERSION_BUCKETS = 10  # Ventanas mínimas para que un tamaño entre en la curva
+STREAM_COLUMNS = ['ttft_seconds', 'token_gaps', 'server_queue_time', 'server_prompt_time',
+                  'server_completion_time', 'server_total_time']
+LATENCY_BINS = 20  # Clases del histograma de latencias
+SAMPLE_SIZE = 200_000  # Muestra para KS, AD y los ajustes en la lectura por bloques
+SAMPLE_SEED = 0
+
+def window_counts(event_times, window):
+    """
+    Conteos de eventos en ventanas consecutivas de `window` segundos.
+
+    Se trunca al último bucket completo. Con los tiempos ordenados, el conteo
+    acumulado hasta cada borde sale de un `searchsorted` y los conteos por
+    ventana son sus diferencias, sin recorrer los eventos.
+
+    Args:
+        event_times: Tiempos de los eventos, ordenados de menor a mayor
+        window: Tamaño de la ventana en segundos
+
+    Returns:
+        Tupla (bordes, conteos) con len(bordes) = len(conteos) + 1
+    """
+    n_windows = int(math.floor(event_times[-1] / window)) if len(event_times) else 0
+    edges = np.arange(n_windows + 1) * window
+    cumulative = np.searchsorted(event_times, edges, side='right')
+    return edges, np.diff(cumulative)
+
+def virtual_times(latencies, offset=0.0):
+    """
+    Tiempos de finalización en la Timeline Virtual: suma acumulada de las latencias.
+
+    `offset` es el tiempo virtual al final del bloque anterior. Se suma al
+    primer elemento antes de acumular, así que el resultado es idéntico al de
+    un único `cumsum` sobre todas las latencias.
+    """
+    values = np.array(latencies, dtype=float)
+    if len(values):
+        values[0] += offset
+    return np.cumsum(values)
+
+def usable_time(t_max_raw, bucket_size):
+    """Tiempo virtual truncado al último bucket completo."""
+    return math.floor(t_max_raw / bucket_size) * bucket_size
+
+def write_timeline(path, request_ids, latencies, virtual_completion_times, t_max_usable, append=False):
+    pd.DataFrame({
+        "request_id": request_ids,
+        "latency_seconds": latencies,
+        "t_virtual_completion": virtual_completion_times,
+        "in_usable_range": virtual_completion_times <= t_max_usable
+    }).to_csv(path, index=False, mode='a' if append else 'w', header=not append)
+
+def load_run(filepath, bucket_size):
+    """
+    Resumen de la corrida leyendo el archivo completo; escribe la Timeline Virtual.
+
+    Returns:
+        Diccionario con las estadísticas que usa analyze_run, o None si no hay
+        requests exitosas
+    """
+    df = read_results(filepath, columns=['request_id', 'latency_seconds', 'status'])
+    df_ok = df[df['status'] == 'ok']
+    if df_ok.empty:
+        return None
+
+    # t_virtual[i] = suma de las primeras i latencias
+    latencies = df_ok['latency_seconds'].values
+    virtual_completion_times = virtual_times(latencies)
+    t_max_raw = virtual_completion_times[-1]
+    t_max_usable = usable_time(t_max_raw, bucket_size)
+    write_timeline(derived_path(filepath, '_virtual_timeline.csv'), df_ok['request_id'].values,
+                   latencies, virtual_completion_times, t_max_usable)
+    return {
+        "n": len(latencies),
+        "mean": np.mean(latencies),
+        "std": np.std(latencies),
+        "max": latencies.max(),
+        "histogram": np.histogram(latencies, bins=LATENCY_BINS),
+        "sample": latencies,
+        "chi2": chi2_exponential(latencies),
+        "t_max_raw": t_max_raw,
+        "n_usable": np.sum(virtual_completion_times <= t_max_usable),
+        "windows": window_counts(virtual_completion_times, bucket_size),
+    }
+
+def scan_run(filepath, bucket_size, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Lo mismo que load_run, leyendo el archivo por bloques de `chunk_rows` filas.
+
+    La primera pasada acumula los momentos, el mínimo y el máximo, el tiempo
+    virtual total y una muestra de las latencias; con esos valores, la segunda
+    arma el histograma, las clases de la prueba χ², los conteos por ventana y
+    la Timeline Virtual, que se escribe bloque a bloque. Todo coincide con la
+    lectura completa salvo KS y AD, que usan la muestra si hay más de
+    SAMPLE_SIZE latencias.
+    """
+    def ok_chunks():
+        for chunk in iter_results(filepath, columns=['request_id', 'latency_seconds', 'status'],
+                                  chunk_rows=chunk_rows):
+            chunk = chunk[chunk['status'] == 'ok']
+            if not chunk.empty:
+                yield chunk['request_id'].values, chunk['latency_seconds'].to_numpy(dtype=float)
 
-def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
+    moments = RunningMoments()
+    sample = Reservoir(SAMPLE_SIZE, seed=SAMPLE_SEED)
+    t_max_raw = 0.0
+    for _, latencies in ok_chunks():
+        moments.update(latencies)
+        sample.update(latencies)
+        t_max_raw = virtual_times(latencies, t_max_raw)[-1]
+    if moments.n == 0:
+        return None
+
+    t_max_usable = usable_time(t_max_raw, bucket_size)
+    rate = 1.0 / moments.mean
+    histogram_edges = np.histogram_bin_edges([moments.min, moments.max], bins=LATENCY_BINS)
+    class_edges = exponential_class_edges(moments.n, rate)
+    histogram = np.zeros(LATENCY_BINS, dtype=np.int64)
+    observed = np.zeros(len(class_edges) + 1, dtype=np.int64)
+    windows = WindowCounter(bucket_size)
+    n_usable = 0
+    offset = 0.0
+    timeline_file = derived_path(filepath, '_virtual_timeline.csv')
+    for i, (request_ids, latencies) in enumerate(ok_chunks()):
+        virtual_completion_times = virtual_times(latencies, offset)
+        offset = virtual_completion_times[-1]
+        histogram += np.histogram(latencies, bins=histogram_edges)[0]
+        observed += np.bincount(np.searchsorted(class_edges, latencies, side='right'), minlength=len(observed))
+        windows.add(virtual_completion_times)
+        n_usable += int(np.sum(virtual_completion_times <= t_max_usable))
+        write_timeline(timeline_file, request_ids, latencies, virtual_completion_times, t_max_usable, append=i > 0)
+
+    return {
+        "n": moments.n,
+        "mean": moments.mean,
+        "std": moments.std,
+        "max": moments.max,
+        "histogram": (histogram, histogram_edges),
+        "sample": sample.values,
+        "chi2": chi2_exponential_counts(observed, rate),
+        "t_max_raw": t_max_raw,
+        "n_usable": n_usable,
+        "windows": windows.result(),
+    }
+
+def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE, chunk_rows=None):
     print(f"Analizando archivo: {filepath}")
     print(f"Tamaño de bucket: {bucket_size}s")
     
@@ -29,22 +202,19 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
         print("El archivo no existe.")
         return
 
-    df = pd.read_csv(filepath)
+    # Con chunk_rows se lee por bloques (ver scan_run)
+    run = scan_run(filepath, bucket_size, chunk_rows) if chunk_rows else load_run(filepath, bucket_size)
     
-    # Filtramos solo requests exitosas
-    df_ok = df[df['status'] == 'ok'].copy()
-    
-    if df_ok.empty:
+    if run is None:
         print("No hay requests exitosas para analizar.")
         return
 
-    n_events = len(df_ok)
+    n_events = run['n']
     print(f"\nTotal eventos OK: {n_events}")
 
     # --- 1. Análisis de Tiempos de Respuesta (Distribución Exponencial) ---
-    latencies = df_ok['latency_seconds'].values
-    mean_latency = np.mean(latencies)
-    std_latency = np.std(latencies)
+    mean_latency = run['mean']
+    std_latency = run['std']
     lambda_hat_1 = 1.0 / mean_latency  # Estimador MLE para λ de la Exponencial
     
     print(f"\n--- Tiempos de Respuesta (n={n_events}) ---")
@@ -54,10 +224,12 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
     
     # Gráfico: Histograma vs Curva Exponencial teórica
     plt.figure(figsize=(10, 5))
-    count, bins, ignored = plt.hist(latencies, bins=20, density=True, alpha=0.6, color='b', label='Datos Empíricos')
+    histogram, histogram_edges = run['histogram']
+    plt.hist(histogram_edges[:-1], bins=histogram_edges, weights=histogram, density=True,
+             alpha=0.6, color='b', label='Datos Empíricos')
     
     # Curva teórica f(x) = λ * exp(-λx), comenzando desde x=0
-    x = np.linspace(0, max(latencies) * 1.1, 100)
+    x = np.linspace(0, run['max'] * 1.1, 100)
     pdf = lambda_hat_1 * np.exp(-lambda_hat_1 * x)
     plt.plot(x, pdf, 'r-', lw=2, label=fr'Exponencial ($\lambda={lambda_hat_1:.2f}$)')
     
@@ -67,30 +239,25 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
     plt.legend()
     plt.grid(True, alpha=0.3)
     
-    plot_file = filepath.replace('.csv', '_latency.png')
+    plot_file = derived_path(filepath, '_latency.png')
     plt.savefig(plot_file)
     print(f"Gráfico de latencia guardado en: {plot_file}")
     plt.close()
 
-    # --- 2. Construcción del Timeline Virtual ---
-    # t_virtual[i] = suma de las primeras i latencias
-    # Esto simula un sistema en saturación donde cada request comienza inmediatamente
-    # después de que la anterior termina
-    virtual_completion_times = np.cumsum(latencies)
-    
-    t_max_raw = virtual_completion_times[-1]
+    # --- 2. Timeline Virtual ---
+    # Cada request comienza inmediatamente después de que la anterior termina,
+    # como en un sistema en saturación
+    t_max_raw = run['t_max_raw']
     
     # Truncamos al último bucket completo para evitar sesgo en el conteo
-    t_max_usable = math.floor(t_max_raw / bucket_size) * bucket_size
+    t_max_usable = usable_time(t_max_raw, bucket_size)
     
     if t_max_usable <= 0:
         print(f"Error: t_max_usable = {t_max_usable}. Aumentar N_REQUESTS o reducir bucket_size.")
         return
     
-    # Filtramos eventos que caen dentro del tiempo usable
-    mask_usable = virtual_completion_times <= t_max_usable
-    n_events_usable = np.sum(mask_usable)
-    virtual_times_usable = virtual_completion_times[mask_usable]
+    # Eventos que caen dentro del tiempo usable
+    n_events_usable = run['n_usable']
     
     print(f"\n--- Timeline Virtual ---")
     print(f"Tiempo total virtual (raw): {t_max_raw:.4f} s")
@@ -98,11 +265,9 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
     print(f"Eventos dentro del tiempo usable: {n_events_usable}/{n_events}")
 
     # --- 3. Conteo de eventos por bucket (Proceso de Poisson) ---
-    bins_time = np.arange(0, t_max_usable + bucket_size, bucket_size)
-    n_buckets = len(bins_time) - 1
-    
     # Contamos cuántos eventos caen en cada ventana de tiempo
-    counts, _ = np.histogram(virtual_times_usable, bins=bins_time)
+    bins_time, counts = run['windows']
+    n_buckets = len(counts)
     
     mean_count = np.mean(counts)
     var_count = np.var(counts)
@@ -130,19 +295,6 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
     # PMF de Poisson: P(X=k) = (λΔt)^k * exp(-λΔt) / k!
     lambda_poisson = lambda_hat_2 * bucket_size
     
-    def poisson_pmf(k, lam):
-        """Función de masa de probabilidad de Poisson."""
-        vals = []
-        for val in k:
-            if val < 0: 
-                vals.append(0)
-            else:
-                try:
-                    vals.append((math.exp(-lam) * (lam ** val)) / math.factorial(int(val)))
-                except OverflowError:
-                    vals.append(0)
-        return np.array(vals)
-
     pmf_vals = poisson_pmf(x_counts, lambda_poisson)
     
     plt.plot(x_counts, pmf_vals, 'mo-', lw=2, label=fr'Poisson ($\lambda \Delta t={lambda_poisson:.2f}$)')
@@ -154,47 +306,349 @@ def analyze_run(filepath, bucket_size=DEFAULT_BUCKET_SIZE):
     plt.legend()
     plt.grid(True, alpha=0.3)
     
-    plot_file_counts = filepath.replace('.csv', '_counts.png')
+    plot_file_counts = derived_path(filepath, '_counts.png')
     plt.savefig(plot_file_counts)
     print(f"Gráfico de conteos guardado en: {plot_file_counts}")
     plt.close()
 
     # Guardamos los datos de buckets
-    buckets_data = []
-    for i in range(n_buckets):
-        buckets_data.append({
-            "bucket_index": i,
-            "bucket_start_virtual": bins_time[i],
-            "bucket_end_virtual": bins_time[i+1],
-            "count": counts[i]
-        })
-    buckets_file = filepath.replace('.csv', '_buckets.csv')
-    pd.DataFrame(buckets_data).to_csv(buckets_file, index=False)
+    buckets_data = pd.DataFrame({
+        "bucket_index": np.arange(n_buckets),
+        "bucket_start_virtual": bins_time[:-1],
+        "bucket_end_virtual": bins_time[1:],
+        "count": counts
+    })
+    buckets_file = derived_path(filepath, '_buckets.csv')
+    buckets_data.to_csv(buckets_file, index=False)
     print(f"Datos de buckets guardados en: {buckets_file}")
     
-    # Guardamos el timeline virtual
-    virtual_df = pd.DataFrame({
-        "request_id": df_ok['request_id'].values,
-        "latency_seconds": latencies,
-        "t_virtual_completion": virtual_completion_times,
-        "in_usable_range": mask_usable
-    })
-    virtual_file = filepath.replace('.csv', '_virtual_timeline.csv')
-    virtual_df.to_csv(virtual_file, index=False)
+    # El timeline virtual se escribe al leer los datos
+    virtual_file = derived_path(filepath, '_virtual_timeline.csv')
     print(f"Timeline virtual guardado en: {virtual_file}")
     
+    # Pruebas de bondad de ajuste
+    tests = goodness_of_fit(run['sample'], counts, run['chi2'])
+    tests_file = derived_path(filepath, '_bondad.csv')
+    pd.DataFrame(tests).to_csv(tests_file, index=False)
+    print(f"Pruebas de bondad de ajuste guardadas en: {tests_file}")
+    
     # Comparación de estimadores
     print("\n=== Comparación de estimadores de Lambda ===")
     print(f"Lambda 1 (1 / LatenciaMedia): {lambda_hat_1:.4f}")
     print(f"Lambda 2 (Eventos / TiempoUsable): {lambda_hat_2:.4f}")
     print(f"Diferencia relativa: {abs(lambda_hat_1 - lambda_hat_2) / lambda_hat_1 * 100:.2f}%")
 
+def goodness_of_fit(latencies, counts, chi2=None):
+    """
+    Pruebas de bondad de ajuste de las latencias a la Exponencial y de los
+    conteos por ventana a Poisson (ver bondad.py).
+
+    Args:
+        latencies: Latencias (o una muestra, si se pasa `chi2`) para KS y AD
+        counts: Conteos por ventana
+        chi2: Resultado de la prueba χ² ya calculado con todas las latencias
+
+    Returns:
+        Lista de filas con hipótesis, prueba, estadístico y p-valor o decisión
+    """
+    if chi2 is None:
+        chi2 = chi2_exponential(latencies)
+    rows = []
+    print("\n--- Pruebas de bondad de ajuste ---")
+    print("H0: latencias ~ Exponencial(1/S̄)")
+    if len(latencies) < chi2['n']:
+        print(f"  (KS y AD sobre una muestra de {len(latencies)} de {chi2['n']} latencias)")
+    for result in (ks_exponential(latencies), anderson_darling_exponential(latencies)):
+        decision = "se rechaza" if result['reject_5'] else "no se rechaza"
+        print(f"  {result['test']:<10} estadístico modificado {result['statistic']:.4f} "
+              f"(crítico 5%: {result['critical_5']}) -> {decision} al 5%")
+        rows.append({"hypothesis": "Exponencial", "test": result['test'], "n": result['n'],
+                     "statistic": result['statistic'], "critical_5": result['critical_5'],
+                     "reject_5": result['reject_5'], "p_value": None})
+
+    tests = [("Exponencial", chi2)]
+    if len(counts) > 1 and counts.sum() > 0:
+        tests += [("Poisson", chi2_poisson(counts)), ("Poisson", dispersion_test(counts))]
+    for hypothesis, result in tests:
+        if hypothesis == "Poisson" and result['test'] == "Chi²":
+            print("H0: conteos por ventana ~ Poisson(N̄)")
+        reject = bool(result['p_value'] < 0.05)
+        print(f"  {result['test']:<10} estadístico {result['statistic']:.4f} "
+              f"(gl = {result['dof']}), p-valor {result['p_value']:.4g}"
+              f" -> {'se rechaza' if reject else 'no se rechaza'} al 5%")
+        rows.append({"hypothesis": hypothesis, "test": result['test'], "n": result['n'],
+                     "statistic": result['statistic'], "critical_5": None,
+                     "reject_5": reject, "p_value": result['p_value']})
+    return rows
+
+def latency_components(df):
+    """
+    Muestras de cada componente de la latencia, a partir de las columnas de streaming.
+
+    - TTFT: desde el envío hasta el primer token (conexión, cola, prompt y primer paso).
+    - Generación: desde el primer token hasta el final de la respuesta.
+    - Cola / Prompt / Generación (servidor): tiempos informados en `usage`.
+    - Red y overhead: latencia medida menos el tiempo total del servidor.
+    - Entre tokens: tiempos entre tokens consecutivos de todas las respuestas.
+    """
+    components = {
+        'Latencia total': df['latency_seconds'],
+        'TTFT': df['ttft_seconds'],
+        'Generación': df['latency_seconds'] - df['ttft_seconds'],
+        'Cola (servidor)': df['server_queue_time'],
+        'Prompt (servidor)': df['server_prompt_time'],
+        'Generación (servidor)': df['server_completion_time'],
+        'Red y overhead': df['latency_seconds'] - df['server_total_time'],
+    }
+    components = {name: values.dropna().to_numpy(dtype=float) for name, values in components.items()}
+    gaps = [gap for gaps in df['token_gaps'].dropna() for gap in gaps]
+    components[TOKEN_GAPS] = np.asarray(gaps, dtype=float)
+    return components
+
+def analyze_components(filepath, chunk_rows=None):
+    """
+    Ajusta distribuciones a cada componente de la latencia (requiere una corrida en streaming).
+
+    Con `chunk_rows` el archivo se lee por bloques: la cantidad, la media y el
+    CV de cada componente son exactos, y los ajustes y el histograma usan una
+    muestra de hasta SAMPLE_SIZE valores por componente.
+    """
+    if not os.path.exists(filepath) or not set(STREAM_COLUMNS) <= set(result_columns(filepath)):
+        print("\nLos resultados no tienen columnas de streaming; se omite la descomposición de latencia.")
+        return
+
+    columns = ['latency_seconds', 'status'] + STREAM_COLUMNS
+    if chunk_rows:
+        chunks = iter_results(filepath, columns=columns, chunk_rows=chunk_rows)
+    else:
+        chunks = [read_results(filepath, columns=columns)]
+
+    n_requests = 0
+    moments = {}
+    samples_by_name = {}
+    for df in chunks:
+        df = df[(df['status'] == 'ok') & df['ttft_seconds'].notna()]
+        n_requests += len(df)
+        for name, samples in latency_components(df).items():
+            moments.setdefault(name, RunningMoments()).update(samples)
+            if chunk_rows:
+                samples_by_name.setdefault(name, Reservoir(SAMPLE_SIZE, seed=SAMPLE_SEED)).update(samples)
+            else:
+                samples_by_name[name] = samples
+    if chunk_rows:
+        samples_by_name = {name: reservoir.values for name, reservoir in samples_by_name.items()}
+    if n_requests == 0:
+        print("\nNo hay requests en streaming para descomponer la latencia.")
+        return
+
+    print(f"\n--- Descomposición de la latencia (n={n_requests}) ---")
+    if any(len(samples_by_name[name]) < m.n for name, m in moments.items()):
+        print(f"(Ajustes e histogramas sobre una muestra de hasta {SAMPLE_SIZE} valores por componente)")
+    rows = []
+    fitted = []
+    total_mean = moments['Latencia total'].mean
+    for name, component in moments.items():
+        samples = samples_by_name[name]
+        if component.n < MIN_COMPONENT_SAMPLES:
+            print(f"{name}: {component.n} muestras, insuficientes para ajustar")
+            continue
+        mean = component.mean
+        cv = component.std / mean if mean > 0 else float('nan')
+        share = "" if name == TOKEN_GAPS else f" ({mean / total_mean:.0%} de la latencia)"
+        fits = fit_all(samples)
+        best = fits[0]['model'] if fits else '-'
+        print(f"{name}: media {mean:.4f}s{share}, CV {cv:.2f}, mejor ajuste: {best}")
+        for fit in fits:
+            params = ", ".join(f"{key}={value:.4g}" for key, value in fit['params'].items())
+            print(f"    {fit['model']:<24} AIC {fit['aic']:>10.1f}  KS {fit['ks']:.4f}  ({params})")
+            rows.append({
+                "component": name,
+                "n": component.n,
+                "mean": mean,
+                "cv": cv,
+                "model": fit['model'],
+                "params": params,
+                "log_likelihood": fit['log_likelihood'],
+                "aic": fit['aic'],
+                "ks": fit['ks'],
+            })
+        if fits:
+            fitted.append((name, samples, component.max, fits[0]))
+
+    if not fitted:
+        return
+
+    # Gráfico: histograma de cada componente con su mejor ajuste
+    n_cols = 2
+    n_rows = math.ceil(len(fitted) / n_cols)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(12, 3.5 * n_rows), squeeze=False)
+    for ax, (name, samples, sample_max, fit) in zip(axes.flat, fitted):
+        ax.hist(samples, bins=30, density=True, alpha=0.6, color='b')
+        x = np.linspace(0, sample_max * 1.05, 200)
+        ax.plot(x, fit['pdf'](x), 'r-', lw=2, label=fit['model'])
+        ax.set_title(name)
+        ax.set_xlabel('Tiempo (s)')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+    for ax in list(axes.flat)[len(fitted):]:
+        ax.axis('off')
+    fig.tight_layout()
+
+    plot_file = derived_path(filepath, '_componentes.png')
+    fig.savefig(plot_file)
+    plt.close(fig)
+    print(f"Gráfico de componentes guardado en: {plot_file}")
+
+    fits_file = derived_path(filepath, '_componentes.csv')
+    pd.DataFrame(rows).to_csv(fits_file, index=False)
+    print(f"Ajustes por componente guardados en: {fits_file}")
+
+def dispersion_curve(windowed):
+    """
+    Estadísticas de conteo e índice de dispersión para varios tamaños de ventana.
+
+    Los conteos de todos los tamaños salen de una sola lectura de los tiempos
+    (ver `window_counts` y `WindowCounter`), sin releer los datos. El índice
+    es Var/Media con la varianza poblacional, como en `analyze_run`; bajo
+    Poisson, n·índice ~ χ²(n - 1) y la banda es el intervalo central de
+    cobertura DISPERSION_LEVEL.
+
+    Args:
+        windowed: Tuplas (ventana, bordes, conteos), ordenadas por ventana
+
+    Returns:
+        Tupla (curva, buckets): un DataFrame con una fila por tamaño de ventana
+        y otro con los conteos de todas las ventanas en formato largo.
+    """
+    rows = []
+    buckets = []
+    tail = (1 - DISPERSION_LEVEL) / 2
+    for window, edges, counts in windowed:
+        n_buckets = len(counts)
+        if n_buckets < MIN_DISPERSION_BUCKETS:
+            continue
+        mean = counts.mean()
+        var = counts.var()
+        rows.append({
+            "window": window,
+            "n_buckets": n_buckets,
+            "mean": mean,
+            "var": var,
+            "dispersion_index": var / mean if mean > 0 else float('nan'),
+            "lambda_hat": mean / window,
+            "band_low": chi2_quantile(tail, n_buckets - 1) / n_buckets,
+            "band_high": chi2_quantile(1 - tail, n_buckets - 1) / n_buckets,
+        })
+        buckets.append((window, edges, counts))
+
+    if not buckets:
+        return pd.DataFrame(rows), pd.DataFrame()
+
+    sizes = [len(counts) for _, _, counts in buckets]
+    bucket_data = pd.DataFrame({
+        "window": np.repeat([window for window, _, _ in buckets], sizes),
+        "bucket_index": np.concatenate([np.arange(size) for size in sizes]),
+        "bucket_start_virtual": np.concatenate([edges[:-1] for _, edges, _ in buckets]),
+        "bucket_end_virtual": np.concatenate([edges[1:] for _, edges, _ in buckets]),
+        "count": np.concatenate([counts for _, _, counts in buckets]),
+    })
+    return pd.DataFrame(rows), bucket_data
+
+def analyze_dispersion(filepath, windows, chunk_rows=None):
+    """
+    Curva de dispersión vs tamaño de ventana sobre la Timeline Virtual.
+
+    Con `chunk_rows` el archivo se lee por bloques, con un WindowCounter por
+    tamaño de ventana; los conteos son los mismos que con la lectura completa.
+    """
+    print(f"Analizando archivo: {filepath}")
+    if not os.path.exists(filepath):
+        print("El archivo no existe.")
+        return
+
+    windows = sorted(set(windows))
+    if chunk_rows:
+        counters = [WindowCounter(window) for window in windows]
+        n_events = 0
+        offset = 0.0
+        for chunk in iter_results(filepath, columns=['latency_seconds', 'status'], chunk_rows=chunk_rows):
+            latencies = chunk.loc[chunk['status'] == 'ok', 'latency_seconds'].to_numpy(dtype=float)
+            if len(latencies) == 0:
+                continue
+            virtual_completion_times = virtual_times(latencies, offset)
+            offset = virtual_completion_times[-1]
+            for counter in counters:
+                counter.add(virtual_completion_times)
+            n_events += len(latencies)
+        windowed = [(counter.window, *counter.result()) for counter in counters]
+    else:
+        df = read_results(filepath, columns=['latency_seconds', 'status'])
+        latencies = df.loc[df['status'] == 'ok', 'latency_seconds'].values
+        n_events = len(latencies)
+        virtual_completion_times = virtual_times(latencies)
+        windowed = [(window, *window_counts(virtual_completion_times, window)) for window in windows]
+    if n_events == 0:
+        print("No hay requests exitosas para analizar.")
+        return
+
+    curve, bucket_data = dispersion_curve(windowed)
+    if curve.empty:
+        print(f"Ningún tamaño de ventana deja al menos {MIN_DISPERSION_BUCKETS} buckets completos.")
+        return
+
+    print(f"\n--- Dispersión por tamaño de ventana (n={n_events}) ---")
+    print(f"{'Ventana':>10} {'Buckets':>8} {'Media':>9} {'Var':>9} {'Índice':>8}  Banda Poisson {DISPERSION_LEVEL:.0%}")
+    for row in curve.itertuples():
+        outside = "" if row.band_low <= row.dispersion_index <= row.band_high else "  *"
+        print(f"{row.window:>9.3g}s {row.n_buckets:>8} {row.mean:>9.3f} {row.var:>9.3f} "
+              f"{row.dispersion_index:>8.3f}  [{row.band_low:.3f}, {row.band_high:.3f}]{outside}")
+
+    # Gráfico: índice de dispersión vs ventana, con la banda esperada bajo Poisson
+    plt.figure(figsize=(10, 5))
+    plt.fill_between(curve['window'], curve['band_low'], curve['band_high'], color='r', alpha=0.15,
+                     label=f'Banda Poisson ({DISPERSION_LEVEL:.0%})')
+    plt.axhline(1.0, color='r', lw=1, ls='--')
+    plt.plot(curve['window'], curve['dispersion_index'], 'bo-', label='Var/Media empírico')
+    plt.xscale('log')
+    plt.title('Índice de dispersión vs tamaño de ventana')
+    plt.xlabel('Ventana (s)')
+    plt.ylabel('Var / Media')
+    plt.legend()
+    plt.grid(True, alpha=0.3, which='both')
+
+    plot_file = derived_path(filepath, '_dispersion.png')
+    plt.savefig(plot_file)
+    print(f"\nGráfico de dispersión guardado en: {plot_file}")
+    plt.close()
+
+    curve_file = derived_path(filepath, '_dispersion.csv')
+    curve.to_csv(curve_file, index=False)
+    print(f"Curva de dispersión guardada en: {curve_file}")
+
+    buckets_file = derived_path(filepath, '_buckets_multi.csv')
+    bucket_data.to_csv(buckets_file, index=False)
+    print(f"Conteos por bucket de todas las ventanas guardados en: {buckets_file}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analizar resultados del experimento Poisson/Exponencial.')
-    parser.add_argument("--file", help="Ruta al archivo resultados.csv.")
+    parser.add_argument("--file", help="Ruta a los resultados (resultados.parquet o resultados.csv).")
     parser.add_argument("--bucket", type=float, default=DEFAULT_BUCKET_SIZE, 
                         help="Tamaño de la ventana de tiempo en segundos.")
+    parser.add_argument("--buckets", type=float, nargs='+', metavar="SEG",
+                        help="Varios tamaños de ventana: calcula sólo la curva de dispersión.")
+    parser.add_argument("--bucket-range", type=float, nargs=3, metavar=("MIN", "MAX", "N"),
+                        help="N tamaños de ventana espaciados logarítmicamente entre MIN y MAX segundos.")
+    parser.add_argument("--chunked", nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar="FILAS",
+                        help=f"Leer el archivo por bloques de FILAS filas (por defecto {DEFAULT_CHUNK_ROWS}), con memoria acotada.")
     args = parser.parse_args()
     
     filepath = args.file if args.file else DATA_FILE
-    analyze_run(filepath, bucket_size=args.bucket)
+    windows = list(args.buckets or [])
+    if args.bucket_range:
+        low, high, steps = args.bucket_range
+        windows += list(np.geomspace(low, high, int(steps)))
+    if windows:
+        analyze_dispersion(filepath, windows, chunk_rows=args.chunked)
+    else:
+        analyze_run(filepath, bucket_size=args.bucket, chunk_rows=args.chunked)
+        analyze_components(filepath, chunk_rows=args.chunked)
@@ -0,0 +1,200 @@
+"""
+Análisis del Capítulo 3 - Parte 2: Latencia bajo carga de lazo abierto
+
+Procesa 'resultados_carga.parquet' (ver experimento_carga.py) y, para cada
+tasa de llegada λ ofrecida, calcula:
+- Throughput alcanzado y verificación de que las llegadas fueron Poisson
+- Percentiles de latencia (p50, p95, p99)
+- Requests en vuelo (L) y la Ley de Little L = λ·W
+- Espera local antes del envío (limitador de tasa / tope de requests abiertas)
+
+La "rodilla" es la tasa a partir de la cual la latencia deja de ser plana: se
+toma como el punto de la curva p95 vs log(λ), normalizada a [0, 1] en ambos
+ejes, más alejado por debajo de la recta que une sus extremos. Las tasas se
+barren en una grilla geométrica; normalizar λ linealmente apretaría las tasas
+bajas contra el origen y correría la rodilla hacia las tasas altas.
+
+Con --chunked el archivo se lee por bloques (ver scan_rates).
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_io import read_results, iter_results, find_results, derived_path, DEFAULT_CHUNK_ROWS
+from api_client import LatencyHistogram
+
+DATA_FILE = find_results(os.path.dirname(__file__), stem="resultados_carga")
+LOAD_COLUMNS = ['target_rate', 'status', 't_scheduled', 't_start', 't_end', 'latency_seconds', 'in_flight']
+
+def rate_row(rate, n, n_ok, scheduled, t_end, latency, mean_in_flight, local_wait):
+    """
+    Fila de métricas de una tasa.
+
+    Args:
+        scheduled: Tiempos programados de todas las requests, ordenados
+        t_end: Último instante de finalización
+        latency: Diccionario con p50, p95, p99 y mean_latency de las requests exitosas
+    """
+    inter_arrivals = np.diff(scheduled)
+    span = t_end - scheduled[0]
+    return {
+        "target_rate": rate,
+        "n": n,
+        "errors": n - n_ok,
+        # Tasa de llegada efectiva y CV de los tiempos entre llegadas (Poisson ⇒ CV ≈ 1)
+        "arrival_rate": 1.0 / inter_arrivals.mean() if len(inter_arrivals) else np.nan,
+        "arrival_cv": inter_arrivals.std() / inter_arrivals.mean() if len(inter_arrivals) else np.nan,
+        "throughput": n_ok / span if span > 0 else np.nan,
+        **latency,
+        "mean_in_flight": mean_in_flight,
+        "local_wait": local_wait,
+    }
+
+def summarize_rates(df):
+    """Métricas por tasa objetivo, en una fila por λ."""
+    rows = []
+    for rate, group in df.groupby('target_rate'):
+        ok = group[group['status'] == 'ok']
+        latencies = ok['latency_seconds'].values
+        latency = {
+            "p50": np.percentile(latencies, 50) if len(latencies) else np.nan,
+            "p95": np.percentile(latencies, 95) if len(latencies) else np.nan,
+            "p99": np.percentile(latencies, 99) if len(latencies) else np.nan,
+            "mean_latency": latencies.mean() if len(latencies) else np.nan,
+        }
+        rows.append(rate_row(rate, len(group), len(ok), np.sort(group['t_scheduled'].values),
+                             group['t_end'].max(), latency, group['in_flight'].mean(),
+                             (group['t_start'] - group['t_scheduled']).clip(lower=0).mean()))
+    return pd.DataFrame(rows)
+
+def scan_rates(filepath, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Las métricas de summarize_rates, leyendo el archivo por bloques.
+
+    Por tasa se acumulan conteos, sumas y extremos, y las latencias van a un
+    LatencyHistogram: los percentiles tienen un error relativo menor a su
+    precisión (1%) en lugar de interpolar entre muestras. Lo único que crece
+    con el archivo son los tiempos programados (un float por request), que hay
+    que ordenar para el CV de los tiempos entre llegadas.
+    """
+    rates = {}
+    for chunk in iter_results(filepath, columns=LOAD_COLUMNS, chunk_rows=chunk_rows):
+        for rate, group in chunk.groupby('target_rate'):
+            totals = rates.setdefault(rate, {
+                "n": 0, "ok": 0, "scheduled": [], "t_end": np.nan, "latencies": LatencyHistogram(),
+                "in_flight": 0.0, "in_flight_n": 0, "local_wait": 0.0, "local_wait_n": 0,
+            })
+            ok = group['status'] == 'ok'
+            wait = (group['t_start'] - group['t_scheduled']).clip(lower=0)
+            totals["n"] += len(group)
+            totals["ok"] += int(ok.sum())
+            totals["scheduled"].append(group['t_scheduled'].to_numpy(dtype=float))
+            totals["t_end"] = np.fmax(totals["t_end"], group['t_end'].max())
+            totals["latencies"].record_many(group.loc[ok, 'latency_seconds'].to_numpy(dtype=float))
+            totals["in_flight"] += group['in_flight'].sum()
+            totals["in_flight_n"] += group['in_flight'].count()
+            totals["local_wait"] += wait.sum()
+            totals["local_wait_n"] += wait.count()
+
+    rows = []
+    for rate, totals in rates.items():
+        histogram = totals["latencies"]
+        latency = {f"p{p}": histogram.percentile(p) if histogram.count else np.nan for p in (50, 95, 99)}
+        latency["mean_latency"] = histogram.mean if histogram.count else np.nan
+        rows.append(rate_row(rate, totals["n"], totals["ok"], np.sort(np.concatenate(totals["scheduled"])),
+                             totals["t_end"], latency,
+                             totals["in_flight"] / totals["in_flight_n"] if totals["in_flight_n"] else np.nan,
+                             totals["local_wait"] / totals["local_wait_n"] if totals["local_wait_n"] else np.nan))
+    return pd.DataFrame(rows)
+
+def find_knee(x, y, log_x=True):
+    """
+    Índice de la rodilla de una curva creciente y convexa.
+
+    Con ambos ejes normalizados a [0, 1], es el punto más alejado por debajo de
+    la recta que une el primero con el último. Con `log_x` (para grillas
+    geométricas, como las tasas del barrido) se normaliza log(x) en lugar de x.
+    Devuelve None con menos de 3 puntos.
+    """
+    x = np.asarray(x, dtype=float)
+    if log_x:
+        x = np.log(x)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 3 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    x_norm = (x - x.min()) / np.ptp(x)
+    y_norm = (y - y.min()) / np.ptp(y)
+    return int(np.argmax(x_norm - y_norm))
+
+def analyze_load(filepath, chunk_rows=None):
+    print(f"Analizando archivo: {filepath}")
+    if not os.path.exists(filepath):
+        print("El archivo no existe. Ejecutá primero experimento_carga.py")
+        return
+
+    if chunk_rows:
+        stats = scan_rates(filepath, chunk_rows)
+    else:
+        stats = summarize_rates(read_results(filepath, columns=LOAD_COLUMNS))
+    stats = stats.sort_values('target_rate', ignore_index=True)
+
+    # Ley de Little: requests en vuelo promedio ≈ tasa de llegada × latencia media
+    stats['little_L'] = stats['arrival_rate'] * stats['mean_latency']
+
+    pd.set_option('display.width', 200)
+    print("\n--- Métricas por tasa de llegada ---")
+    print(stats.round(4).to_string(index=False))
+
+    knee = find_knee(stats['target_rate'], stats['p95'])
+    if knee is not None:
+        row = stats.iloc[knee]
+        print(f"\nRodilla de la curva p95: λ ≈ {row['target_rate']:g} req/s "
+              f"(p95 = {row['p95']:.3f}s, throughput = {row['throughput']:.2f} req/s)")
+
+    fig, (ax_latency, ax_throughput) = plt.subplots(1, 2, figsize=(14, 5))
+
+    for column, style in (('p50', 'b-o'), ('p95', 'r-o'), ('p99', 'm--o')):
+        ax_latency.plot(stats['target_rate'], stats[column], style, label=column)
+    if knee is not None:
+        ax_latency.axvline(stats['target_rate'].iloc[knee], color='gray', linestyle=':', label='Rodilla')
+    ax_latency.set_xscale('log', base=2)
+    ax_latency.set_xlabel('Tasa de llegada λ (req/s)')
+    ax_latency.set_ylabel('Latencia (s)')
+    ax_latency.set_title('Latencia vs carga ofrecida')
+    ax_latency.legend()
+    ax_latency.grid(True, alpha=0.3)
+
+    ax_throughput.plot(stats['target_rate'], stats['throughput'], 'g-o', label='Throughput')
+    ax_throughput.plot(stats['target_rate'], stats['target_rate'], 'k--', alpha=0.5, label='Ideal (= λ)')
+    ax_throughput.set_xscale('log', base=2)
+    ax_throughput.set_yscale('log', base=2)
+    ax_throughput.set_xlabel('Tasa de llegada λ (req/s)')
+    ax_throughput.set_ylabel('Requests completadas por segundo')
+    ax_throughput.set_title('Throughput vs carga ofrecida')
+    ax_throughput.legend()
+    ax_throughput.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plot_file = derived_path(filepath, '_rodilla.png')
+    plt.savefig(plot_file)
+    print(f"Gráfico guardado en: {plot_file}")
+    plt.close()
+
+    stats_file = derived_path(filepath, '_por_tasa.csv')
+    stats.to_csv(stats_file, index=False)
+    print(f"Métricas por tasa guardadas en: {stats_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analizar el barrido de carga de lazo abierto.')
+    parser.add_argument("--file", help="Ruta a los resultados (resultados_carga.parquet o .csv).")
+    parser.add_argument("--chunked", nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar="FILAS",
+                        help=f"Leer el archivo por bloques de FILAS filas (por defecto {DEFAULT_CHUNK_ROWS}); "
+                             "los percentiles salen de un histograma con error relativo < 1%%.")
+    args = parser.parse_args()
+
+    analyze_load(args.file if args.file else DATA_FILE, chunk_rows=args.chunked)
@@ -0,0 +1,254 @@
+"""
+Pruebas de bondad de ajuste para las hipótesis Exponencial y Poisson.
+
+Todo opera sobre arrays de NumPy con costo O(n log n) (un ordenamiento), así
+que escala a millones de latencias. Las probabilidades se calculan en escala
+logarítmica: la PMF de Poisson usa log(k!) acumulado en lugar de
+`math.factorial`, que deja de ser representable para λ moderados.
+
+Exponencial (λ estimado por 1/x̄):
+- Kolmogorov-Smirnov y Anderson-Darling con las modificaciones de Stephens
+  (1974) para parámetro estimado: el estadístico modificado se compara con
+  valores críticos tabulados que no dependen de n.
+- Chi-cuadrado con clases equiprobables.
+
+Poisson (λ estimado por la media de los conteos):
+- Chi-cuadrado agrupando las colas hasta que cada clase tenga frecuencia
+  esperada de al menos 5.
+- Test de dispersión: (n - 1)·Var/Media ~ χ²(n - 1).
+
+Los p-valores chi-cuadrado usan la función gamma incompleta regularizada.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Optional
+
+import numpy as np
+
+from capitulo_3.ajustes import regularized_gamma_p
+
+MIN_EXPECTED = 5.0  # Frecuencia esperada mínima por clase en las pruebas chi-cuadrado
+WILSON_HILFERTY_DOF = 1000  # A partir de estos grados de libertad, χ² por aproximación normal
+
+# Stephens (1974), caso exponencial con media estimada: nivel -> valor crítico
+KS_EXPONENTIAL_CRITICAL = {0.15: 0.926, 0.10: 0.990, 0.05: 1.094, 0.025: 1.190, 0.01: 1.308}
+AD_EXPONENTIAL_CRITICAL = {0.15: 0.922, 0.10: 1.078, 0.05: 1.341, 0.025: 1.606, 0.01: 1.957}
+
+
+# --- Distribuciones en escala logarítmica ---
+
+def log_factorial(k_max: int) -> np.ndarray:
+    """Tabla de log(k!) para k = 0..k_max."""
+    table = np.zeros(k_max + 1)
+    if k_max > 0:
+        table[1:] = np.cumsum(np.log(np.arange(1, k_max + 1)))
+    return table
+
+
+def poisson_logpmf(k, lam: float) -> np.ndarray:
+    """log P(X = k) para X ~ Poisson(λ); -inf para k < 0."""
+    k = np.asarray(k, dtype=np.int64)
+    valid = k >= 0
+    safe_k = np.where(valid, k, 0)
+    table = log_factorial(int(safe_k.max()) if safe_k.size else 0)
+    if lam > 0:
+        log_pmf = safe_k * math.log(lam) - lam - table[safe_k]
+    else:
+        log_pmf = np.where(safe_k == 0, 0.0, -np.inf)
+    return np.where(valid, log_pmf, -np.inf)
+
+
+def poisson_pmf(k, lam: float) -> np.ndarray:
+    """P(X = k) para X ~ Poisson(λ), sin overflow para λ grandes."""
+    return np.exp(poisson_logpmf(k, lam))
+
+
+def poisson_cdf(k, lam: float) -> np.ndarray:
+    """P(X ≤ k) para X ~ Poisson(λ), acumulando la PMF hasta el mayor k pedido."""
+    k = np.asarray(k, dtype=np.int64)
+    k_max = int(max(k.max(), 0)) if k.size else 0
+    cumulative = np.minimum(np.cumsum(poisson_pmf(np.arange(k_max + 1), lam)), 1.0)
+    return np.where(k >= 0, cumulative[np.clip(k, 0, k_max)], 0.0)
+
+
+def exponential_logpdf(x, rate: float) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return np.where(x >= 0, math.log(rate) - rate * x, -np.inf)
+
+
+def exponential_cdf(x, rate: float) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return np.where(x >= 0, -np.expm1(-rate * np.maximum(x, 0.0)), 0.0)
+
+
+def chi2_sf(statistic: float, dof: int) -> float:
+    """
+    P(χ²(dof) ≥ statistic).
+
+    Con muchos grados de libertad (test de dispersión sobre millones de
+    ventanas) la serie de la gamma incompleta converge lento; se usa la
+    aproximación de Wilson-Hilferty: (χ²/k)^(1/3) ≈ Normal(1 - 2/9k, 2/9k).
+    """
+    if dof <= 0:
+        return float("nan")
+    if dof > WILSON_HILFERTY_DOF:
+        variance = 2 / (9 * dof)
+        z = ((statistic / dof) ** (1 / 3) - (1 - variance)) / math.sqrt(variance)
+        return NormalDist().cdf(-z)
+    return 1.0 - regularized_gamma_p(dof / 2, statistic / 2)
+
+
+def chi2_quantile(q: float, dof: int) -> float:
+    """Cuantil q de χ²(dof) por la aproximación de Wilson-Hilferty (buena desde unos 10 gl)."""
+    variance = 2 / (9 * dof)
+    return dof * (1 - variance + NormalDist().inv_cdf(q) * math.sqrt(variance)) ** 3
+
+
+# --- Pruebas para la Exponencial ---
+
+def _stephens_decision(statistic: float, critical: Dict[float, float]) -> Dict:
+    rejected = [level for level, value in critical.items() if statistic > value]
+    return {
+        "statistic": statistic,
+        "critical_5": critical[0.05],
+        "reject_5": statistic > critical[0.05],
+        # Menor nivel tabulado al que se rechaza (None si no se rechaza a ninguno)
+        "p_upper": min(rejected) if rejected else None,
+    }
+
+
+def ks_exponential(samples) -> Dict:
+    """
+    Kolmogorov-Smirnov para Exponencial con λ = 1/x̄.
+
+    Estadístico modificado de Stephens: (D - 0.2/n)(√n + 0.26 + 0.5/√n).
+    """
+    x = np.sort(np.asarray(samples, dtype=float))
+    n = len(x)
+    rate = 1.0 / x.mean()
+    fitted = exponential_cdf(x, rate)
+    d_plus = np.max(np.arange(1, n + 1) / n - fitted)
+    d_minus = np.max(fitted - np.arange(0, n) / n)
+    d = float(max(d_plus, d_minus))
+    modified = (d - 0.2 / n) * (math.sqrt(n) + 0.26 + 0.5 / math.sqrt(n))
+    return {"test": "KS", "n": n, "rate": rate, "D": d, **_stephens_decision(modified, KS_EXPONENTIAL_CRITICAL)}
+
+
+def anderson_darling_exponential(samples) -> Dict:
+    """
+    Anderson-Darling para Exponencial con λ = 1/x̄.
+
+    A² = -n - (1/n) Σ (2i - 1) [ln F(x_(i)) + ln(1 - F(x_(n+1-i)))], con
+    ln F = ln(1 - e^{-z}) y ln(1 - F) = -z calculados sin restar probabilidades.
+    Estadístico modificado de Stephens: A²(1 + 0.6/n).
+    """
+    x = np.sort(np.asarray(samples, dtype=float))
+    n = len(x)
+    rate = 1.0 / x.mean()
+    z = rate * x
+    # z = 0 daría ln F = -inf; se acota al menor valor positivo representable
+    log_cdf = np.log(-np.expm1(-np.maximum(z, np.finfo(float).tiny)))
+    log_sf_reversed = -z[::-1]
+    weights = 2 * np.arange(1, n + 1) - 1
+    a2 = float(-n - np.sum(weights * (log_cdf + log_sf_reversed)) / n)
+    modified = a2 * (1 + 0.6 / n)
+    return {"test": "AD", "n": n, "rate": rate, "A2": a2, **_stephens_decision(modified, AD_EXPONENTIAL_CRITICAL)}
+
+
+def exponential_class_edges(n: int, rate: float, n_bins: Optional[int] = None) -> np.ndarray:
+    """
+    Bordes internos de las clases equiprobables de `chi2_exponential`.
+
+    Por defecto usa 2·n^(2/5) clases (regla de Mann-Wald), limitadas para que
+    cada una tenga frecuencia esperada de al menos 5.
+    """
+    if n_bins is None:
+        n_bins = int(math.ceil(2 * n ** 0.4))
+    n_bins = max(2, min(n_bins, int(n // MIN_EXPECTED)))
+
+    # Bordes por la inversa de la CDF: -ln(1 - q)/λ
+    quantiles = np.arange(1, n_bins) / n_bins
+    return -np.log1p(-quantiles) / rate
+
+
+def chi2_exponential(samples, n_bins: Optional[int] = None) -> Dict:
+    """Chi-cuadrado para Exponencial con λ = 1/x̄ y clases equiprobables."""
+    x = np.asarray(samples, dtype=float)
+    rate = 1.0 / x.mean()
+    edges = exponential_class_edges(len(x), rate, n_bins)
+    observed = np.bincount(np.searchsorted(edges, x, side="right"), minlength=len(edges) + 1)
+    return chi2_exponential_counts(observed, rate)
+
+
+def chi2_exponential_counts(observed, rate: float) -> Dict:
+    """
+    Chi-cuadrado de `chi2_exponential` a partir de las frecuencias de cada
+    clase de `exponential_class_edges`, que se pueden acumular por bloques.
+    """
+    observed = np.asarray(observed)
+    n = int(observed.sum())
+    n_bins = len(observed)
+    expected = n / n_bins
+    statistic = float(np.sum((observed - expected) ** 2) / expected)
+    dof = n_bins - 1 - 1  # Un parámetro estimado
+    return {"test": "Chi²", "n": n, "rate": rate, "bins": n_bins, "dof": dof,
+            "statistic": statistic, "p_value": chi2_sf(statistic, dof)}
+
+
+# --- Pruebas para Poisson ---
+
+def chi2_poisson(counts) -> Dict:
+    """
+    Chi-cuadrado para conteos Poisson con λ = media de los conteos.
+
+    Las clases son los valores 0..k_max; la última absorbe la cola superior
+    P(X ≥ k) y las clases con frecuencia esperada menor a 5 se agrupan con las
+    vecinas desde ambos extremos.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n = len(counts)
+    lam = float(counts.mean())
+    k_max = int(counts.max())
+
+    observed = np.bincount(counts, minlength=k_max + 1).astype(float)
+    probabilities = poisson_pmf(np.arange(k_max + 1), lam)
+    probabilities[-1] = max(0.0, 1.0 - probabilities[:-1].sum())  # Cola superior
+    expected = n * probabilities
+
+    # Agrupamos las colas: fronteras de clases con esperado >= MIN_EXPECTED
+    cumulative_expected = np.cumsum(expected)
+    boundaries = []
+    last = 0.0
+    for index, total in enumerate(cumulative_expected):
+        if total - last >= MIN_EXPECTED:
+            boundaries.append(index + 1)
+            last = total
+    if not boundaries:
+        boundaries = [k_max + 1]
+    boundaries[-1] = k_max + 1  # El remanente se suma a la última clase
+    starts = np.concatenate([[0], boundaries[:-1]])
+    observed_grouped = np.add.reduceat(observed, starts)
+    expected_grouped = np.add.reduceat(expected, starts)
+
+    statistic = float(np.sum((observed_grouped - expected_grouped) ** 2 / expected_grouped))
+    dof = len(starts) - 1 - 1  # Un parámetro estimado
+    return {"test": "Chi²", "n": n, "lambda": lam, "bins": len(starts), "dof": dof,
+            "statistic": statistic, "p_value": chi2_sf(statistic, dof)}
+
+
+def dispersion_test(counts) -> Dict:
+    """
+    Test del índice de dispersión: bajo Poisson, (n - 1)·S²/x̄ ~ χ²(n - 1).
+
+    Devuelve el p-valor bilateral (sobre- o sub-dispersión).
+    """
+    counts = np.asarray(counts, dtype=float)
+    n = len(counts)
+    mean = counts.mean()
+    index = counts.var(ddof=1) / mean if mean > 0 else float("nan")
+    statistic = (n - 1) * index
+    upper = chi2_sf(statistic, n - 1)
+    p_value = min(1.0, 2 * min(upper, 1 - upper))
+    return {"test": "Dispersión", "n": n, "index": index, "dof": n - 1,
+            "statistic": statistic, "p_value": p_value}
@@ -2,114 +2,114 @@
 Experimento del Capítulo 3: Procesos de Poisson/Exponencial
 
 Este script realiza múltiples llamadas a la API de Groq para medir los tiempos de respuesta.
-Los resultados se guardan en 'resultados.csv' para su posterior análisis.
+Los resultados se guardan en 'resultados.parquet' para su posterior análisis.
+
+Cada request es una unidad de trabajo del runner; se puede ejecutar con
+`python capitulo_3/experimento.py` o `python -m runner capitulo_3`.
+
+Con `stream = true` (por defecto) la respuesta se recibe en streaming y la
+latencia se descompone en tiempo hasta el primer token, tiempos entre tokens
+y los tiempos de cola, prompt y generación que informa el servidor.
 """
 
 import sys
 import os
 import time
-import statistics
-import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_client import GroqClient
+from runner import main, unit_sample_index
+from results_io import read_results, result_columns
+from results_io.schemas import CAPITULO_3
 
 # --- CONFIGURACIÓN ---
-MODEL = "llama-3.1-8b-instant"
-PROMPT = "Respondé con un solo número aleatorio entre 1 y 100."
-INFERENCE_PARAMS = {
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": "Respondé con un solo número aleatorio entre 1 y 100.",
     "temperature": 1.0,
     "top_p": 1.0,
-    "max_tokens": 10
+    "max_tokens": 10,
+    "n_requests": 300,    # Cantidad de requests a realizar
+    "stream": True,       # Descomponer la latencia recibiendo la respuesta en streaming
+    # Una request por vez: medimos la latencia de llamadas aisladas, sin competir entre sí
+    "max_in_flight": 1,
+    "flush_every": 10,    # Filas por lote escrito en el archivo de resultados
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados.parquet"),
 }
-N_REQUESTS = 300       # Cantidad de requests a realizar
-SLEEP_SECONDS = 5.0    # Delay entre requests (para evitar rate limits)
-OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
 
-def run_experiment():
-    print(f"=== Capítulo 3 - Experimento Poisson/Exponencial ===")
-    print(f"Modelo: {MODEL}")
-    print(f"N Requests: {N_REQUESTS}")
-    print(f"Delay entre requests: {SLEEP_SECONDS}s")
-    
-    try:
-        client = GroqClient()
-    except ValueError as e:
-        print(f"Error inicializando cliente: {e}")
-        return
+SCHEMA = CAPITULO_3
+
+def work_units(config):
+    for request_id in range(1, config["n_requests"] + 1):
+        yield {"unit_id": str(request_id), "request_id": request_id}
 
-    results = []
-    latencies = []
+async def run_unit(client, unit, config):
+    t_start = time.time()
+    status = "ok"
+    error_type = None
+    result = None
+    request = dict(
+        messages=[{"role": "user", "content": config["prompt"]}],
+        temperature=config["temperature"],
+        top_p=config["top_p"],
+        max_tokens=config["max_tokens"]
+    )
     
-    print(f"Iniciando recolección de datos...")
-    t_run_start = time.time()
+    sample_index = unit_sample_index(unit["unit_id"])
+    try:
+        if config["stream"]:
+            result = await client.chat_stream(**request, sample_index=sample_index)
+        else:
+            result = await client.chat_detailed(**request, sample_index=sample_index)
+    except Exception as e:
+        status = "error"
+        error_type = type(e).__name__
+        print(f"Request {unit['request_id']} Error: {e}")
     
-    count_ok = 0
-    count_error = 0
+    t_end = time.time()
+    latency = t_end - t_start
+    if result is not None and result.latency is not None:
+        # Excluimos la espera del limitador de tasa: sólo medimos la llamada
+        latency = result.latency
+        t_start = t_end - latency
     
-    try:
-        for i in range(1, N_REQUESTS + 1):
-            request_id = i
-            print(f"Request {i}/{N_REQUESTS}...", end="", flush=True)
-            
-            t_start = time.time()
-            status = "ok"
-            error_type = None
-            
-            try:
-                client.chat(
-                    messages=[{"role": "user", "content": PROMPT}],
-                    temperature=INFERENCE_PARAMS["temperature"],
-                    top_p=INFERENCE_PARAMS["top_p"],
-                    max_tokens=INFERENCE_PARAMS["max_tokens"]
-                )
-            except Exception as e:
-                status = "error"
-                error_type = type(e).__name__
-                print(f" Error: {e}")
-            
-            t_end = time.time()
-            latency = t_end - t_start
-            
-            # Registramos los datos de cada request
-            row = {
-                "request_id": request_id,
-                "t_start": t_start,
-                "t_end": t_end,
-                "latency_seconds": latency,
-                "status": status,
-                "error_type": error_type if status == "error" else ""
-            }
-            results.append(row)
-            
-            if status == "ok":
-                count_ok += 1
-                latencies.append(latency)
-                print(f" OK ({latency:.3f}s)")
-            else:
-                count_error += 1
-            
-            # Guardado incremental
-            df = pd.DataFrame(results)
-            df.to_csv(OUTPUT_FILE, index=False)
-            
-            # Delay fijo entre requests
-            if i < N_REQUESTS:
-                time.sleep(SLEEP_SECONDS)
-                    
-    except KeyboardInterrupt:
-        print("\nExperimento interrumpido por usuario.")
+    with client.phase("parse"):
+        # Registramos los datos de cada request
+        row = {
+            "request_id": unit["request_id"],
+            "t_start": t_start,
+            "t_end": t_end,
+            "latency_seconds": latency,
+            "status": status,
+            "error_type": error_type
+        }
+        if result is not None and getattr(result, "ttft", None) is not None:
+            server = result.server_timing
+            row.update({
+                "ttft_seconds": result.ttft,
+                "token_gaps": result.token_gaps,
+                "server_queue_time": server.get("queue_time"),
+                "server_prompt_time": server.get("prompt_time"),
+                "server_completion_time": server.get("completion_time"),
+                "server_total_time": server.get("total_time"),
+            })
+        return [row]
+
+def summarize(config):
+    """Resumen de todas las requests guardadas."""
+    df = read_results(config["output_file"], columns=["latency_seconds", "status"])
+    ok = df[df["status"] == "ok"]
     
     print("\n=== Resumen ===")
-    print(f"Total Requests: {len(results)}")
-    print(f"OK: {count_ok}")
-    print(f"Error: {count_error}")
-    
-    if latencies:
-        mean_latency = statistics.mean(latencies)
-        print(f"Latencia Media: {mean_latency:.4f}s")
+    print(f"Total Requests: {len(df)}")
+    print(f"OK: {len(ok)}")
+    print(f"Error: {len(df) - len(ok)}")
     
-    print(f"Resultados guardados en: {OUTPUT_FILE}")
+    if len(ok):
+        print(f"Latencia Media: {ok['latency_seconds'].mean():.4f}s")
+    if "ttft_seconds" in result_columns(config["output_file"]):
+        ttft = read_results(config["output_file"], columns=["ttft_seconds"])["ttft_seconds"].dropna()
+        if len(ttft):
+            print(f"TTFT Medio: {ttft.mean():.4f}s")
 
 if __name__ == "__main__":
-    run_experiment()
+    main(module=sys.modules[__name__])
@@ -0,0 +1,119 @@
+"""
+Experimento del Capítulo 3 - Parte 2: Generador de carga de lazo abierto
+
+Objetivo:
+Medir el comportamiento de cola real del endpoint bajo carga. En lugar de
+enviar una request por vez (lazo cerrado), las requests llegan según un
+proceso de Poisson de tasa λ: los tiempos entre llegadas son Exponenciales de
+media 1/λ y cada request se envía en su instante programado aunque las
+anteriores no hayan terminado. Barriendo λ se encuentra la "rodilla" a partir
+de la cual la latencia crece porque el servicio se satura.
+
+Cada tasa λ es una unidad de trabajo del runner (se ejecutan de a una); se
+puede ejecutar con `python capitulo_3/experimento_carga.py` o
+`python -m runner capitulo_3.experimento_carga`.
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from runner import main, unit_sample_index
+from api_client import AsyncGroqClient
+from results_io import find_results
+from results_io.schemas import CAPITULO_3_CARGA
+from capitulo_3.experimento import DEFAULT_CONFIG as BASE_CONFIG
+
+# --- CONFIGURACIÓN ---
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": BASE_CONFIG["prompt"],
+    "temperature": BASE_CONFIG["temperature"],
+    "top_p": BASE_CONFIG["top_p"],
+    "max_tokens": BASE_CONFIG["max_tokens"],
+    "rates": [0.5, 1.0, 2.0, 4.0, 8.0, 16.0],  # Tasas de llegada λ a barrer (req/s)
+    "requests_per_rate": 200,                  # Llegadas por cada tasa
+    "max_open_requests": 512,  # Tope de seguridad de requests abiertas a la vez
+    "seed": 0,                 # Semilla de los tiempos entre llegadas
+    "max_in_flight": 1,        # Tasas simultáneas: una por vez para no mezclar cargas
+    "flush_every": 1,
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados_carga.parquet"),
+}
+
+SCHEMA = CAPITULO_3_CARGA
+# --simulate: latencias de experimento.py (el barrido de carga es lo que se mide)
+SIMULATION_SOURCE = find_results(os.path.dirname(__file__))
+
+def make_client(config):
+    # El tope de requests abiertas es independiente de las unidades simultáneas
+    return AsyncGroqClient(max_in_flight=config["max_open_requests"])
+
+def work_units(config):
+    for rate in config["rates"]:
+        yield {"unit_id": f"{rate:g}", "rate": float(rate)}
+
+async def run_unit(client, unit, config):
+    rate = unit["rate"]
+    # Semilla por tasa: reanudar o repetir una tasa reproduce sus llegadas
+    rng = random.Random(f"{config['seed']}:{rate:g}")
+    in_flight = 0
+
+    async def send(request_id, t_scheduled):
+        nonlocal in_flight
+        in_flight += 1
+        in_flight_at_send = in_flight
+        status = "ok"
+        error_type = None
+        latency = None
+        try:
+            result = await client.chat_detailed(
+                messages=[{"role": "user", "content": config["prompt"]}],
+                temperature=config["temperature"],
+                top_p=config["top_p"],
+                max_tokens=config["max_tokens"],
+                sample_index=unit_sample_index(unit["unit_id"], request_id)
+            )
+            latency = result.latency
+        except Exception as e:
+            status = "error"
+            error_type = type(e).__name__
+        finally:
+            in_flight -= 1
+
+        with client.phase("parse"):
+            t_end = time.time()
+            if latency is None:
+                latency = t_end - t_scheduled
+            return {
+                "target_rate": rate,
+                "request_id": request_id,
+                "t_scheduled": t_scheduled,
+                # Envío real: lo que se atrasa respecto de t_scheduled es espera local
+                # (limitador de tasa o tope de requests abiertas), no del servidor
+                "t_start": t_end - latency,
+                "t_end": t_end,
+                "latency_seconds": latency,
+                "in_flight": in_flight_at_send,
+                "status": status,
+                "error_type": error_type
+            }
+
+    print(f"\nλ = {rate:g} req/s: {config['requests_per_rate']} llegadas...")
+    tasks = []
+    t_origin = time.time()
+    t_arrival = t_origin
+    for request_id in range(1, config["requests_per_rate"] + 1):
+        t_arrival += rng.expovariate(rate)
+        delay = t_arrival - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Lazo abierto: la request se lanza aunque las anteriores sigan en vuelo
+        tasks.append(asyncio.ensure_future(send(request_id, t_arrival)))
+
+    return list(await asyncio.gather(*tasks))
+
+if __name__ == "__main__":
+    main(module=sys.modules[__name__])
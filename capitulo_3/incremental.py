@@ -0,0 +1,113 @@
+"""
+Acumuladores para analizar los resultados por bloques, con memoria acotada.
+
+- `RunningMoments`: cantidad, media, varianza, mínimo y máximo. Cada bloque se
+  resume con NumPy y se combina con lo acumulado (fórmula de Chan et al.), así
+  que un único bloque da exactamente lo mismo que `np.mean` / `np.std`.
+- `Reservoir`: muestra uniforme sin reposición de tamaño fijo. A cada valor se
+  le asigna una clave aleatoria y se conservan los de menor clave; mientras no
+  se supere el tamaño, la muestra son todos los valores.
+- `WindowCounter`: conteos por ventana de tiempos que llegan ordenados, con
+  los mismos bordes y el mismo truncado que `analisis.window_counts`.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class RunningMoments:
+    """Momentos de una secuencia de valores que llega por bloques."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Suma de los cuadrados de los desvíos a la media
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = float(((values - mean) ** 2).sum())
+        if self.n == 0:
+            self.mean, self.m2 = mean, m2
+        else:
+            total = self.n + n
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n += n
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def var(self) -> float:
+        """Varianza poblacional, como `np.var`."""
+        return self.m2 / self.n if self.n else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+
+class Reservoir:
+    """Muestra uniforme de a lo sumo `size` valores de una secuencia que llega por bloques."""
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty(0)
+        self._keys = np.empty(0)
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        keys = np.concatenate([self._keys, self.rng.random(len(values))])
+        values = np.concatenate([self.values, values])
+        if len(values) > self.size:
+            keep = np.argpartition(keys, self.size - 1)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self._keys, self.values = keys, values
+
+
+class WindowCounter:
+    """Conteos en ventanas consecutivas de `window` segundos de tiempos ordenados."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.last = 0.0
+
+    def add(self, event_times) -> None:
+        """Agrega un bloque de tiempos, posteriores (o iguales) a los ya agregados."""
+        event_times = np.asarray(event_times, dtype=float)
+        if len(event_times) == 0:
+            return
+        # La ventana j cubre (j·w, (j+1)·w], con los bordes calculados como en
+        # window_counts; floor(t/w) se corrige si el redondeo lo dejó del otro lado
+        index = np.floor(event_times / self.window).astype(np.int64)
+        index -= event_times <= index * self.window
+        index += event_times > (index + 1) * self.window
+        index = index[index >= 0]
+        if len(index):
+            counts = np.bincount(index)
+            if len(counts) > len(self.counts):
+                counts[:len(self.counts)] += self.counts
+                self.counts = counts
+            else:
+                self.counts[:len(counts)] += counts
+        self.last = float(event_times[-1])
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Tupla (bordes, conteos) truncada al último bucket completo, como window_counts."""
+        n_windows = int(math.floor(self.last / self.window))
+        counts = np.zeros(n_windows, dtype=np.int64)
+        available = min(n_windows, len(self.counts))
+        counts[:available] = self.counts[:available]
+        return np.arange(n_windows + 1) * self.window, counts
@@ -2,8 +2,10 @@
 Análisis del Capítulo 4: Distribuciones Inducidas
 
 Procesa los resultados de los experimentos de temperatura y top-p,
-calcula métricas de dispersión (Entropía de Shannon) y genera
-gráficos comparativos de las distribuciones.
+calcula métricas de dispersión (Entropía de Shannon) y divergencias entre
+configuraciones (KL y Jensen-Shannon), y genera gráficos comparativos de las
+distribuciones. Todas las configuraciones se agregan en una sola pasada, así
+que el costo no depende de cuántas haya.
 """
 
 import os
@@ -11,9 +13,20 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import re
+import sys
 
-DATA_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_io import read_results, iter_results, find_results, derived_path, DEFAULT_CHUNK_ROWS
+
+DATA_FILE = find_results(os.path.dirname(__file__))
 CATEGORIES = ['A', 'B', 'C', 'D']  # Espacio muestral fijo
+INVALID = 'INVALID'
+# Una opción aislada dentro de la respuesta ("Opción A", "La respuesta es B")
+CHOICE_PATTERN = re.compile(r'\b([ABCD])\b')
+LABELS = CATEGORIES + [INVALID]
+MAX_BAR_CONFIGS = 6    # Con más configuraciones, heatmap en lugar de barras agrupadas
+MAX_TICK_LABELS = 60   # Etiquetas de configuración por eje en los heatmaps
+KL_SMOOTHING = 0.5     # Pseudo-conteos por categoría en la divergencia KL
 
 def clean_response(text):
     """
@@ -21,7 +34,7 @@ def clean_response(text):
     Devuelve 'INVALID' si no encuentra ninguna o hay ambigüedad.
     """
     if pd.isna(text) or text == "ERROR":
-        return "INVALID"
+        return INVALID
     
     text = str(text).upper().strip()
     
@@ -30,114 +43,343 @@ def clean_response(text):
         return text
     
     # Buscar patrones como "Opción A", "La respuesta es B", etc.
-    matches = re.findall(r'\b([ABCD])\b', text)
+    matches = CHOICE_PATTERN.findall(text)
     if len(matches) == 1:
         return matches[0]
     
-    return "INVALID"
+    return INVALID
+
+def categorize_responses(responses):
+    """
+    Versión vectorizada de `clean_response` para una columna completa.
+
+    Las respuestas se repiten muchísimo ("A", "B", ...), así que se parsean
+    sólo los valores distintos, con operaciones de texto de pandas, y el
+    resultado vuelve a cada fila indexando con los códigos de `pd.factorize`
+    (en Parquet la columna ya es categórica y los códigos vienen gratis).
+
+    Returns:
+        Serie categórica con categorías CATEGORIES + [INVALID], alineada con `responses`
+    """
+    codes, uniques = pd.factorize(responses)
+    text = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.upper().str.strip()
+    matches = text.str.findall(CHOICE_PATTERN)
+    parsed = text.where(text.isin(CATEGORIES), matches.str[0].where(matches.str.len() == 1))
+    parsed = parsed.where(np.asarray(uniques, dtype=object) != "ERROR")
+
+    unique_codes = pd.Categorical(parsed, categories=CATEGORIES).codes.astype(np.int64)
+    unique_codes[unique_codes < 0] = len(CATEGORIES)
+    # Un nulo tiene código -1 en `codes`: el último elemento agregado lo manda a INVALID
+    row_codes = np.append(unique_codes, len(CATEGORIES))[codes]
+    return pd.Series(pd.Categorical.from_codes(row_codes, categories=LABELS), index=responses.index)
+
+def config_counts(df):
+    """
+    Conteos por configuración y categoría en una sola pasada.
+
+    Equivale a `pd.crosstab(config_name, category)`: un único groupby sobre
+    ambas columnas, sin filtrar el DataFrame por cada configuración. Las filas
+    quedan en orden de aparición y las columnas son CATEGORIES + [INVALID],
+    aunque alguna categoría no aparezca.
+    """
+    counts = (
+        df.groupby(['config_name', 'category'], observed=True, sort=False)
+        .size()
+        .unstack('category', fill_value=0)
+        .reindex(columns=LABELS, fill_value=0)
+    )
+    counts.columns = pd.Index(LABELS, name='category')
+    counts.index = counts.index.astype(str)
+    return counts
+
+def config_metrics(counts):
+    """
+    Probabilidades, entropía y tasa de inválidos de todas las configuraciones.
+
+    Las probabilidades se calculan sobre el total de respuestas (inválidas
+    incluidas), así que las columnas de LABELS suman 1 por fila. La entropía
+    se calcula sobre A, B, C y D, con la masa INVALID fuera de la suma.
+
+    Returns:
+        DataFrame indexado por configuración con las columnas `n`, una
+        probabilidad por categoría de LABELS, `entropy`, `invalid_count` e
+        `invalid_rate`
+    """
+    n = counts.sum(axis=1)
+    probs = counts.div(n, axis=0)
+
+    # Entropía de Shannon: H(X) = -Σ p(x) * log₂(p(x))
+    # Máximo = log₂(4) = 2 bits para distribución uniforme
+    p = probs[CATEGORIES].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+    metrics = probs.copy()
+    metrics.columns = list(LABELS)
+    metrics.insert(0, 'n', n)
+    metrics['entropy'] = np.maximum(entropy, 0.0)
+    metrics['invalid_count'] = counts[INVALID]
+    metrics['invalid_rate'] = probs[INVALID]
+    return metrics
+
+def divergence_matrices(counts, smoothing=KL_SMOOTHING):
+    """
+    Divergencias de Kullback-Leibler y Jensen-Shannon (en bits) entre cada par de configuraciones.
+
+    Las distribuciones incluyen INVALID, para que sean distribuciones
+    completas. La KL se calcula con `smoothing` pseudo-conteos por categoría:
+    sin ellos una categoría que no aparece en Q pero sí en P la hace
+    infinita. La JS es siempre finita (está entre 0 y 1 bit) y se calcula
+    sobre las probabilidades empíricas:
+
+        KL(P‖Q) = Σ p log₂ p - Σ p log₂ q
+        JS(P, Q) = H((P + Q) / 2) - (H(P) + H(Q)) / 2
+
+    Ambas se calculan para todos los pares a la vez, con broadcasting.
+
+    Returns:
+        (kl, js): DataFrames cuadrados indexados por configuración; kl.loc[p, q] = KL(P‖Q)
+    """
+    names = counts.index
+    values = counts.to_numpy(dtype=float)
+
+    smoothed = values + smoothing
+    smoothed /= smoothed.sum(axis=1, keepdims=True)
+    log_smoothed = np.log2(smoothed)
+    kl = (smoothed * log_smoothed).sum(axis=1)[:, None] - smoothed @ log_smoothed.T
+
+    def entropy(p):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=-1)
+
+    probs = values / values.sum(axis=1, keepdims=True)
+    mixture = (probs[:, None, :] + probs[None, :, :]) / 2
+    entropies = entropy(probs)
+    js = entropy(mixture) - (entropies[:, None] + entropies[None, :]) / 2
+
+    return (
+        pd.DataFrame(np.maximum(kl, 0.0), index=names, columns=names),
+        pd.DataFrame(np.clip(js, 0.0, 1.0), index=names, columns=names),
+    )
 
-def analyze_experiment(filepath=DATA_FILE):
+def chunked_config_counts(filepath, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    `config_counts` de un archivo leído por bloques, con memoria acotada.
+
+    Cada bloque se categoriza y se cuenta por separado; como los conteos se
+    suman, el resultado es el mismo que leyendo el archivo entero. Las
+    configuraciones quedan en orden de aparición.
+    """
+    counts = None
+    for chunk in iter_results(filepath, columns=['config_name', 'response'], chunk_rows=chunk_rows):
+        chunk['category'] = categorize_responses(chunk['response'])
+        chunk_counts = config_counts(chunk)
+        counts = chunk_counts if counts is None else (
+            pd.concat([counts, chunk_counts]).groupby(level=0, sort=False).sum()
+        )
+    if counts is None:
+        counts = pd.DataFrame(columns=pd.Index(LABELS, name='category'), dtype=np.int64)
+    return counts
+
+def analyze_experiment(filepath=DATA_FILE, chunk_rows=None):
+    """
+    Analiza un archivo de resultados.
+
+    Con `chunk_rows` el archivo se lee por bloques de esa cantidad de filas y
+    sólo se conserva la tabla de conteos configuración × categoría, con los
+    mismos resultados que leyéndolo entero.
+    """
     print(f"Analizando archivo: {filepath}")
     
     if not os.path.exists(filepath):
         print("El archivo no existe.")
         return
 
-    df = pd.read_csv(filepath)
-    print(f"Total de registros: {len(df)}")
-    
-    # Limpiamos las respuestas
-    df['category'] = df['response'].apply(clean_response)
-    
+    if chunk_rows:
+        counts = chunked_config_counts(filepath, chunk_rows)
+    else:
+        df = read_results(filepath, columns=['config_name', 'response'])
+        # Limpiamos las respuestas
+        df['category'] = categorize_responses(df['response'])
+        counts = config_counts(df)
+    print(f"Total de registros: {int(counts.to_numpy().sum())}")
+    if counts.empty:
+        print("No hay respuestas para analizar.")
+        return
+
     print("\n--- Distribución Global de Categorías ---")
-    print(df['category'].value_counts())
-    
-    # Análisis por configuración
-    configs = df['config_name'].unique()
-    results_by_config = {}
+    print(counts.sum().sort_values(ascending=False, kind='stable').rename('count'))
     
-    for config_name in configs:
-        subset = df[df['config_name'] == config_name]
-        total_n = len(subset)
-        
-        # Conteo de categorías
-        counts = subset['category'].value_counts()
-        
-        # Aseguramos que todas las categorías existan
-        for cat in CATEGORIES:
-            if cat not in counts:
-                counts[cat] = 0
-                
-        # Probabilidades empíricas
-        probs = {cat: counts.get(cat, 0) / total_n for cat in CATEGORIES}
-        
-        # Entropía de Shannon: H(X) = -Σ p(x) * log₂(p(x))
-        # Máximo = log₂(4) = 2 bits para distribución uniforme
-        entropy = 0
-        for p in probs.values():
-            if p > 0:
-                entropy -= p * np.log2(p)
-                
-        results_by_config[config_name] = {
-            "counts": counts,
-            "probs": probs,
-            "entropy": entropy,
-            "n": total_n,
-            "invalid_count": counts.get("INVALID", 0)
-        }
-        
-        print(f"\nConfiguración: {config_name} (N={total_n})")
-        print(f"  Entropía: {entropy:.4f} bits")
-        print(f"  Inválidos: {counts.get('INVALID', 0)}")
-        print("  Distribución:")
-        for cat in CATEGORIES:
-            print(f"    {cat}: {probs[cat]:.4f} ({counts.get(cat, 0)})")
-
-    plot_distributions(results_by_config, filepath)
-
-def plot_distributions(results, filepath):
-    """Genera gráfico de barras comparando las distribuciones por configuración."""
-    configs = list(results.keys())
+    # Análisis por configuración: todas a la vez
+    metrics = config_metrics(counts)
+    kl, js = divergence_matrices(counts)
+
+    if len(metrics) <= MAX_BAR_CONFIGS:
+        for config_name, row in metrics.iterrows():
+            print(f"\nConfiguración: {config_name} (N={row['n']:.0f})")
+            print(f"  Entropía: {row['entropy']:.4f} bits")
+            print(f"  Inválidos: {row['invalid_count']:.0f}")
+            print("  Distribución:")
+            for cat in CATEGORIES:
+                print(f"    {cat}: {row[cat]:.4f} ({counts.loc[config_name, cat]})")
+    else:
+        print(f"\n--- Métricas por configuración ({len(metrics)} configuraciones) ---")
+        print(metrics.round(4))
+
+    if len(metrics) > 1:
+        # Par más distinto según JS (la diagonal es 0)
+        i, j = np.unravel_index(np.argmax(js.to_numpy()), js.shape)
+        print(f"\nMayor divergencia JS: {js.index[i]} vs {js.columns[j]} ({js.iat[i, j]:.4f} bits)")
+
+    metrics_file = derived_path(filepath, '_metricas.csv')
+    metrics.to_csv(metrics_file, index_label='config_name')
+    kl_file = derived_path(filepath, '_kl.csv')
+    kl.to_csv(kl_file, index_label='config_name')
+    js_file = derived_path(filepath, '_js.csv')
+    js.to_csv(js_file, index_label='config_name')
+    print(f"\nMétricas guardadas en: {metrics_file}")
+    print(f"Divergencias guardadas en: {kl_file} y {js_file}")
+
+    plot_distributions(metrics, filepath)
+    if len(metrics) > 1:
+        plot_divergences(js, filepath)
+    return metrics
+
+def compare_with_logprobs(metrics, logprobs_file):
+    """
+    Valida la distribución exacta (experimento_logprobs.py) contra la muestreada.
+
+    Compara por nombre de configuración las probabilidades, la entropía y la
+    distancia de variación total TV = ½ Σ |p_muestreada - p_exacta|.
+    """
+    exact = read_results(logprobs_file)
+    table = exact.pivot_table(index="config_name", columns="category", values="probability", observed=True)
+    table.index = table.index.astype(str)
+    table.columns = table.columns.astype(str)
+
+    matched = metrics.index[metrics.index.isin(table.index)]
+    exact_probs = table.reindex(index=matched, columns=LABELS, fill_value=0.0).fillna(0.0)
+    sampled_probs = metrics.loc[matched, LABELS]
+    tv = 0.5 * (sampled_probs - exact_probs).abs().sum(axis=1)
+
+    # Entropía exacta con la misma fórmula que la muestreada (sólo A, B, C, D)
+    p = exact_probs[CATEGORIES].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exact_entropy = pd.Series(-np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1), index=matched)
+
+    print("\n--- Validación contra la distribución exacta (logprobs) ---")
+    for config_name in metrics.index:
+        if config_name not in table.index:
+            print(f"\nConfiguración: {config_name} (sin distribución exacta)")
+            continue
+
+        print(f"\nConfiguración: {config_name} (N={metrics.loc[config_name, 'n']:.0f})")
+        print(f"  Entropía: muestreada {metrics.loc[config_name, 'entropy']:.4f} / exacta {exact_entropy[config_name]:.4f} bits")
+        print(f"  Distancia de variación total: {tv[config_name]:.4f}")
+        for cat in LABELS:
+            print(f"    {cat}: {sampled_probs.loc[config_name, cat]:.4f} vs {exact_probs.loc[config_name, cat]:.4f}")
+
+def plot_distributions(metrics, filepath):
+    """
+    Gráfico de las distribuciones por configuración.
+
+    Con hasta MAX_BAR_CONFIGS configuraciones, barras agrupadas por categoría
+    (el ancho y el desplazamiento de cada barra dependen de la cantidad de
+    configuraciones). Con más, un heatmap configuración × categoría, con la
+    entropía y la tasa de inválidos como columnas aparte.
+    """
+    configs = list(metrics.index)
     categories = CATEGORIES
-    
-    x = np.arange(len(categories))
-    width = 0.25
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    offsets = [-width, 0, width]
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
-    
-    for i, config_name in enumerate(configs):
-        offset = offsets[i] if i < len(offsets) else 0
-        probs = [results[config_name]['probs'][cat] for cat in categories]
-        ax.bar(x + offset, probs, width, label=config_name, 
-               color=colors[i % len(colors)], alpha=0.8)
-
-    ax.set_ylabel('Probabilidad Empírica')
-    ax.set_title('Distribución de Respuestas por Configuración de Temperatura')
-    ax.set_xticks(x)
-    ax.set_xticklabels(categories)
-    ax.legend()
-    ax.grid(axis='y', alpha=0.3)
-    
-    # Mostramos la entropía de cada configuración
-    info_text = "Entropía (bits):\n"
-    for conf in configs:
-        info_text += f"{conf}: {results[conf]['entropy']:.2f}\n"
-        
-    plt.text(0.02, 0.95, info_text, transform=ax.transAxes, verticalalignment='top', 
-             bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-    
-    plot_path = filepath.replace('.csv', '_distribucion.png')
+
+    if len(configs) <= MAX_BAR_CONFIGS:
+        x = np.arange(len(categories))
+        width = 0.8 / len(configs)
+        colors = plt.cm.tab10(np.arange(len(configs)) % 10)
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for i, config_name in enumerate(configs):
+            offset = (i - (len(configs) - 1) / 2) * width
+            probs = metrics.loc[config_name, categories].to_numpy(dtype=float)
+            ax.bar(x + offset, probs, width, label=config_name,
+                   color=colors[i], alpha=0.8)
+
+        ax.set_ylabel('Probabilidad Empírica')
+        ax.set_title('Distribución de Respuestas por Configuración de Temperatura')
+        ax.set_xticks(x)
+        ax.set_xticklabels(categories)
+        ax.legend()
+        ax.grid(axis='y', alpha=0.3)
+
+        # Mostramos la entropía de cada configuración
+        info_text = "Entropía (bits):\n"
+        for conf in configs:
+            info_text += f"{conf}: {metrics.loc[conf, 'entropy']:.2f}\n"
+
+        plt.text(0.02, 0.95, info_text, transform=ax.transAxes, verticalalignment='top',
+                 bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+    else:
+        height = min(max(6, 0.25 * len(configs)), 40)
+        fig, (ax, ax_side) = plt.subplots(1, 2, figsize=(10, height), sharey=True, layout='constrained',
+                                          gridspec_kw={'width_ratios': [len(categories), 2]})
+        image = ax.imshow(metrics[categories].to_numpy(dtype=float), aspect='auto',
+                          cmap='viridis', vmin=0, vmax=1, interpolation='nearest')
+        ax.set_xticks(np.arange(len(categories)))
+        ax.set_xticklabels(categories)
+        ax.set_title('Probabilidad Empírica')
+
+        # Entropía (sobre su máximo, 2 bits) y tasa de inválidos, en la misma escala 0-1
+        side = np.column_stack([metrics['entropy'] / np.log2(len(categories)), metrics['invalid_rate']])
+        ax_side.imshow(side, aspect='auto', cmap='viridis', vmin=0, vmax=1, interpolation='nearest')
+        ax_side.set_xticks([0, 1])
+        ax_side.set_xticklabels(['H / 2 bits', 'Inválidos'])
+        ax_side.set_title('Dispersión')
+
+        _config_ticks(ax, configs, axis='y')
+        fig.colorbar(image, ax=[ax, ax_side], location='bottom', shrink=0.6)
+        fig.suptitle(f'Distribución de Respuestas por Configuración ({len(configs)} configuraciones)')
+
+    plot_path = derived_path(filepath, '_distribucion.png')
     plt.savefig(plot_path)
     print(f"\nGráfico guardado en: {plot_path}")
     plt.close()
 
+def plot_divergences(js, filepath):
+    """Heatmap de la divergencia de Jensen-Shannon entre cada par de configuraciones."""
+    configs = list(js.index)
+    size = min(max(6, 0.25 * len(configs)), 40)
+    fig, ax = plt.subplots(figsize=(size + 1.5, size), layout='constrained')
+    image = ax.imshow(js.to_numpy(), cmap='viridis', vmin=0, interpolation='nearest')
+    fig.colorbar(image, ax=ax, label='JS (bits)')
+    _config_ticks(ax, configs, axis='x')
+    _config_ticks(ax, configs, axis='y')
+    ax.set_title('Divergencia de Jensen-Shannon entre configuraciones')
+
+    plot_path = derived_path(filepath, '_divergencia.png')
+    plt.savefig(plot_path)
+    print(f"Gráfico guardado en: {plot_path}")
+    plt.close()
+
+def _config_ticks(ax, configs, axis):
+    """Etiquetas de configuración en un eje, salteando algunas si son demasiadas para leerse."""
+    step = max(1, int(np.ceil(len(configs) / MAX_TICK_LABELS)))
+    positions = np.arange(0, len(configs), step)
+    labels = [configs[i] for i in positions]
+    if axis == 'x':
+        ax.set_xticks(positions)
+        ax.set_xticklabels(labels, rotation=90)
+    else:
+        ax.set_yticks(positions)
+        ax.set_yticklabels(labels)
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Analizar resultados del experimento de distribuciones.')
-    parser.add_argument('file', nargs='?', default=DATA_FILE, help='Archivo CSV a analizar')
+    parser.add_argument('file', nargs='?', default=DATA_FILE, help='Resultados a analizar (.parquet o .csv)')
+    parser.add_argument('--logprobs', help='Resultados de experimento_logprobs.py para validar contra la distribución exacta')
+    parser.add_argument('--chunked', nargs='?', type=int, const=DEFAULT_CHUNK_ROWS, metavar='FILAS',
+                        help=f'Leer el archivo por bloques de FILAS filas (por defecto {DEFAULT_CHUNK_ROWS}), con memoria acotada')
     args = parser.parse_args()
     
-    analyze_experiment(args.file)
+    metrics = analyze_experiment(args.file, chunk_rows=args.chunked)
+    if metrics is not None and args.logprobs:
+        compare_with_logprobs(metrics, args.logprobs)
@@ -0,0 +1,359 @@
+"""
+Barrido adaptativo de temperatura × top-p por rondas.
+
+En lugar de una grilla uniforme con la misma cantidad de muestras en cada
+punto, el barrido arranca con una grilla gruesa y, entre rondas, decide dónde
+gastar el presupuesto de la ronda siguiente a partir de la entropía estimada
+en cada punto:
+
+- Refinamiento: la región se divide en celdas rectangulares cuyos vértices son
+  los puntos muestreados. Una celda se parte en cuatro cuando la diferencia
+  de entropía entre sus vértices extremos supera `refine_threshold` bits más
+  el margen de error de esa diferencia, z·√(se_i² + se_j²). Como en cada
+  ronda se comparan muchos pares (los 6 de cada celda, de los que se toman
+  los extremos), z lleva la corrección de Bonferroni por esa cantidad; sin
+  ella, una superficie plana se refina sólo por ruido. Los nuevos
+  vértices se muestrean en la ronda siguiente. Si la diferencia supera el
+  umbral pero no el margen, puede ser ruido de muestreo: en lugar de partir
+  la celda, sus dos vértices extremos reciben `initial_samples` muestras más.
+  Las regiones planas quedan con la resolución inicial.
+- Asignación: el resto del presupuesto va a los puntos cuyo intervalo de
+  confianza de la entropía es más ancho que `target_width`, en proporción a
+  su error estándar, con más peso donde la entropía cambia rápido alrededor
+  del punto.
+
+El error estándar de la entropía se aproxima con el método delta:
+
+    Var(Ĥ) ≈ (Σ p g² - (Σ p g)²) / n,   g(x) = -(log₂ p(x) + 1/ln 2)
+
+con g = 0 para INVALID (que no entra en la entropía). Para que un punto con
+todas las respuestas iguales no parezca exacto, las p de esta fórmula llevan
+0.5 pseudo-conteos por categoría.
+
+Con σ = se·√n el desvío por muestra, un intervalo de ancho w requiere
+n ≈ (2 z σ / w)² muestras. En los puntos de más entropía σ llega a 1.4 bits,
+así que el `target_width` de 0.6 bits pide unas 85 muestras, que las rondas
+por defecto alcanzan a dar casi en todos los puntos (la mayor parte del
+presupuesto se va en los puntos nuevos del refinamiento). Un objetivo de
+0.3 bits pide unas 330 y 0.15 unas 1300: hacen falta más `round_budget` o
+más rondas.
+
+El barrido termina cuando se agotan las rondas o cuando no queda nada que
+refinar ni ningún intervalo más ancho que el objetivo.
+"""
+
+import json
+import math
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from capitulo_4.analisis import CATEGORIES, LABELS, config_metrics
+
+Point = Tuple[float, float]               # (temperatura, top-p)
+Cell = Tuple[float, float, float, float]  # (t0, t1, p0, p1)
+
+SE_SMOOTHING = 0.5  # Pseudo-conteos por categoría en el error estándar
+DECIMALS = 6        # Redondeo de las coordenadas, para comparar puntos sin errores de punto flotante
+
+
+def point_name(temperature: float, top_p: float) -> str:
+    """Nombre de configuración de un punto de la grilla (ordena por temperatura y luego top-p)."""
+    return f"T={temperature:.3f} P={top_p:.3f}"
+
+
+def _point(temperature: float, top_p: float) -> Point:
+    return round(float(temperature), DECIMALS), round(float(top_p), DECIMALS)
+
+
+def entropy_standard_error(counts: pd.DataFrame) -> pd.Series:
+    """Error estándar (método delta) de la entropía de cada fila de una tabla de conteos por categoría."""
+    values = counts[LABELS].to_numpy(dtype=float)
+    n = values.sum(axis=1)
+    p = (values + SE_SMOOTHING) / (n + SE_SMOOTHING * len(LABELS))[:, None]
+    g = -(np.log2(p) + 1 / math.log(2))
+    g[:, len(CATEGORIES):] = 0.0
+    variance = ((p * g ** 2).sum(axis=1) - (p * g).sum(axis=1) ** 2) / np.maximum(n, 1)
+    return pd.Series(np.sqrt(np.maximum(variance, 0.0)), index=counts.index)
+
+
+def point_stats(counts: pd.DataFrame, confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Entropía y su intervalo de confianza por configuración.
+
+    Args:
+        counts: Conteos configuración × categoría (ver analisis.config_counts)
+        confidence: Nivel de confianza de los intervalos
+
+    Returns:
+        DataFrame indexado por configuración con `n`, `entropy`, `se`,
+        `lower`, `upper` e `invalid_rate`
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    metrics = config_metrics(counts)
+    se = entropy_standard_error(counts)
+    return pd.DataFrame({
+        "n": metrics["n"],
+        "entropy": metrics["entropy"],
+        "se": se,
+        "lower": np.maximum(metrics["entropy"] - z * se, 0.0),
+        "upper": np.minimum(metrics["entropy"] + z * se, math.log2(len(CATEGORIES))),
+        "invalid_rate": metrics["invalid_rate"],
+    })
+
+
+class AdaptiveSweep:
+    """Grilla de (temperatura, top-p) que se refina y reasigna muestras entre rondas."""
+
+    def __init__(
+        self,
+        temperature_range: Sequence[float] = (0.0, 1.5),
+        top_p_range: Sequence[float] = (0.5, 1.0),
+        initial_grid: Sequence[int] = (4, 3),
+        initial_samples: int = 40,
+        round_budget: int = 1000,
+        max_rounds: int = 4,
+        max_splits: int = 3,
+        refine_threshold: float = 0.2,
+        min_cell_size: Sequence[float] = (0.1, 0.05),
+        target_width: float = 0.6,
+        confidence: float = 0.95,
+    ):
+        """
+        Args:
+            temperature_range: Temperaturas mínima y máxima
+            top_p_range: Top-p mínimo y máximo
+            initial_grid: Puntos de la grilla inicial por eje (temperatura, top-p)
+            initial_samples: Muestras de cada punto nuevo (de la grilla inicial o del refinamiento)
+            round_budget: Requests por ronda a partir de la segunda
+            max_rounds: Rondas totales, incluida la inicial
+            max_splits: Celdas que se parten como máximo por ronda
+            refine_threshold: Diferencia de entropía (bits) entre vértices que justifica partir una celda
+            min_cell_size: Tamaño mínimo de una celda por eje; las más chicas no se parten
+            target_width: Ancho del intervalo de la entropía (bits) a partir del cual un punto no recibe más muestras
+            confidence: Nivel de confianza de los intervalos
+        """
+        if min(initial_grid) < 2:
+            raise ValueError("La grilla inicial necesita al menos 2 puntos por eje")
+        self.temperature_range = tuple(float(x) for x in temperature_range)
+        self.top_p_range = tuple(float(x) for x in top_p_range)
+        self.initial_grid = tuple(int(x) for x in initial_grid)
+        self.initial_samples = initial_samples
+        self.round_budget = round_budget
+        self.max_rounds = max_rounds
+        self.max_splits = max_splits
+        self.refine_threshold = refine_threshold
+        self.min_cell_size = tuple(float(x) for x in min_cell_size)
+        self.target_width = target_width
+        self.confidence = confidence
+        self.cells: List[Cell] = []
+        self.rounds: List[Dict[Point, int]] = []  # Muestras nuevas por punto en cada ronda
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptiveSweep":
+        return cls(
+            temperature_range=config["temperature_range"],
+            top_p_range=config["top_p_range"],
+            initial_grid=config["initial_grid"],
+            initial_samples=config["n_requests_per_config"],
+            round_budget=config["round_budget"],
+            max_rounds=config["max_rounds"],
+            max_splits=config["max_splits"],
+            refine_threshold=config["refine_threshold"],
+            min_cell_size=config["min_cell_size"],
+            target_width=config["target_width"],
+            confidence=config["confidence"],
+        )
+
+    def start(self) -> Dict[Point, int]:
+        """Planifica la ronda inicial: la grilla gruesa, con `initial_samples` muestras por punto."""
+        temperatures = [round(float(t), DECIMALS) for t in np.linspace(*self.temperature_range, self.initial_grid[0])]
+        top_ps = [round(float(p), DECIMALS) for p in np.linspace(*self.top_p_range, self.initial_grid[1])]
+        self.cells = [
+            (t0, t1, p0, p1)
+            for t0, t1 in zip(temperatures[:-1], temperatures[1:])
+            for p0, p1 in zip(top_ps[:-1], top_ps[1:])
+        ]
+        first_round = {(t, p): self.initial_samples for t in temperatures for p in top_ps}
+        self.rounds = [first_round]
+        return first_round
+
+    @property
+    def points(self) -> List[Point]:
+        return sorted({point for planned in self.rounds for point in planned})
+
+    def planned_samples(self) -> Dict[Point, int]:
+        """Muestras planificadas por punto, sumando todas las rondas."""
+        totals: Dict[Point, int] = {}
+        for planned in self.rounds:
+            for point, n in planned.items():
+                totals[point] = totals.get(point, 0) + n
+        return totals
+
+    @staticmethod
+    def _corners(cell: Cell) -> List[Point]:
+        t0, t1, p0, p1 = cell
+        return [(t0, p0), (t0, p1), (t1, p0), (t1, p1)]
+
+    def _splittable(self, cell: Cell) -> bool:
+        t0, t1, p0, p1 = cell
+        return (t1 - t0) / 2 >= self.min_cell_size[0] - 1e-9 and (p1 - p0) / 2 >= self.min_cell_size[1] - 1e-9
+
+    @staticmethod
+    def _split(cell: Cell) -> Tuple[List[Cell], List[Point]]:
+        """Las cuatro subceldas de una celda y sus cinco vértices nuevos."""
+        t0, t1, p0, p1 = cell
+        tm, pm = _point((t0 + t1) / 2, (p0 + p1) / 2)
+        children = [(t0, tm, p0, pm), (t0, tm, pm, p1), (tm, t1, p0, pm), (tm, t1, pm, p1)]
+        new_points = [(tm, pm), (tm, p0), (tm, p1), (t0, pm), (t1, pm)]
+        return children, new_points
+
+    def plan_round(self, stats: pd.DataFrame) -> Optional[Dict[Point, int]]:
+        """
+        Planifica la ronda siguiente a partir de lo observado.
+
+        Args:
+            stats: Resultado de `point_stats`, indexado por `point_name`
+
+        Returns:
+            Muestras nuevas por punto, o None si el barrido terminó
+        """
+        if len(self.rounds) >= self.max_rounds:
+            return None
+
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        known = {point: stats.loc[point_name(*point)] for point in self.points if point_name(*point) in stats.index}
+
+        # Bonferroni sobre los pares de vértices comparados en la ronda (6 por celda)
+        comparisons = 6 * len(self.cells)
+        z_split = NormalDist().inv_cdf(1 - (1 - self.confidence) / (2 * comparisons))
+
+        def entropy_range(cell: Cell) -> float:
+            values = [known[corner]["entropy"] for corner in self._corners(cell) if corner in known]
+            return max(values) - min(values) if len(values) > 1 else 0.0
+
+        def extreme_corners(cell: Cell) -> List[Point]:
+            """Vértices de mayor y menor entropía de la celda (vacío si se conocen menos de dos)."""
+            corners = [corner for corner in self._corners(cell) if corner in known]
+            if len(corners) < 2:
+                return []
+            return [max(corners, key=lambda c: known[c]["entropy"]), min(corners, key=lambda c: known[c]["entropy"])]
+
+        def range_margin(cell: Cell) -> float:
+            """Margen de error de la diferencia entre los vértices extremos."""
+            corners = extreme_corners(cell)
+            return z_split * math.hypot(*(known[corner]["se"] for corner in corners)) if corners else 0.0
+
+        # Cambio local de la entropía alrededor de cada punto: el mayor rango entre las celdas que lo tocan
+        change: Dict[Point, float] = {}
+        for cell in self.cells:
+            variation = entropy_range(cell)
+            for corner in self._corners(cell):
+                change[corner] = max(change.get(corner, 0.0), variation)
+
+        # Refinamiento: las celdas que más cambian primero, mientras alcance el presupuesto.
+        # Sólo se parten las que cambian más que el umbral más el margen de error
+        changing = sorted(
+            (cell for cell in self.cells if entropy_range(cell) > self.refine_threshold and self._splittable(cell)),
+            key=entropy_range, reverse=True,
+        )
+        candidates = [cell for cell in changing if entropy_range(cell) > self.refine_threshold + range_margin(cell)]
+        uncertain = [cell for cell in changing if cell not in candidates]
+        budget = self.round_budget
+        planned: Dict[Point, int] = {}
+        existing = set(self.points)
+        splits = 0
+        for cell in candidates:
+            if splits >= self.max_splits:
+                break
+            children, new_points = self._split(cell)
+            new_points = [point for point in new_points if point not in existing and point not in planned]
+            cost = self.initial_samples * len(new_points)
+            if cost > budget:
+                break
+            budget -= cost
+            planned.update({point: self.initial_samples for point in new_points})
+            self.cells.remove(cell)
+            self.cells.extend(children)
+            splits += 1
+
+        # Celdas que superan el umbral dentro del margen: más muestras en sus extremos antes de partirlas
+        for cell in uncertain:
+            corners = [corner for corner in extreme_corners(cell) if corner not in planned]
+            cost = self.initial_samples * len(corners)
+            if cost > budget:
+                break
+            budget -= cost
+            planned.update({corner: self.initial_samples for corner in corners})
+
+        # Asignación: puntos con intervalo ancho, en proporción al error estándar y al cambio local
+        wide = [point for point, row in known.items() if 2 * z * row["se"] > self.target_width]
+        if wide and budget > 0:
+            weights = np.array([
+                known[point]["se"] * (1 + change.get(point, 0.0) / self.refine_threshold) for point in wide
+            ])
+            shares = budget * weights / weights.sum()
+            extra = np.floor(shares).astype(int)
+            # Resto mayor: las muestras que quedan por redondeo van a las fracciones más grandes
+            for i in np.argsort(-(shares - extra))[: budget - extra.sum()]:
+                extra[i] += 1
+            for point, n in zip(wide, extra):
+                if n > 0:
+                    planned[point] = planned.get(point, 0) + int(n)
+
+        if not planned:
+            return None
+        self.rounds.append(planned)
+        return planned
+
+    def uniform_equivalent(self, stats: pd.DataFrame) -> Tuple[int, int, int, float]:
+        """
+        Grilla uniforme que garantiza lo mismo que el barrido: la resolución más
+        fina alcanzada y, en todos sus puntos, un intervalo de la entropía no más
+        ancho que el más ancho del barrido.
+
+        Una grilla uniforme no sabe de antemano qué puntos tienen más varianza,
+        así que cada punto lleva las muestras que necesita el mayor desvío por
+        muestra observado: n = (2 z σ_max / w)².
+
+        Args:
+            stats: Resultado de `point_stats`, indexado por `point_name`
+
+        Returns:
+            (puntos por eje de temperatura, puntos por eje de top-p, muestras
+            por punto, ancho w del intervalo garantizado)
+        """
+        widths = [(t1 - t0, p1 - p0) for t0, t1, p0, p1 in self.cells]
+        n_t = round((self.temperature_range[1] - self.temperature_range[0]) / min(w[0] for w in widths)) + 1
+        n_p = round((self.top_p_range[1] - self.top_p_range[0]) / min(w[1] for w in widths)) + 1
+
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        width = float((2 * z * stats["se"]).max())
+        sigma = float((stats["se"] * np.sqrt(stats["n"])).max())
+        samples = round((2 * z * sigma / width) ** 2) if width > 0 else int(stats["n"].max())
+        return n_t, n_p, samples, width
+
+    def to_dict(self) -> dict:
+        return {
+            "cells": [list(cell) for cell in self.cells],
+            "rounds": [
+                [{"temperature": t, "top_p": p, "n": n} for (t, p), n in sorted(planned.items())]
+                for planned in self.rounds
+            ],
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def load_state(self, path: str) -> None:
+        """Recupera celdas y rondas planificadas de un archivo guardado con `save`."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.cells = [tuple(cell) for cell in data["cells"]]
+        self.rounds = [
+            {_point(item["temperature"], item["top_p"]): item["n"] for item in planned}
+            for planned in data["rounds"]
+        ]
@@ -4,87 +4,79 @@ Experimento del Capítulo 4: Distribuciones Inducidas (Temperatura)
 Objetivo:
 Analizar cómo la temperatura afecta la distribución de respuestas de un modelo generativo
 ante un prompt de clasificación fija (A, B, C, D).
+
+Cada request de cada configuración es una unidad de trabajo del runner; se puede
+ejecutar con `python capitulo_4/experimento.py` o `python -m runner capitulo_4`.
+
+Con `--set early_stop=true` la respuesta se recibe en streaming y se corta
+apenas se decide la opción elegida (ver api_client/parsers.py). Está
+desactivado por defecto para guardar el texto completo de cada respuesta.
 """
 
 import sys
 import os
-import time
-import pandas as pd
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_client import GroqClient
+from runner import main, unit_sample_index
+from results_io.schemas import CAPITULO_4
+from api_client.parsers import LetterParser
 
 # --- CONFIGURACIÓN ---
-MODEL = "llama-3.1-8b-instant"
-PROMPT = "Elegí una de las siguientes opciones y respondé únicamente con la opción elegida: A, B, C o D."
-N_REQUESTS_PER_CONFIG = 500
-OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "resultados.csv")
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": "Elegí una de las siguientes opciones y respondé únicamente con la opción elegida: A, B, C o D.",
+    "n_requests_per_config": 500,
+    "max_tokens": 10,      # Respuesta corta esperada
+    "early_stop": False,   # Cortar el stream apenas se decide la opción
+    "max_in_flight": 16,   # Cantidad máxima de requests simultáneas
+    "flush_every": 10,     # Filas por lote escrito en el archivo de resultados
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados.parquet"),
+    # Configuraciones a probar: variamos la temperatura
+    "configs": [
+        {"name": "Temp Baja", "temperature": 0.2, "top_p": 1.0},
+        {"name": "Temp Media", "temperature": 0.7, "top_p": 1.0},
+        {"name": "Temp Alta", "temperature": 1.2, "top_p": 1.0},
+    ],
+}
 
-# Configuraciones a probar: variamos la temperatura
-CONFIGS = [
-    {"name": "Temp Baja", "temperature": 0.2, "top_p": 1.0},
-    {"name": "Temp Media", "temperature": 0.7, "top_p": 1.0},
-    {"name": "Temp Alta", "temperature": 1.2, "top_p": 1.0},
-]
+SCHEMA = CAPITULO_4
+ANSWER_PARSER = LetterParser()
 
-def run_experiment():
-    print("=== Capítulo 4 - Distribuciones Inducidas ===")
-    print(f"Modelo: {MODEL}")
-    print(f"Configs: {len(CONFIGS)}")
-    print(f"Requests por config: {N_REQUESTS_PER_CONFIG}")
-    
-    try:
-        client = GroqClient()
-    except ValueError as e:
-        print(f"Error inicializando cliente: {e}")
-        return
+def work_units(config):
+    """Una unidad por request; el identificador combina configuración y número de request."""
+    for config_item in config["configs"]:
+        for i in range(1, config["n_requests_per_config"] + 1):
+            yield {"unit_id": f"{config_item['name']}:{i}", "config": config_item, "i": i}
 
-    results = []
-    total_start = time.time()
-
-    for config in CONFIGS:
-        print(f"\nEjecutando configuración: {config['name']} (T={config['temperature']})")
-        
-        for i in range(1, N_REQUESTS_PER_CONFIG + 1):
-            print(f"  Req {i}/{N_REQUESTS_PER_CONFIG}...", end="", flush=True)
-            
-            try:
-                response = client.chat(
-                    messages=[{"role": "user", "content": PROMPT}],
-                    temperature=config["temperature"],
-                    top_p=config["top_p"],
-                    max_tokens=10  # Respuesta corta esperada
-                )
-                print(f" OK [{response.strip()}]")
-                
-                results.append({
-                    "config_name": config["name"],
-                    "temperature": config["temperature"],
-                    "top_p": config["top_p"],
-                    "response": response,
-                    "timestamp": datetime.now().isoformat()
-                })
-                
-            except Exception as e:
-                print(f" ERROR: {e}")
-                results.append({
-                    "config_name": config["name"],
-                    "temperature": config["temperature"],
-                    "top_p": config["top_p"],
-                    "response": "ERROR",
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            time.sleep(0.2)
+async def run_unit(client, unit, config):
+    config_item = unit["config"]
+    request = dict(
+        messages=[{"role": "user", "content": config["prompt"]}],
+        temperature=config_item["temperature"],
+        top_p=config_item["top_p"],
+        max_tokens=config["max_tokens"]
+    )
+    sample_index = unit_sample_index(unit["unit_id"])
+    try:
+        if config["early_stop"]:
+            streamed = await client.chat_stream(**request, parser=ANSWER_PARSER, sample_index=sample_index)
+            # Si la respuesta es válida guardamos sólo la respuesta, si no el texto recibido
+            response = streamed.answer if streamed.answer is not None else streamed.content
+        else:
+            response = await client.chat(**request, sample_index=sample_index)
+    except Exception as e:
+        print(f"  [{config_item['name']}] Req {unit['i']}/{config['n_requests_per_config']}... ERROR: {e}")
+        response = "ERROR"
 
-    total_duration = time.time() - total_start
-    print(f"\nExperimento finalizado en {total_duration:.2f}s")
-    
-    # Guardamos los resultados
-    df = pd.DataFrame(results)
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"Resultados guardados en: {OUTPUT_FILE}")
+    with client.phase("parse"):
+        return [{
+            "config_name": config_item["name"],
+            "temperature": config_item["temperature"],
+            "top_p": config_item["top_p"],
+            "response": response,
+            "timestamp": datetime.now()
+        }]
 
 if __name__ == "__main__":
-    run_experiment()
+    main(module=sys.modules[__name__])
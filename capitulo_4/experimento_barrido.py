@@ -0,0 +1,157 @@
+"""
+Experimento del Capítulo 4 - Parte 4: Barrido adaptativo de temperatura × top-p
+
+Objetivo:
+Obtener la superficie de entropía de las respuestas sobre una región de
+(temperatura, top-p) con muchas menos requests que una grilla uniforme: la
+grilla se refina donde la entropía cambia más y las muestras extra van a los
+puntos con intervalos más anchos (ver barrido.py).
+
+El barrido corre por rondas dentro de una misma ejecución del runner. El plan
+de cada ronda se guarda en `<resultados>_plan.json`, así que una ejecución
+interrumpida se reanuda en la misma ronda, con las mismas unidades. Se puede
+ejecutar con `python capitulo_4/experimento_barrido.py` o
+`python -m runner capitulo_4.experimento_barrido`.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import matplotlib.pyplot as plt
+
+from runner import main, checkpoint_path
+from results_io import read_results, derived_path, find_results
+from results_io.schemas import CAPITULO_4
+from capitulo_4.experimento import DEFAULT_CONFIG as TEMPERATURE_CONFIG, run_unit
+from capitulo_4.analisis import categorize_responses, config_counts
+from capitulo_4.barrido import AdaptiveSweep, point_name, point_stats
+
+# --- CONFIGURACIÓN ---
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": TEMPERATURE_CONFIG["prompt"],
+    "max_tokens": TEMPERATURE_CONFIG["max_tokens"],
+    "early_stop": TEMPERATURE_CONFIG["early_stop"],
+    "max_in_flight": 16,
+    "flush_every": 10,
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados_barrido.parquet"),
+    # Región y grilla inicial
+    "temperature_range": [0.0, 1.5],
+    "top_p_range": [0.5, 1.0],
+    "initial_grid": [4, 3],          # Puntos por eje (temperatura, top-p)
+    "n_requests_per_config": 40,     # Muestras de cada punto nuevo
+    # Rondas siguientes
+    "round_budget": 1000,            # Requests por ronda
+    "max_rounds": 4,                 # Incluida la inicial
+    "max_splits": 3,                 # Celdas que se parten por ronda
+    "refine_threshold": 0.2,         # Bits de diferencia entre vértices que justifican partir una celda
+    "min_cell_size": [0.1, 0.05],    # Tamaño mínimo de celda (temperatura, top-p)
+    "target_width": 0.6,             # Ancho (bits) del intervalo de la entropía que ya alcanza (~85 muestras)
+    "confidence": 0.95,
+}
+
+SCHEMA = CAPITULO_4
+# --simulate: las respuestas de experimento.py; los puntos de la grilla que no
+# están ahí se reescalan desde esas configuraciones (ver api_client.simulated_client)
+SIMULATION_SOURCE = find_results(os.path.dirname(__file__))
+
+def plan_path(config):
+    return derived_path(config["output_file"], "_plan.json")
+
+def load_sweep(config):
+    """
+    Barrido con las rondas ya planificadas, o uno nuevo con la ronda inicial.
+
+    El plan guardado sólo vale si hay unidades registradas en el índice de
+    avance: con --restart (o si nunca se completó nada) se empieza de cero.
+    """
+    sweep = AdaptiveSweep.from_config(config)
+    index_file = checkpoint_path(config["output_file"])
+    if os.path.exists(plan_path(config)) and os.path.exists(index_file) and os.path.getsize(index_file) > 0:
+        sweep.load_state(plan_path(config))
+    else:
+        sweep.start()
+        sweep.save(plan_path(config))
+    return sweep
+
+def observed_stats(config):
+    """Entropía e intervalo de cada punto con todas las filas guardadas."""
+    df = read_results(config["output_file"], columns=["config_name", "response"])
+    df["category"] = categorize_responses(df["response"])
+    return point_stats(config_counts(df), config["confidence"])
+
+def work_units(config):
+    """Una unidad por request de cada punto en cada ronda planificada."""
+    offsets = {}
+    for round_number, planned in enumerate(load_sweep(config).rounds):
+        for (temperature, top_p), n in sorted(planned.items()):
+            name = point_name(temperature, top_p)
+            config_item = {"name": name, "temperature": temperature, "top_p": top_p}
+            # Numeración corrida por punto, para que cada request tenga su propio número
+            start = offsets.get(name, 0)
+            for i in range(start + 1, start + n + 1):
+                yield {"unit_id": f"{round_number}:{name}:{i}", "config": config_item, "i": i}
+            offsets[name] = start + n
+
+def next_round(config):
+    """Planifica la ronda siguiente con lo observado; False si el barrido terminó."""
+    sweep = load_sweep(config)
+    existing = set(sweep.points)
+    planned = sweep.plan_round(observed_stats(config))
+    if planned is None:
+        print(f"\nBarrido terminado tras {len(sweep.rounds)} rondas.")
+        return False
+
+    sweep.save(plan_path(config))
+    new_points = len(set(planned) - existing)
+    print(f"\nRonda {len(sweep.rounds)}: {sum(planned.values())} requests en {len(planned)} puntos "
+          f"({new_points} nuevos, {len(sweep.cells)} celdas)")
+    return True
+
+def summarize(config):
+    sweep = load_sweep(config)
+    stats = observed_stats(config)
+    points = [point for point in sweep.points if point_name(*point) in stats.index]
+    stats = stats.loc[[point_name(*point) for point in points]]
+    stats.insert(0, "temperature", [t for t, _ in points])
+    stats.insert(1, "top_p", [p for _, p in points])
+
+    print("\n=== Superficie de entropía ===")
+    print(stats.round(4).to_string())
+
+    n_t, n_p, samples, width = sweep.uniform_equivalent(stats)
+    uniform_requests = n_t * n_p * samples
+    total = int(stats["n"].sum())
+    print(f"\nRequests del barrido: {total} en {len(stats)} puntos y {len(sweep.rounds)} rondas "
+          f"(intervalo más ancho: {width:.3f} bits)")
+    print(f"Grilla uniforme con la misma resolución y ningún intervalo más ancho ({n_t} × {n_p} puntos, "
+          f"{samples} muestras cada uno): {uniform_requests} requests; el barrido usa el {total / uniform_requests:.0%}")
+
+    surface_file = derived_path(config["output_file"], "_superficie.csv")
+    stats.to_csv(surface_file, index_label="config_name")
+    print(f"\nSuperficie guardada en: {surface_file}")
+    plot_surface(stats, sweep, derived_path(config["output_file"], "_superficie.png"))
+
+def plot_surface(stats, sweep, plot_path):
+    """Entropía interpolada sobre la región, con los puntos muestreados (área ∝ muestras) y las celdas."""
+    fig, ax = plt.subplots(figsize=(9, 6), layout='constrained')
+    contour = ax.tricontourf(stats["temperature"], stats["top_p"], stats["entropy"],
+                             levels=np.linspace(0, 2, 21), cmap='viridis', extend='both')
+    fig.colorbar(contour, ax=ax, label='Entropía (bits)')
+    for t0, t1, p0, p1 in sweep.cells:
+        ax.add_patch(plt.Rectangle((t0, p0), t1 - t0, p1 - p0, fill=False, edgecolor='white',
+                                   linewidth=0.5, alpha=0.6))
+    ax.scatter(stats["temperature"], stats["top_p"], s=10 + 200 * stats["n"] / stats["n"].max(),
+               facecolor='none', edgecolor='black', linewidth=0.8)
+    ax.set_xlabel('Temperatura')
+    ax.set_ylabel('Top-P')
+    ax.set_title(f'Superficie de entropía ({len(stats)} puntos, {int(stats["n"].sum())} requests)')
+
+    plt.savefig(plot_path)
+    print(f"Gráfico guardado en: {plot_path}")
+    plt.close()
+
+if __name__ == "__main__":
+    main(module=sys.modules[__name__])
@@ -0,0 +1,107 @@
+"""
+Experimento del Capítulo 4 - Parte 3: Distribución exacta desde logprobs
+
+Objetivo:
+Obtener la distribución de respuestas (A, B, C, D) inducida por cada
+configuración de temperatura y top-p sin muestrear: se piden una sola vez los
+logprobs del primer token y la distribución se reconstruye analíticamente
+(ver logprobs.py). Los experimentos muestreados sirven para validarla.
+
+Cada configuración es una unidad de trabajo del runner; se puede ejecutar con
+`python capitulo_4/experimento_logprobs.py` o `python -m runner capitulo_4.experimento_logprobs`.
+"""
+
+import sys
+import os
+import asyncio
+import weakref
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from runner import main
+from results_io import read_results, find_results
+from results_io.schemas import CAPITULO_4_LOGPROBS
+from capitulo_4.experimento import DEFAULT_CONFIG as TEMPERATURE_CONFIG
+from capitulo_4.experimento_topp import DEFAULT_CONFIG as TOPP_CONFIG
+from capitulo_4.logprobs import CATEGORIES, INVALID, induced_distribution, entropy_bits
+
+# --- CONFIGURACIÓN ---
+# Valores por defecto; se pueden sobrescribir con --config archivo.toml o --set clave=valor
+DEFAULT_CONFIG = {
+    "prompt": TEMPERATURE_CONFIG["prompt"],
+    "top_logprobs": 20,    # Tokens alternativos pedidos para el primer token (máximo de la API)
+    "max_in_flight": 16,
+    "flush_every": 10,
+    "output_file": os.path.join(os.path.dirname(__file__), "resultados_logprobs.parquet"),
+    # Por defecto, las mismas configuraciones que los experimentos muestreados
+    "configs": TEMPERATURE_CONFIG["configs"] + TOPP_CONFIG["configs"],
+}
+
+SCHEMA = CAPITULO_4_LOGPROBS
+# --simulate: los logprobs base salen de las respuestas muestreadas de experimento.py
+SIMULATION_SOURCE = find_results(os.path.dirname(__file__))
+
+# Todas las configuraciones comparten la misma distribución base: una sola llamada
+# por prompt. Se guarda por cliente: el runner crea uno por ejecución, así que la
+# llamada queda atada a esa ejecución y a su event loop
+_base_logprobs = weakref.WeakKeyDictionary()
+
+def work_units(config):
+    for config_item in config["configs"]:
+        yield {"unit_id": config_item["name"], "config": config_item}
+
+def base_logprobs(client, config):
+    """
+    Logprobs del primer token, compartidos por las unidades de una ejecución.
+
+    Si la llamada falla se descarta, y la próxima unidad la vuelve a intentar
+    en lugar de heredar la excepción.
+    """
+    cache = _base_logprobs.setdefault(client, {})
+    key = (config["prompt"], config["top_logprobs"])
+    if key not in cache:
+        future = asyncio.ensure_future(client.first_token_logprobs(
+            messages=[{"role": "user", "content": config["prompt"]}],
+            top_logprobs=config["top_logprobs"]
+        ))
+
+        def forget_on_error(done):
+            if (done.cancelled() or done.exception() is not None) and cache.get(key) is done:
+                del cache[key]
+
+        future.add_done_callback(forget_on_error)
+        cache[key] = future
+    return cache[key]
+
+async def run_unit(client, unit, config):
+    config_item = unit["config"]
+    top_logprobs = await base_logprobs(client, config)
+    distribution = induced_distribution(top_logprobs, config_item["temperature"], config_item["top_p"])
+
+    with client.phase("parse"):
+        return [
+            {
+                "config_name": config_item["name"],
+                "temperature": config_item["temperature"],
+                "top_p": config_item["top_p"],
+                "category": category,
+                "probability": probability
+            }
+            for category, probability in distribution.items()
+        ]
+
+def summarize(config):
+    df = read_results(config["output_file"])
+    table = df.pivot_table(index="config_name", columns="category", values="probability", observed=True)
+
+    print("\n=== Distribución exacta por configuración ===")
+    for config_name, row in table.iterrows():
+        distribution = {cat: row.get(cat, 0.0) for cat in CATEGORIES + [INVALID]}
+        print(f"\nConfiguración: {config_name}")
+        print(f"  Entropía: {entropy_bits(distribution):.4f} bits")
+        print(f"  Inválidos: {distribution[INVALID]:.4f}")
+        print("  Distribución:")
+        for cat in CATEGORIES:
+            print(f"    {cat}: {distribution[cat]:.4f}")
+
+if __name__ == "__main__":
+    main(module=sys.modules[__name__])
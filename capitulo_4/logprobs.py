@@ -0,0 +1,103 @@
+"""
+Distribución exacta de respuestas a partir de logprobs del primer token.
+
+En lugar de estimar la distribución de A/B/C/D con cientos de muestras por
+configuración, se piden una vez los logprobs de los tokens más probables para
+el primer token (a temperatura 1, es decir, la distribución base del modelo) y
+se aplican analíticamente la temperatura y el truncamiento top-p:
+
+    p_T(x) ∝ p(x)^(1/T)
+    top-p: se conserva el menor conjunto de tokens más probables cuya masa
+           alcanza top_p, y se renormaliza.
+
+Supuestos:
+- La categoría queda determinada por el primer token ("A", " A", "a" → A).
+  Cualquier otro token, y la masa fuera del top-k informado, cuenta como INVALID.
+- La masa fuera del top-k se modela como m tokens con la probabilidad del
+  menor token informado (m = masa restante / p_min), lo que permite escalarla
+  con la temperatura. Es una cota: ningún token del resto puede ser más
+  probable que p_min.
+
+El modo muestreado (experimento.py) sigue siendo la validación de estos supuestos.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+CATEGORIES = ['A', 'B', 'C', 'D']  # Espacio muestral fijo
+INVALID = "INVALID"
+
+
+def token_category(token: str) -> str:
+    """Categoría (A, B, C, D o INVALID) que implica un primer token."""
+    text = token.strip().upper().rstrip(".")
+    return text if text in CATEGORIES else INVALID
+
+
+def induced_distribution(
+    top_logprobs: List[Tuple[str, float]], temperature: float, top_p: float
+) -> Dict[str, float]:
+    """
+    Distribución de categorías inducida por (temperatura, top-p).
+
+    Args:
+        top_logprobs: Tuplas (token, logprob) de la distribución base del primer token
+        temperature: Temperatura de muestreo (0 = greedy)
+        top_p: Umbral de masa acumulada del muestreo nucleus
+
+    Returns:
+        Diccionario categoría -> probabilidad, con CATEGORIES e INVALID (suma 1)
+    """
+    tokens = [token for token, _ in top_logprobs]
+    logprobs = np.array([logprob for _, logprob in top_logprobs], dtype=float)
+    categories = [token_category(token) for token in tokens]
+
+    # Masa que el top-k no informa, agregada como un único bloque INVALID
+    tail_mass = 1.0 - np.exp(logprobs).sum()
+    if tail_mass > 1e-9:
+        min_logprob = logprobs.min()
+        tail_count = tail_mass / np.exp(min_logprob)
+        tail_logprob = np.log(tail_count) + min_logprob
+    else:
+        tail_count, tail_logprob = 0.0, None
+
+    distribution = dict.fromkeys(CATEGORIES + [INVALID], 0.0)
+
+    if temperature <= 0:
+        # Greedy: siempre el token más probable
+        distribution[categories[int(np.argmax(logprobs))]] = 1.0
+        return distribution
+
+    # Temperatura: log p_T(x) = log p(x) / T (sin normalizar)
+    scaled = logprobs / temperature
+    if tail_logprob is not None:
+        # m tokens de probabilidad p_min: m * p_min^(1/T)
+        scaled = np.append(scaled, np.log(tail_count) + min_logprob / temperature)
+        categories = categories + [INVALID]
+    probs = np.exp(scaled - scaled.max())
+    probs /= probs.sum()
+
+    # Top-p: el menor prefijo (por probabilidad decreciente) cuya masa alcanza top_p
+    order = np.argsort(-probs, kind="stable")
+    if tail_logprob is not None:
+        # El resto está formado por los tokens menos probables: se trunca primero
+        tail_index = len(probs) - 1
+        order = np.append(order[order != tail_index], tail_index)
+    mass_before = np.cumsum(probs[order]) - probs[order]
+    kept = order[mass_before < top_p]
+
+    kept_mass = probs[kept].sum()
+    for index in kept:
+        distribution[categories[index]] += float(probs[index] / kept_mass)
+    return distribution
+
+
+def entropy_bits(distribution: Dict[str, float]) -> float:
+    """
+    Entropía de Shannon en bits sobre A, B, C y D, igual que en analisis.py:
+    H(X) = -Σ p(x) * log₂(p(x)), con la masa INVALID fuera de la suma.
+    """
+    probs = np.array([distribution[cat] for cat in CATEGORIES])
+    probs = probs[probs > 0]
+    return max(0.0, float(-(probs * np.log2(probs)).sum()))
@@ -0,0 +1,9 @@
+"""
+Módulo de persistencia de resultados compartido por los experimentos.
+"""
+
+from .writer import ResultWriter
+from .reader import read_results, iter_results, find_results, derived_path, result_columns, DEFAULT_CHUNK_ROWS
+
+__all__ = ['ResultWriter', 'read_results', 'iter_results', 'find_results', 'derived_path', 'result_columns',
+           'DEFAULT_CHUNK_ROWS']
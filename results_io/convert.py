@@ -0,0 +1,46 @@
+"""
+Convierte resultados CSV existentes al formato Parquet tipado.
+
+Uso:
+    python -m results_io.convert capitulo_4/resultados.csv capitulo_4
+    python -m results_io.convert capitulo_4/resultados_topp.csv capitulo_4
+"""
+
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+
+from .reader import read_results, derived_path
+from .schemas import SCHEMAS
+from .writer import ResultWriter
+
+
+def convert(csv_path: str, chapter: str, batch_size: int = 100_000) -> str:
+    """
+    Escribe `<archivo>.parquet` junto al CSV con el esquema del capítulo.
+
+    Returns:
+        Ruta del directorio Parquet generado
+    """
+    schema = SCHEMAS[chapter]
+    df = read_results(csv_path)
+    if "timestamp" in df.columns and pa.types.is_timestamp(schema.field("timestamp").type):
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    # Los campos vacíos del CSV se leen como NaN; en el esquema son valores nulos
+    df = df.astype(object).where(df.notna(), None)
+
+    parquet_path = derived_path(csv_path, ".parquet")
+    with ResultWriter(parquet_path, schema, mode="w", flush_every=batch_size) as writer:
+        writer.write_many(df.to_dict("records"))
+    return parquet_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convertir resultados CSV a Parquet tipado.")
+    parser.add_argument("file", help="Archivo CSV de resultados")
+    parser.add_argument("chapter", choices=sorted(SCHEMAS), help="Capítulo al que pertenece el archivo")
+    args = parser.parse_args()
+
+    output = convert(args.file, args.chapter)
+    print(f"Resultados convertidos en: {output}")
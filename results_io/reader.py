@@ -0,0 +1,126 @@
+"""
+Lectura de resultados en CSV o Parquet con proyección de columnas.
+"""
+
+import os
+import ast
+from typing import Iterator, Optional, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_dataset
+
+from .schemas import SCHEMAS
+
+# Columnas de texto de los esquemas: en CSV se leen como str para que, por
+# ejemplo, la respuesta "1713." no se convierta en el número 1713.0
+TEXT_COLUMNS = {
+    field.name
+    for schema in SCHEMAS.values()
+    for field in schema
+    if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type)
+}
+
+# Columnas de listas: en CSV se guardan serializadas con str
+LIST_COLUMNS = {
+    field.name
+    for schema in SCHEMAS.values()
+    for field in schema
+    if pa.types.is_list(field.type)
+}
+
+DEFAULT_CHUNK_ROWS = 1_000_000  # Filas por bloque en la lectura por bloques
+
+
+def find_results(directory: str, stem: str = "resultados") -> str:
+    """
+    Devuelve la ruta de los resultados de un experimento, prefiriendo Parquet.
+
+    Args:
+        directory: Directorio del capítulo
+        stem: Nombre base del archivo, sin extensión
+
+    Returns:
+        `<stem>.parquet` si existe, si no `<stem>.csv`
+    """
+    parquet_path = os.path.join(directory, f"{stem}.parquet")
+    if os.path.exists(parquet_path):
+        return parquet_path
+    return os.path.join(directory, f"{stem}.csv")
+
+
+def derived_path(path: str, suffix: str) -> str:
+    """
+    Ruta de un archivo derivado de los resultados (gráficos, exports).
+
+    Ejemplo: derived_path("capitulo_3/resultados.parquet", "_latency.png")
+    devuelve "capitulo_3/resultados_latency.png".
+    """
+    base = path.rstrip(os.sep)
+    for extension in (".csv", ".parquet"):
+        if base.endswith(extension):
+            base = base[: -len(extension)]
+            break
+    return base + suffix
+
+
+def read_results(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lee un archivo de resultados leyendo sólo las columnas pedidas.
+
+    En Parquet las columnas de texto codificadas por diccionario se devuelven
+    como `category` y las listas como arrays. En CSV las columnas de listas
+    (serializadas con str, como `responses` del Capítulo 1) se convierten a lista.
+
+    Args:
+        path: Archivo .csv o directorio .parquet
+        columns: Columnas a leer (None para todas)
+    """
+    if path.rstrip(os.sep).endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+
+    return _parse_lists(pd.read_csv(path, usecols=columns, dtype={name: str for name in TEXT_COLUMNS}))
+
+
+def iter_results(
+    path: str, columns: Optional[List[str]] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee un archivo de resultados por bloques de a lo sumo `chunk_rows` filas.
+
+    Devuelve los mismos tipos que `read_results`, bloque por bloque y en el
+    orden del archivo, sin cargarlo entero: en Parquet se recorren los row
+    groups de cada parte con un scanner de Arrow; en CSV, con `chunksize`. Un
+    bloque puede tener menos filas (por ejemplo, al final de cada parte), y
+    las columnas `category` de dos bloques pueden tener categorías distintas.
+
+    Args:
+        path: Archivo .csv o directorio .parquet
+        columns: Columnas a leer (None para todas)
+        chunk_rows: Filas máximas por bloque
+    """
+    if path.rstrip(os.sep).endswith(".parquet"):
+        dataset = pa_dataset.dataset(path, format="parquet")
+        for batch in dataset.to_batches(columns=columns, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+
+    chunks = pd.read_csv(path, usecols=columns, dtype={name: str for name in TEXT_COLUMNS}, chunksize=chunk_rows)
+    with chunks:
+        for chunk in chunks:
+            yield _parse_lists(chunk)
+
+
+def _parse_lists(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte a listas las columnas de listas de un CSV (serializadas con str)."""
+    for name in LIST_COLUMNS.intersection(df.columns):
+        df[name] = df[name].map(lambda value: ast.literal_eval(value) if isinstance(value, str) else value)
+    return df
+
+
+def result_columns(path: str) -> List[str]:
+    """Nombres de las columnas de un archivo de resultados, sin leer los datos."""
+    if path.rstrip(os.sep).endswith(".parquet"):
+        return pa_dataset.dataset(path, format="parquet").schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
@@ -0,0 +1,80 @@
+"""
+Esquemas tipados de los resultados de cada capítulo.
+
+Las columnas de texto con pocos valores distintos (respuestas, estados,
+nombres de configuración) se guardan con codificación de diccionario.
+"""
+
+import pyarrow as pa
+
+# Texto codificado por diccionario: cada valor distinto se guarda una sola vez
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+CAPITULO_1 = pa.schema([
+    ("N", pa.int64()),
+    ("trial", pa.int64()),
+    ("unique_count", pa.int64()),
+    ("collision", pa.bool_()),
+    ("responses", pa.list_(CATEGORY)),
+])
+
+CAPITULO_2 = pa.schema([
+    ("run_id", pa.int64()),
+    ("response_text", CATEGORY),
+    ("event", pa.int64()),
+])
+
+CAPITULO_3 = pa.schema([
+    ("request_id", pa.int64()),
+    ("t_start", pa.float64()),
+    ("t_end", pa.float64()),
+    ("latency_seconds", pa.float64()),
+    ("status", CATEGORY),
+    ("error_type", CATEGORY),
+    # Descomposición medida en streaming (nulas sin streaming o en corridas anteriores)
+    ("ttft_seconds", pa.float64()),
+    ("token_gaps", pa.list_(pa.float64())),
+    ("server_queue_time", pa.float64()),
+    ("server_prompt_time", pa.float64()),
+    ("server_completion_time", pa.float64()),
+    ("server_total_time", pa.float64()),
+])
+
+# Generador de carga de lazo abierto: una fila por request, para cada tasa objetivo
+CAPITULO_3_CARGA = pa.schema([
+    ("target_rate", pa.float64()),
+    ("request_id", pa.int64()),
+    ("t_scheduled", pa.float64()),
+    ("t_start", pa.float64()),
+    ("t_end", pa.float64()),
+    ("latency_seconds", pa.float64()),
+    ("in_flight", pa.int64()),
+    ("status", CATEGORY),
+    ("error_type", CATEGORY),
+])
+
+CAPITULO_4 = pa.schema([
+    ("config_name", CATEGORY),
+    ("temperature", pa.float64()),
+    ("top_p", pa.float64()),
+    ("response", CATEGORY),
+    ("timestamp", pa.timestamp("us")),
+])
+
+# Distribución exacta reconstruida desde logprobs: una fila por (configuración, categoría)
+CAPITULO_4_LOGPROBS = pa.schema([
+    ("config_name", CATEGORY),
+    ("temperature", pa.float64()),
+    ("top_p", pa.float64()),
+    ("category", CATEGORY),
+    ("probability", pa.float64()),
+])
+
+SCHEMAS = {
+    "capitulo_1": CAPITULO_1,
+    "capitulo_2": CAPITULO_2,
+    "capitulo_3": CAPITULO_3,
+    "capitulo_3_carga": CAPITULO_3_CARGA,
+    "capitulo_4": CAPITULO_4,
+    "capitulo_4_logprobs": CAPITULO_4_LOGPROBS,
+}
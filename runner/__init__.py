@@ -0,0 +1,20 @@
+"""
+Runner unificado y reanudable para los experimentos de todos los capítulos.
+"""
+
+from .core import run_experiment, load_config, has_results, unit_sample_index, ExperimentStopped
+from .checkpoint import CheckpointIndex, checkpoint_path
+from .profiler import PhaseProfiler
+from .cli import main
+
+__all__ = [
+    "run_experiment",
+    "load_config",
+    "has_results",
+    "unit_sample_index",
+    "ExperimentStopped",
+    "CheckpointIndex",
+    "checkpoint_path",
+    "PhaseProfiler",
+    "main",
+]
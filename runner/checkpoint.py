@@ -0,0 +1,64 @@
+"""
+Índice de unidades de trabajo completadas.
+
+Es un archivo de texto append-only con un identificador por línea que se carga
+en un set al iniciar, de modo que saltear unidades ya hechas es O(1) sin
+releer los archivos de resultados.
+"""
+
+import os
+from typing import Iterable
+
+
+def checkpoint_path(output_file: str) -> str:
+    """
+    Ruta del índice asociado a un archivo de resultados.
+
+    Para un directorio Parquet el índice vive dentro del directorio (con prefijo
+    "_", que los lectores de Parquet ignoran); para un CSV, al lado del archivo.
+    """
+    output_file = output_file.rstrip(os.sep)
+    if output_file.endswith(".parquet"):
+        return os.path.join(output_file, "_checkpoint")
+    return output_file + ".checkpoint"
+
+
+class CheckpointIndex:
+    """Conjunto persistente de identificadores de unidades completadas."""
+
+    def __init__(self, path: str, reset: bool = False):
+        """
+        Args:
+            path: Ruta del archivo de índice
+            reset: Descartar el índice existente y empezar de cero
+        """
+        self.path = path
+        self._done = set()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not reset and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = open(path, "w" if reset else "a", encoding="utf-8")
+
+    def __contains__(self, unit_id: str) -> bool:
+        return unit_id in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def add_many(self, unit_ids: Iterable[str]) -> None:
+        """Marca unidades como completadas y sincroniza el índice con disco."""
+        unit_ids = [unit_id for unit_id in unit_ids if unit_id not in self._done]
+        if not unit_ids:
+            return
+        self._file.writelines(f"{unit_id}\n" for unit_id in unit_ids)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._done.update(unit_ids)
+
+    def close(self) -> None:
+        self._file.close()
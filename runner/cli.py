@@ -0,0 +1,85 @@
+"""
+Interfaz de línea de comandos del runner (`python -m runner`).
+
+Uso:
+    python -m runner capitulo_4 --config barrido.toml
+    python -m runner capitulo_4.experimento_topp --set n_requests_per_config=100
+    python -m runner capitulo_2 --restart
+    python -m runner capitulo_1 --profile
+    python -m runner capitulo_4 --simulate --seed 0
+"""
+
+import os
+import sys
+import argparse
+import importlib
+import tomllib
+from types import ModuleType
+from typing import Optional, List
+
+from .core import run_experiment, load_config
+
+
+def resolve_experiment(name: str) -> ModuleType:
+    """
+    Importa el módulo de un experimento.
+
+    Acepta el nombre de un capítulo ("capitulo_4", que usa su experimento.py),
+    un módulo ("capitulo_4.experimento_topp") o la ruta a un script.
+    """
+    name = name.rstrip("/" + os.sep)
+    if name.endswith(".py"):
+        name = name[:-3].replace(os.sep, ".").replace("/", ".")
+    if "." not in name:
+        name = f"{name}.experimento"
+    return importlib.import_module(name)
+
+
+def parse_override(text: str):
+    """Interpreta `clave=valor` con la sintaxis de valores de TOML (texto plano si no aplica)."""
+    key, separator, value = text.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Se esperaba clave=valor: {text!r}")
+    key = key.strip()
+    try:
+        return key, tomllib.loads(f"value = {value}")["value"]
+    except tomllib.TOMLDecodeError:
+        return key, value.strip()
+
+
+def build_parser(with_experiment: bool = True) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Ejecuta o reanuda un experimento por unidades de trabajo.")
+    if with_experiment:
+        parser.add_argument("experiment", help="Capítulo, módulo o script del experimento (ej. capitulo_4)")
+    parser.add_argument("--config", help="Archivo TOML que sobrescribe la configuración por defecto")
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], type=parse_override,
+        metavar="CLAVE=VALOR", help="Sobrescribe una clave de configuración (se puede repetir)",
+    )
+    parser.add_argument("--restart", action="store_true", help="Descarta resultados previos y empieza de cero")
+    parser.add_argument("--profile", action="store_true",
+                        help="Informa el tiempo en requests, esperas, persistencia y cómputo")
+    parser.add_argument("--simulate", nargs="?", const="", metavar="RESULTADOS",
+                        help="Responde sin red con un cliente ajustado a resultados existentes "
+                             "(por defecto los del experimento); guarda en <resultados>_simulado")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla del simulador")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, module: Optional[ModuleType] = None) -> None:
+    """
+    Punto de entrada. Si se pasa `module` (desde el propio script del
+    experimento), no se espera el argumento con el nombre del experimento.
+    """
+    args = build_parser(with_experiment=module is None).parse_args(argv)
+    if module is None:
+        module = resolve_experiment(args.experiment)
+
+    try:
+        config = load_config(module, args.config, dict(args.overrides))
+    except (OSError, KeyError, tomllib.TOMLDecodeError) as e:
+        print(f"Error en la configuración: {e}")
+        sys.exit(2)
+
+    run_experiment(module, config, restart=args.restart, profile=args.profile,
+                   simulate=args.simulate, seed=args.seed)
@@ -0,0 +1,380 @@
+"""
+Ejecución reanudable de experimentos como listas de unidades de trabajo.
+
+Un módulo de experimento expone:
+
+- `DEFAULT_CONFIG`: diccionario de configuración (incluye `output_file`,
+  `max_in_flight` y `flush_every`).
+- `SCHEMA`: esquema de sus filas (ver results_io.schemas).
+- `work_units(config)`: iterable de diccionarios, cada uno con un `unit_id`
+  único y estable entre ejecuciones.
+- `async run_unit(client, unit, config)`: ejecuta una unidad con el cliente
+  compartido y devuelve la lista de filas a guardar. Si lanza una excepción,
+  la ejecución se detiene conservando lo ya completado. Cada request pasa
+  `sample_index=unit_sample_index(unit["unit_id"], k)`, para que el almacén
+  de respuestas no vuelva a servir, al reanudar, muestras de otras unidades.
+- Opcionalmente `summarize(config)`, que se llama al terminar.
+- Opcionalmente `make_client(config)`, que crea el AsyncGroqClient a usar
+  (por defecto uno con tope global de `max_in_flight` requests).
+- Opcionalmente `make_monitor(config)`, que devuelve None o una función
+  `monitor(rows)` llamada con las filas de cada unidad completada. Si devuelve
+  un motivo de parada (string), no se lanzan más unidades; las que ya están en
+  vuelo terminan y se guardan, porque su costo ya se pagó.
+- Opcionalmente `next_round(config)`, para experimentos por rondas: se llama
+  cuando se completaron todas las unidades, con las filas ya en disco. Si
+  devuelve True, `work_units(config)` se vuelve a llamar y sus unidades nuevas
+  se ejecutan en la misma ejecución; si devuelve False, la ejecución termina.
+- Opcionalmente `SIMULATION_SOURCE`: resultados a los que se ajusta `--simulate`
+  sin archivo, para experimentos cuyos propios resultados no sirven o todavía
+  no existen (por defecto, los del propio experimento).
+
+El runner corre hasta `max_in_flight` unidades a la vez, escribe sus filas con
+un único ResultWriter y registra las unidades completadas en un índice
+(ver runner.checkpoint), así que al reanudar sólo se ejecuta lo pendiente.
+
+Al terminar, los histogramas de latencia del cliente se combinan con los de
+ejecuciones anteriores en `<resultados>_latencias.json` y se muestran sus
+percentiles. Con `simulate` las requests se responden con un SimulatedClient
+ajustado a resultados existentes y las filas van a `<resultados>_simulado`.
+Con `profile=True` (`--profile`) se informa además cuánto tiempo
+se fue en requests, esperas, parseo, persistencia y cómputo (ver runner.profiler).
+"""
+
+import os
+import glob
+import time
+import copy
+import hashlib
+import asyncio
+import tomllib
+import contextlib
+from types import ModuleType
+from typing import Optional, Dict, Any, Iterable, List, Callable
+
+from tqdm import tqdm
+
+from api_client import AsyncGroqClient, LatencyRecorder, SimulatedClient, SimulatedModel
+from results_io import ResultWriter, derived_path, find_results, result_columns
+from .checkpoint import CheckpointIndex, checkpoint_path
+from .profiler import PhaseProfiler
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Latencias para simular los experimentos que no las registran
+SIMULATION_LATENCIES = find_results(os.path.join(REPO_ROOT, "capitulo_3"))
+SIMULATION_SUFFIX = "_simulado"
+
+
+def unit_sample_index(unit_id: str, repetition: int = 0) -> int:
+    """
+    Índice de muestra del almacén de respuestas para la request `repetition` de una unidad.
+
+    Sin índice explícito, el cliente numera las muestras con un contador que
+    vuelve a 0 en cada proceso, así que una corrida reanudada con
+    GROQ_STORE_PATH recibiría del almacén las muestras de unidades ya
+    guardadas en lugar de muestras nuevas. Este índice depende sólo del
+    `unit_id`: repetir una unidad pide las mismas muestras y dos unidades
+    distintas nunca comparten una. Se usan 63 bits, que entran en un INTEGER
+    de SQLite.
+    """
+    digest = hashlib.blake2b(f"{unit_id}:{repetition}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+class ExperimentStopped(Exception):
+    """Una unidad falló de forma irrecuperable y la ejecución se detuvo."""
+
+
+def load_config(
+    module: ModuleType,
+    path: Optional[str] = None,
+    overrides: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Arma la configuración de un experimento.
+
+    Parte de `DEFAULT_CONFIG` y le aplica, en orden, las claves de primer nivel
+    de un archivo TOML y los `overrides` explícitos.
+
+    Raises:
+        KeyError: Si se intenta configurar una clave que el experimento no define
+    """
+    config = copy.deepcopy(module.DEFAULT_CONFIG)
+    updates = {}
+    if path is not None:
+        with open(path, "rb") as f:
+            updates.update(tomllib.load(f))
+    updates.update(overrides or {})
+
+    unknown = sorted(set(updates) - set(config))
+    if unknown:
+        raise KeyError(f"Claves de configuración desconocidas: {', '.join(unknown)}")
+    config.update(updates)
+    return config
+
+
+def has_results(path: str) -> bool:
+    """Indica si `path` ya contiene filas de resultados (CSV no vacío o partes Parquet)."""
+    if os.path.isdir(path):
+        return bool(glob.glob(os.path.join(path, "*.parquet")))
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def _title(module: ModuleType) -> str:
+    lines = [line.strip() for line in (module.__doc__ or "").splitlines() if line.strip()]
+    return lines[0] if lines else module.__name__
+
+
+async def _run_units(
+    module: ModuleType,
+    config: Dict[str, Any],
+    client: AsyncGroqClient,
+    units: Iterable[Dict[str, Any]],
+    total: int,
+    writer: ResultWriter,
+    checkpoint: CheckpointIndex,
+    monitor: Optional[Callable[[List[Dict[str, Any]]], Optional[str]]] = None,
+    profiler: Optional[PhaseProfiler] = None,
+    next_units: Optional[Callable[[], Optional[List[Dict[str, Any]]]]] = None,
+) -> Optional[str]:
+    """
+    Corre las unidades y devuelve el motivo de parada del monitor, si lo hubo.
+
+    Cuando se terminan las unidades, `next_units` (si está) devuelve las de la
+    ronda siguiente, o None si no hay más.
+    """
+    def persisting():
+        return profiler.phase("persistence") if profiler is not None else contextlib.nullcontext()
+
+    max_in_flight = config["max_in_flight"]
+    flush_every = config["flush_every"]
+
+    unflushed: List[str] = []
+    pending = set()
+    iterator = iter(units)
+    exhausted = False
+    stop_reason = monitor([]) if monitor is not None else None
+    progress = tqdm(total=total, desc="Unidades")
+
+    async with client:
+        async def run(unit):
+            return unit["unit_id"], await module.run_unit(client, unit, config)
+
+        try:
+            while True:
+                while not exhausted and stop_reason is None and len(pending) < max_in_flight:
+                    try:
+                        unit = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(run(unit)))
+
+                if not pending and exhausted and stop_reason is None and next_units is not None:
+                    # La ronda siguiente se planifica con las filas de esta ya en disco
+                    with persisting():
+                        writer.flush(fsync=True)
+                        checkpoint.add_many(unflushed)
+                    unflushed = []
+                    units = next_units()
+                    if units:
+                        iterator, exhausted = iter(units), False
+                        progress.total += len(units)
+                        progress.refresh()
+                        continue
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                failure = None
+                for task in done:
+                    if task.exception() is not None:
+                        failure = failure or task.exception()
+                        continue
+                    unit_id, rows = task.result()
+                    with persisting():
+                        writer.write_many(rows)
+                    unflushed.append(unit_id)
+                    progress.update(1)
+                    if monitor is not None and stop_reason is None:
+                        stop_reason = monitor(rows)
+
+                # Primero las filas a disco y recién después el índice: ante una
+                # caída se pueden repetir unidades, pero nunca perder filas
+                if len(unflushed) >= flush_every or failure is not None:
+                    with persisting():
+                        writer.flush(fsync=True)
+                        checkpoint.add_many(unflushed)
+                    unflushed = []
+
+                if failure is not None:
+                    raise ExperimentStopped(str(failure)) from failure
+        finally:
+            for task in pending:
+                task.cancel()
+            with persisting():
+                writer.flush(fsync=True)
+                checkpoint.add_many(unflushed)
+            progress.close()
+
+    return stop_reason
+
+
+def save_latencies(client: AsyncGroqClient, output_file: str, resuming: bool) -> None:
+    """Combina los histogramas de latencia del cliente con los guardados y muestra los percentiles."""
+    latency_file = derived_path(output_file, "_latencias.json")
+    recorder = client.latency_recorder
+    if resuming and os.path.exists(latency_file):
+        recorder = LatencyRecorder.load(latency_file).merge(recorder)
+    # Al empezar de cero se descartan también las latencias anteriores
+    if recorder.histograms or os.path.exists(latency_file):
+        recorder.save(latency_file)
+    if not recorder.histograms:
+        return
+
+    print(f"\nLatencias por configuración (acumuladas en {latency_file}):")
+    for key, stats in recorder.summary().items():
+        print(f"  {key}: n={stats['count']} p50={stats['p50']:.3f}s p90={stats['p90']:.3f}s "
+              f"p99={stats['p99']:.3f}s p99.9={stats['p99.9']:.3f}s")
+
+
+def simulation_setup(config: Dict[str, Any], source: str = "", seed: Optional[int] = None,
+                     default_source: Optional[str] = None):
+    """
+    Cliente simulado y configuración para correr un experimento sin red.
+
+    Args:
+        config: Configuración del experimento
+        source: Resultados a los que ajustar las respuestas (vacío: `default_source`)
+        seed: Semilla del simulador
+        default_source: Resultados por defecto (`SIMULATION_SOURCE` del módulo); si
+            es None, los del propio experimento, en Parquet o CSV
+
+    Returns:
+        Tupla (cliente, configuración con `output_file` apuntando a `<resultados>_simulado`)
+    """
+    output_file = config["output_file"]
+    if not source and default_source:
+        source = default_source
+    if not source:
+        stem = os.path.basename(output_file.rstrip(os.sep)).rsplit(".", 1)[0]
+        source = find_results(os.path.dirname(output_file), stem)
+    if not os.path.exists(source):
+        raise ValueError(f"No hay resultados a los que ajustar la simulación: {source}")
+    latency_from = source if "latency_seconds" in result_columns(source) else SIMULATION_LATENCIES
+    model = SimulatedModel.from_results(source, latency_from if os.path.exists(latency_from) else None, seed=seed)
+
+    config = copy.deepcopy(config)
+    extension = ".csv" if output_file.endswith(".csv") else ".parquet"
+    config["output_file"] = derived_path(output_file, SIMULATION_SUFFIX + extension)
+    print(f"Simulación ajustada a {source} (latencias de {latency_from})")
+    return SimulatedClient(model), config
+
+
+def run_experiment(
+    module: ModuleType,
+    config: Optional[Dict[str, Any]] = None,
+    restart: bool = False,
+    profile: bool = False,
+    simulate: Optional[str] = None,
+    seed: Optional[int] = None,
+) -> int:
+    """
+    Ejecuta (o reanuda) las unidades pendientes de un experimento.
+
+    Args:
+        module: Módulo del experimento (ver la documentación de este módulo)
+        config: Configuración completa; por defecto `module.DEFAULT_CONFIG`
+        restart: Descartar resultados e índice previos y empezar de cero
+        profile: Informar el tiempo por fases al terminar
+        simulate: Correr contra un SimulatedClient ajustado a estos resultados
+            ("" para los del propio experimento); None usa la API
+        seed: Semilla del simulador
+
+    Returns:
+        Cantidad de unidades completadas en esta ejecución
+    """
+    config = config if config is not None else load_config(module)
+    client = None
+    if simulate is not None:
+        try:
+            client, config = simulation_setup(config, simulate, seed, getattr(module, "SIMULATION_SOURCE", None))
+        except (OSError, ValueError) as e:
+            print(f"Error preparando la simulación: {e}")
+            return 0
+    output_file = config["output_file"]
+    index_file = checkpoint_path(output_file)
+    resuming = not restart and os.path.exists(index_file)
+
+    print(f"=== {_title(module)} ===")
+
+    if not restart and not resuming and has_results(output_file):
+        print(f"Ya existen resultados en {output_file} sin índice de avance.")
+        print("Usá --restart para empezar de cero (se sobrescriben los resultados).")
+        return 0
+
+    try:
+        if client is None and hasattr(module, "make_client"):
+            client = module.make_client(config)
+        elif client is None:
+            client = AsyncGroqClient(max_in_flight=config["max_in_flight"])
+    except ValueError as e:
+        print(f"Error inicializando cliente: {e}")
+        return 0
+
+    writer = ResultWriter(
+        output_file,
+        module.SCHEMA,
+        mode="a" if resuming else "w",
+        flush_every=config["flush_every"],
+    )
+    checkpoint = CheckpointIndex(index_file, reset=not resuming)
+    # Las unidades y el monitor se arman después de abrir el writer, que en modo
+    # "w" ya borró lo anterior
+    units = list(module.work_units(config))
+    monitor = module.make_monitor(config) if hasattr(module, "make_monitor") else None
+
+    next_units = None
+    if hasattr(module, "next_round"):
+        def next_units():
+            if not module.next_round(config):
+                return None
+            return [unit for unit in module.work_units(config) if unit["unit_id"] not in checkpoint]
+
+    done_before = len(checkpoint)
+    pending_units = [unit for unit in units if unit["unit_id"] not in checkpoint]
+    print(f"Unidades: {len(units)} ({len(units) - len(pending_units)} ya completadas)")
+    print(f"Unidades simultáneas: {config['max_in_flight']}")
+
+    profiler = PhaseProfiler() if profile else None
+    if profiler is not None:
+        client.hooks.append(profiler)
+
+    t_start = time.time()
+    try:
+        stop_reason = asyncio.run(_run_units(
+            module, config, client, pending_units, len(pending_units), writer, checkpoint, monitor, profiler,
+            next_units,
+        ))
+        if stop_reason is not None:
+            print(f"\nCriterio de parada alcanzado: {stop_reason}")
+    except ExperimentStopped as e:
+        print(f"\n[CRÍTICO] Ejecución detenida: {e}")
+        print("El progreso quedó guardado; volvé a ejecutar más tarde para continuar.")
+    except KeyboardInterrupt:
+        print("\nExperimento interrumpido por usuario. El progreso quedó guardado.")
+    finally:
+        writer.close()
+        completed = len(checkpoint) - done_before
+        checkpoint.close()
+
+    print(f"\nUnidades completadas en esta ejecución: {completed} ({time.time() - t_start:.2f}s)")
+    print(f"Resultados guardados en: {output_file}")
+    save_latencies(client, output_file, resuming)
+    if profiler is not None:
+        profiler.report()
+
+    if hasattr(module, "summarize") and has_results(output_file):
+        module.summarize(config)
+    return completed
@@ -0,0 +1,95 @@
+"""
+Perfil de una ejecución por fases (`--profile`).
+
+Reparte el tiempo de una ejecución entre:
+
+- Requests: duración de los intentos de envío a la API (hooks del cliente).
+- Espera: esperas del limitador de tasa (incluye pausas por 429) y backoff
+  entre reintentos.
+- Parseo: el parser de respuestas del stream (o de la respuesta guardada) y el
+  armado de las filas en los experimentos (fase "parse" del cliente). El
+  parser corre con el stream abierto, así que ese tiempo también cuenta en
+  Requests.
+- Persistencia: escritura de filas, fsync e índice de avance (medido por el runner).
+- Cómputo: tiempo de CPU del proceso fuera del parseo y la persistencia (SDK,
+  event loop, resto del código del experimento).
+
+Con varias requests en vuelo, las requests y las esperas se superponen y sus
+totales pueden superar el tiempo de pared; el cociente es la concurrencia
+media de cada fase.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from api_client import RequestHooks, RequestEvent
+
+# Para el diagnóstico: fracción del tiempo de pared a partir de la cual una fase domina
+DOMINANT_SHARE = 0.5
+
+
+class PhaseProfiler(RequestHooks):
+    """Acumula el tiempo de cada fase de una ejecución."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {"request": 0.0, "sleep": 0.0, "parse": 0.0, "persistence": 0.0}
+        self.requests = 0
+        self.retries = 0
+        self._persistence_cpu = 0.0
+        self._t_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def before_request(self, event: RequestEvent) -> None:
+        self.totals["sleep"] += event.wait
+
+    def _finish_attempt(self, event: RequestEvent) -> None:
+        self.totals["request"] += event.duration
+        self.requests += 1
+
+    def after_response(self, event: RequestEvent) -> None:
+        self._finish_attempt(event)
+
+    def on_error(self, event: RequestEvent) -> None:
+        self._finish_attempt(event)
+
+    def on_retry(self, event: RequestEvent) -> None:
+        self._finish_attempt(event)
+        self.retries += 1
+        self.totals["sleep"] += event.retry_delay
+
+    def on_phase(self, name: str, seconds: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mide un bloque sincrónico del runner (bloquea el event loop, así que es tiempo de pared)."""
+        t_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - t_start
+            if name == "persistence":
+                self._persistence_cpu += time.process_time() - cpu_start
+
+    def report(self) -> None:
+        wall = time.perf_counter() - self._t_start
+        # El parseo es CPU pura (sin E/S), así que su tiempo de pared se descuenta del de CPU
+        compute = max(time.process_time() - self._cpu_start - self._persistence_cpu - self.totals["parse"], 0.0)
+        phases = [
+            ("Requests", self.totals["request"]),
+            ("Espera (limitador y backoff)", self.totals["sleep"]),
+            ("Parseo", self.totals["parse"]),
+            ("Persistencia", self.totals["persistence"]),
+            ("Cómputo (CPU)", compute),
+        ]
+
+        print(f"\n--- Perfil por fases ({wall:.2f}s de pared, {self.requests} intentos, {self.retries} reintentos) ---")
+        for name, seconds in phases:
+            share = seconds / wall if wall > 0 else 0.0
+            print(f"{name:<30} {seconds:>10.2f}s {share:>8.0%}")
+
+        name, seconds = max(phases, key=lambda phase: phase[1])
+        if wall > 0 and seconds / wall >= DOMINANT_SHARE:
+            print(f"Fase dominante: {name}")
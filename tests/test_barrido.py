@@ -0,0 +1,56 @@
+"""
+Pruebas del barrido adaptativo (capitulo_4/barrido.py).
+
+Se corren con `python -m pytest tests`.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pandas as pd
+import pytest
+
+from capitulo_4.analisis import LABELS
+from capitulo_4.barrido import AdaptiveSweep, point_name, point_stats
+
+# Probabilidades de A, B, C, D e INVALID: la de "Temp Alta" y otras dos con distinta entropía
+FLAT_DISTRIBUTIONS = [
+    [0.82, 0.03, 0.04, 0.10, 0.01],
+    [0.60, 0.10, 0.10, 0.19, 0.01],
+    [0.40, 0.20, 0.20, 0.19, 0.01],
+]
+
+
+def run_sweep(distribution, seed):
+    """Corre todas las rondas del barrido por defecto con la distribución de respuestas de cada punto."""
+    rng = np.random.default_rng(seed)
+    sweep = AdaptiveSweep()
+    planned = sweep.start()
+    counts = {}
+    while planned:
+        for point, n in planned.items():
+            counts[point] = counts.get(point, 0) + rng.multinomial(n, distribution(*point))
+        table = pd.DataFrame({point_name(*point): c for point, c in counts.items()}, index=LABELS).T
+        planned = sweep.plan_round(point_stats(table))
+    return sweep
+
+
+@pytest.mark.parametrize("probabilities", FLAT_DISTRIBUTIONS)
+@pytest.mark.parametrize("seed", range(5))
+def test_flat_surface_is_not_refined(probabilities, seed):
+    sweep = run_sweep(lambda temperature, top_p: probabilities, seed)
+    assert len(sweep.points) == 12  # La grilla inicial de 4 × 3
+    assert len(sweep.cells) == 6
+
+
+def test_changing_surface_is_refined():
+    def distribution(temperature, top_p):
+        # La probabilidad de A cae con la temperatura efectiva
+        logits = -np.arange(4) * 2.5 / (temperature * top_p + 0.03)
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        return np.append(probabilities * 0.99, 0.01)
+
+    sweep = run_sweep(distribution, seed=0)
+    assert len(sweep.points) > 12